@@ -19,7 +19,7 @@ class ARoadMap(Agent):
         self.NODES = parameter
         self.cdist = 10000000
 
-    def think(self, dt, view, debugsurface):
+    def think(self, dt, view, debugsurface, deadline=None):
         if not self.goal:  # have no goal?
             return
         #debugsurface.fill((255, 0, 0, 100))
@@ -34,7 +34,7 @@ class ARoadMap(Agent):
             if ccourse:
                 break
 
-        gb = graphbuilder.GraphBuilder(self.speed, self.turningspeed)
+        gb = graphbuilder.GraphBuilder(self.speed, self.turningspeed, self.goal)
 
         safe_distance = self.radius + 1  # some margin is nice
         start = gb.node(self.position, self.angle)
@@ -1,6 +1,10 @@
 import math
+import numpy
 from keiro.agent import Agent
-from keiro.geometry import linesegdist2, line_distance2, angle_diff
+from keiro import roadmapcache
+from keiro.vector2d import Vec2d
+from keiro.geometry import angle_diff, angle_diff_array, FreePathChecker
+from keiro.safeness import SafenessEvaluator
 from keiro.stategenerator import ExtendingGenerator, StateGenerator
 
 DRAW_BLOCKED_PATHS = False
@@ -20,7 +24,15 @@ class RoadMapGenerator(object):
 
     Implemented using RRT expanded from the goal.
     Call once after a new target has been assigned.
+
+    Nodes are kept in a grid of NEIGHBOUR_DISTANCE sized cells for the
+    spacing test of new samples, and their positions and times in arrays so
+    that connections can be tried in order of a lower bound of their total
+    time. Traversability is tested natively against a grid of the obstacles.
+    The roadmap comes out the same as with a scan over all nodes.
     """
+    NEIGHBOUR_DISTANCE2 = 1000  # samples closer than this to a node are dropped
+    CELL_SIZE = 32  # >= sqrt(NEIGHBOUR_DISTANCE2)
 
     def __init__(self, view, goal, min_distance,
                  speed, turningspeed, max_edge_length,
@@ -32,8 +44,32 @@ class RoadMapGenerator(object):
         self.speed = speed
         self.turningspeed = turningspeed
         self.max_edge_length = max_edge_length
-        self.nodes = [Node(self.goal, None, None, 0)]
         self.random = random
+        self.obstacle_index = FreePathChecker()
+        self.obstacle_index.set_obstacles(numpy.array(
+            [(o.p1.x, o.p1.y, o.p2.x, o.p2.y) for o in view.obstacles],
+            dtype=numpy.float32).ravel())
+        self.nodes = []
+        self.cells = {}  # (cx, cy) => nodes in cell
+        self.x = numpy.zeros(64)
+        self.y = numpy.zeros(64)
+        self.times = numpy.zeros(64)
+        self._add_node(Node(self.goal, None, None, 0))
+
+    def _cell(self, position):
+        return (int(math.floor(position.x / self.CELL_SIZE)),
+                int(math.floor(position.y / self.CELL_SIZE)))
+
+    def _add_node(self, node):
+        i = len(self.nodes)
+        if i == len(self.x):
+            self.x, self.y, self.times = [numpy.resize(a, 2 * i)
+                                          for a in (self.x, self.y, self.times)]
+        self.x[i] = node.position.x
+        self.y[i] = node.position.y
+        self.times[i] = node.time
+        self.nodes.append(node)
+        self.cells.setdefault(self._cell(node.position), []).append(node)
 
     def line_is_traversable(self, p1, p2):
         """Check if line is collision free with static obstacles
@@ -41,10 +77,7 @@ class RoadMapGenerator(object):
         Returns True if a straight path between p1 and p2 is possible without
         colliding into static obstacles
         """
-        for o in self.view.obstacles:
-            if line_distance2(p1, p2, o.p1, o.p2) < self.min_distance2:
-                return False
-        return True
+        return self.obstacle_index.traversable(p1, p2, self.min_distance)
 
     def _traversal_time(self, candidate_position, existing_node):
         distance = candidate_position.distance_to(existing_node.position)
@@ -83,45 +116,65 @@ class RoadMapGenerator(object):
                 next_node,
                 total_time
             )
-            self.nodes.append(newnode)
+            self._add_node(newnode)
             #next_node = newnode
 
     def _connect_to_best(self, candidate_position):
+        n = len(self.nodes)
+        x, y = self.x[:n], self.y[:n]
+        segments = numpy.empty((n, 4), dtype=numpy.float32)
+        segments[:, 0] = candidate_position.x
+        segments[:, 1] = candidate_position.y
+        segments[:, 2] = x
+        segments[:, 3] = y
+        traversable = numpy.zeros(n, dtype=bool)
+        self.obstacle_index.traversable_paths(segments.ravel(), self.min_distance,
+                                              traversable)
+        reachable = numpy.flatnonzero(traversable)
+        # the turning time is left out of the bound, and the slack covers
+        # the single precision distances of _traversal_time
+        dx = x[reachable] - candidate_position.x
+        dy = y[reachable] - candidate_position.y
+        bound = numpy.sqrt(dx * dx + dy * dy) / self.speed + self.times[reachable]
+        bound -= 1e-6 * (1 + bound)
+        order = numpy.argsort(bound, kind="mergesort")
         best_total_time = None
-        best_node = None
-        for existing_node in self.nodes:
-            existing_node_position = existing_node.position
-
-            if self.line_is_traversable(
-                    candidate_position, existing_node_position):
-                # check if this existing node is the one that
-                # can be reached the fastest from the candidate
-                traversal_time = self._traversal_time(candidate_position,
-                                                      existing_node)
-                total_time = traversal_time + existing_node.time
-                if best_node is None or total_time < best_total_time:
-                    best_total_time = total_time
-                    best_node = existing_node
-
-        if best_node:
+        best_index = None
+        for i, lower in zip(reachable[order].tolist(), bound[order].tolist()):
+            if best_total_time is not None and lower > best_total_time:
+                break
+            # check if this existing node is the one that
+            # can be reached the fastest from the candidate
+            existing_node = self.nodes[i]
+            total_time = (self._traversal_time(candidate_position, existing_node) +
+                          existing_node.time)
+            # ties go to the oldest node
+            if (best_total_time is None or total_time < best_total_time or
+                    (total_time == best_total_time and i < best_index)):
+                best_total_time = total_time
+                best_index = i
+
+        if best_index is not None:
             # generated state can be connected to some existing node
-            self._connect_node(best_node, candidate_position)
+            self._connect_node(self.nodes[best_index], candidate_position)
+
+    def _has_close_node(self, position):
+        """If a node that can be reached from position is too close to it"""
+        cx, cy = self._cell(position)
+        for x in (cx - 1, cx, cx + 1):
+            for y in (cy - 1, cy, cy + 1):
+                for n in self.cells.get((x, y), ()):
+                    if (n.position.distance_to2(position) < self.NEIGHBOUR_DISTANCE2 and
+                            self.line_is_traversable(n.position, position)):
+                        return True
+        return False
 
     def run(self, iterations):
         sg = StateGenerator(*self.view.world_bounds, random=self.random)
 
         while len(self.nodes) < iterations:
-        #for candidate_position in sg.generate_n(iterations):
             candidate_position = sg.generate()
-            mindist2 = None
-            for n in self.nodes:
-                dist2 = n.position.distance_to2(candidate_position)
-                if (
-                    (mindist2 is None or dist2 < mindist2) and
-                    self.line_is_traversable(n.position, candidate_position)
-                ):
-                    mindist2 = dist2
-            if mindist2 >= 1000:
+            if not self._has_close_node(candidate_position):
                 self._connect_to_best(candidate_position)
         self.nodes.sort(key=lambda x: x.time)
 
@@ -129,6 +182,23 @@ class RoadMapGenerator(object):
         return self.nodes
 
 
+def roadmap_to_rows(nodes):
+    """Roadmap nodes as plain (x, y, angle, parent index, time) tuples"""
+    index = dict((id(n), i) for i, n in enumerate(nodes))
+    return [(n.position.x, n.position.y, n.angle,
+             None if n.parent is None else index[id(n.parent)], n.time)
+            for n in nodes]
+
+
+def roadmap_from_rows(rows):
+    nodes = [Node(Vec2d(x, y), angle, None, time)
+             for x, y, angle, parent, time in rows]
+    for n, row in zip(nodes, rows):
+        if row[3] is not None:
+            n.parent = nodes[row[3]]
+    return nodes
+
+
 class Arty(Agent):
     SAFETY_THRESHOLD = 0.9  # has no effect in the current implementation
 
@@ -142,32 +212,136 @@ class Arty(Agent):
 
     LOCALMAXSIZE = 10
     FREEMARGIN = 2
+    # pedestrian predictions are indexed in slices of PREDICTION_SLICE
+    # seconds, up to PREDICTION_HORIZON seconds ahead
+    PREDICTION_SLICE = 1.0
+    PREDICTION_HORIZON = 30.0
+    # "first": take the first safe route via the global nodes in order of
+    # their time to goal, "best": search for the fastest one, see
+    # find_best_globaltree
+    GLOBAL_SEARCH = "first"
+    GLOBAL_MEMO_BUCKET = 0.1  # seconds, for the "best" search
 
     def __init__(self, parameter, **kwargs):
         if parameter is None:
             parameter = 60
         super(Arty, self).__init__(parameter, **kwargs)
         self.GLOBALNODES = parameter
+        # samples the last local search got through when it ran out of
+        # time, 0 if it finished
+        self.search_progress = 0
 
     def init(self, view):
         """Builds the static obstacle map, global roadmap"""
         self.build_global_roadmap(view)
 
     def build_global_roadmap(self, view):
-        generator = RoadMapGenerator(
-            view,
-            self.goal,
-            self.radius + self.FREEMARGIN,
-            self.speed,
-            self.turningspeed,
-            self.GLOBALMAXEDGE,
-            self.random
+        def build():
+            generator = RoadMapGenerator(
+                view,
+                self.goal,
+                self.radius + self.FREEMARGIN,
+                self.speed,
+                self.turningspeed,
+                self.GLOBALMAXEDGE,
+                self.random
+            )
+            generator.run(self.GLOBALNODES)
+            return roadmap_to_rows(generator.get_nodes()), self.random.getstate()
+
+        # a cached roadmap also restores the random state it was built
+        # with, so the rest of the run is the same as without the cache
+        rows, random_state = roadmapcache.cached(
+            "arty",
+            view.obstacles,
+            (tuple(self.goal), view.world_bounds,
+             self.radius + self.FREEMARGIN, self.speed, self.turningspeed,
+             self.GLOBALMAXEDGE, self.GLOBALNODES, self.random.getstate()),
+            build
         )
-        generator.run(self.GLOBALNODES)
-        self.globalnodes = generator.get_nodes()
+        self.random.setstate(random_state)
+        self.globalnodes = roadmap_from_rows(rows)
+        self.index_global_roadmap(view)
         print "Done building global roadmap tree", len(self.globalnodes)
 
-    def think(self, dt, view, debugsurface):
+    def index_global_roadmap(self, view):
+        """Arrays over the global roadmap for testing whole routes at once
+
+        Row i of global_routes has the indices of the nodes from node i to
+        the goal, padded with -1. For every node, the other global_* arrays
+        hold its position, and the direction and time of the move to its
+        parent and whether that move keeps clear of the static obstacles.
+        """
+        nodes = self.globalnodes
+        self.global_index = dict((id(n), i) for i, n in enumerate(nodes))
+        self.global_x = numpy.array([n.position.x for n in nodes], dtype=numpy.float32)
+        self.global_y = numpy.array([n.position.y for n in nodes], dtype=numpy.float32)
+        self.global_angle = numpy.zeros(len(nodes), dtype=numpy.float32)
+        self.global_movetime = numpy.zeros(len(nodes))
+        parents = [self.global_index.get(id(n.parent)) for n in nodes]
+        for i, n in enumerate(nodes):
+            if n.parent is not None:
+                diff = n.parent.position - n.position
+                self.global_angle[i] = diff.angle()
+                self.global_movetime[i] = diff.length() / self.speed
+
+        self.obstacle_index = FreePathChecker()
+        self.obstacle_index.set_obstacles(numpy.array(
+            [(o.p1.x, o.p1.y, o.p2.x, o.p2.y) for o in view.obstacles],
+            dtype=numpy.float32).ravel())
+        edges = [(n.position.x, n.position.y, n.parent.position.x, n.parent.position.y)
+                 if n.parent is not None else (0, 0, 0, 0) for n in nodes]
+        self.global_clear = self.segments_clear(edges)
+
+        routes = [None] * len(nodes)
+        for i in xrange(len(nodes)):
+            # walk up to the first node with a known route
+            chain = []
+            j = i
+            while j is not None and routes[j] is None:
+                chain.append(j)
+                j = parents[j]
+            rest = () if j is None else routes[j]
+            for k in reversed(chain):
+                rest = routes[k] = (k,) + rest
+        self.global_routes = -numpy.ones(
+            (len(nodes), max(len(r) for r in routes)), dtype=int)
+        for i, r in enumerate(routes):
+            self.global_routes[i, :len(r)] = r
+        # time to the goal from each node, leaving out the turns
+        self.global_route_movetime = numpy.array(
+            [self.global_movetime[list(r)].sum() for r in routes])
+
+    def segments_clear(self, segments):
+        """The static obstacle test of line_safeness for many segments
+        (rows of x1, y1, x2, y2) at once"""
+        segments = numpy.ascontiguousarray(segments, dtype=numpy.float32).reshape(-1, 4)
+        clear = numpy.zeros(len(segments), dtype=bool)
+        self.obstacle_index.traversable_paths(
+            segments.ravel(), self.radius + self.FREEMARGIN, clear)
+        return clear | ((segments[:, 0] == segments[:, 2]) & (segments[:, 1] == segments[:, 3]))
+
+    def safeness_evaluator(self, view):
+        """SafenessEvaluator for the pedestrians in view, made once per view"""
+        if getattr(self, "_safeness_view", None) is not view:
+            self._safeness_view = view
+            self._safeness = SafenessEvaluator(
+                view.pedestrians, self.radius, self.FREEMARGIN, self.obstacle_velocity)
+            self._safeness.predict(self.PREDICTION_HORIZON, self.PREDICTION_SLICE)
+            self._edge_memo = None
+        return self._safeness
+
+    def edge_memo(self):
+        """Safeness of the global edges for the current view, per node (for
+        the edge from its parent on to the grandparent, which starts with
+        the turn from the node's own edge) and bucket of start time: 1 if
+        safe, -1 if not and 0 if not known yet"""
+        if self._edge_memo is None:
+            buckets = int(math.ceil(self.PREDICTION_HORIZON / self.GLOBAL_MEMO_BUCKET))
+            self._edge_memo = numpy.zeros((len(self.globalnodes), buckets), dtype=numpy.int8)
+        return self._edge_memo
+
+    def think(self, dt, view, debugsurface, deadline=None):
         if not self.goal:
             return
         self.view = view
@@ -187,13 +361,16 @@ class Arty(Agent):
                 0
             )
 
-        path = self.getpath(view)
-        self.waypoint_clear()
-
+        path = self.getpath(view, deadline)
         if path:
+            self.waypoint_clear()
             for p in path:
                 self.waypoint_push(p)
+        elif self.search_progress:
+            # out of time, keep following the last path
+            pass
         else:
+            self.waypoint_clear()
             print("No safe route, giving up!")
 
     def obstacle_velocity(self, pedestrian):
@@ -208,13 +385,10 @@ class Arty(Agent):
 
         At specified time with respect to pedestrians in view
         """
-        for p in view.pedestrians:
-            # extrapolate position
-            pedestrianpos = self.future_position(p, time)
-            safe_dist = (self.radius + p.radius + self.FREEMARGIN)
-            if position.distance_to(pedestrianpos) < safe_dist:
-                self.safeness_fail_pedestrian = p
-                return 0  # collision with pedestrian
+        fail = self.safeness_evaluator(view).static_fail(position, time)
+        if fail != -1:
+            self.safeness_fail_pedestrian = view.pedestrians[fail]
+            return 0  # collision with pedestrian
         return 1
 
     def turn_safeness(self, position, a1, a2, view, starttime):
@@ -224,15 +398,11 @@ class Arty(Agent):
             angles a1 and a2.
         """
         dur = abs(angle_diff(a1, a2)) / self.turningspeed
-        for p in view.pedestrians:
-            # extrapolate to start of turn
-            p1 = self.future_position(p, starttime)
-            # extrapolate to end of turn
-            p2 = self.future_position(p, starttime + dur)
-            safedist2 = (self.radius + p.radius + self.FREEMARGIN) ** 2
-            if linesegdist2(p1, p2, position) < safedist2:
-                self.safeness_fail_pedestrian = p
-                return 0
+        fail = self.safeness_evaluator(view).turn_fail(
+            position, starttime, starttime + dur)
+        if fail != -1:
+            self.safeness_fail_pedestrian = view.pedestrians[fail]
+            return 0
         return 1
 
     def line_pedestrian_safeness(self, position, velocity,
@@ -250,20 +420,10 @@ class Arty(Agent):
         |p01 - p11|
 
         """
-        for o in view.pedestrians:
-            pd = position - self.future_position(o, start_time)
-            vd = velocity - self.obstacle_velocity(o)
-            vd2 = vd.length2()
-            if vd2 == 0:
-                t = 0
-            else:
-                t = -pd.dot(vd) / vd2
-            t = max(min(t, end_time - start_time), 0)
-            safe_dist2 = (self.radius + o.radius + self.FREEMARGIN) ** 2
-            dist2 = (pd + vd * t).length2()
-            if dist2 < safe_dist2:
-                return 0
-        #quit()
+        fail = self.safeness_evaluator(view).line_fail(
+            position, velocity, start_time, end_time)
+        if fail != -1:
+            return 0
         return 1
 
     def approx_line_pedestrian_safeness(
@@ -297,11 +457,9 @@ class Arty(Agent):
         if p1 == p2:
             return self.static_safeness(p1, view, starttime)
 
-        safedist2 = (self.radius + self.FREEMARGIN) ** 2
-
-        for o in view.obstacles:
-            if line_distance2(o.p1, o.p2, p1, p2) < safedist2:
-                return 0
+        # the obstacles are static, they are indexed with the global roadmap
+        if not self.obstacle_index.traversable(p1, p2, self.radius + self.FREEMARGIN):
+            return 0
 
         diff = p2 - p1
         length = diff.length()
@@ -332,8 +490,13 @@ class Arty(Agent):
         )
         return ((turningtime + movetime), turn_safeness * line_safeness)
 
-    def getpath(self, view):
-        """Use the ART algorithm to get a path to the goal"""
+    def getpath(self, view, deadline=None):
+        """Use the ART algorithm to get a path to the goal
+
+        The local search stops with the best path so far at the deadline.
+        The next local search then starts sampling as far out as this one
+        got, instead of close to the agent again.
+        """
         if self.goal_occupied(view):
             # TODO: choose another point on the global map
             #       that is closer to the goal than self.position
@@ -343,6 +506,7 @@ class Arty(Agent):
             self.position, self.angle, view, start_time=0.0, start_safeness=1.0
         )
         if testpath:
+            self.search_progress = 0
             return testpath
         print "No safe global path - initializing local search"
 
@@ -356,6 +520,8 @@ class Arty(Agent):
             view.world_bounds,
             steps=10,  # arbitrarily chosen
             random=self.random)
+        states.extend(self.search_progress)
+        self.search_progress = 0
 
         #always try to use the nodes from the last solution in this iterations
         #so they are kept if still the best
@@ -375,7 +541,8 @@ class Arty(Agent):
                 reachable_node.angle,
                 view,
                 start_time=reachable_node.time,
-                start_safeness=reachable_node.safeness
+                start_safeness=reachable_node.safeness,
+                time_limit=solution_time
             )
             if gpath is not None and (
                 solution is None or gtime < solution_time
@@ -392,6 +559,9 @@ class Arty(Agent):
 
                 solution = path
                 solution_time = gtime
+            if self.out_of_time(deadline):
+                self.search_progress = states.n
+                break
         return solution
 
     def extension_best_parent(self, new_position, nodes, view):
@@ -478,90 +648,220 @@ class Arty(Agent):
                 yield newnode
 
     def find_globaltree(self, from_position, from_angle,
-                        view, start_time, start_safeness):
+                        view, start_time, start_safeness, time_limit=None):
         """Tries to reach global tree from position/angle
 
-            Returns (path, time) to get to goal"""
+            Returns (path, time) to get to goal. The "best" GLOBAL_SEARCH
+            only returns paths faster than time_limit."""
+        if start_safeness < self.SAFETY_THRESHOLD:
+            return None, None
+        if self.GLOBAL_SEARCH == "best":
+            return self.find_best_globaltree(
+                from_position, from_angle, view, start_time, time_limit)
+
+        # The routes via the global nodes are tested in growing batches, so
+        # that few are tested in vain when one of the first ones is safe
+        begin = 0
+        size = 8
+        while begin < len(self.globalnodes):
+            candidates = numpy.arange(begin, min(begin + size, len(self.globalnodes)))
+            blocked, failed, times, starts, fails = self.route_safeness(
+                candidates, from_position, from_angle, view, start_time)
+            for row, i in enumerate(candidates.tolist()):
+                route = self.global_routes[i]
+                if blocked[row]:
+                    self.draw_blocked(route, failed[row],
+                                      starts[row], fails[row], view)
+                    continue
+                # TODO: make optimality/suboptimality an option
+                # With global nodes sorted by time to goal,
+                # this is a pretty fast heuristic
+                length = numpy.count_nonzero(route >= 0)
+                return ([self.globalnodes[j].position for j in route[:length]],
+                        float(times[row, length]))
+            begin += size
+            size *= 4
+        return None, None
 
-        # best_path = None
-        # best_time_to_goal = None
+    def find_best_globaltree(self, from_position, from_angle,
+                             view, start_time, time_limit):
+        """The fastest safe route via the global tree, faster than time_limit
 
-        for global_candidate in self.globalnodes:
-            safeness, path, time_to_goal = self.backtrack_via_global(
-                global_candidate,
-                from_position,
-                from_angle,
-                view,
-                start_time=start_time,
-                start_safeness=start_safeness
+        Candidates are tested best-first by a lower bound of their arrival
+        time (straight to the node and along the tree without turning),
+        until the bound passes the fastest route found. Global edges are
+        memoised, see route_safeness.
+        """
+        dx = self.global_x - from_position.x
+        dy = self.global_y - from_position.y
+        bound = (start_time + numpy.sqrt(dx * dx + dy * dy) / self.speed +
+                 self.global_route_movetime)
+        bound -= 1e-6 * (1 + bound)  # single precision slack
+        order = numpy.argsort(bound, kind="mergesort")
+
+        best_path = None
+        best_time = time_limit
+        begin = 0
+        size = 8
+        while begin < len(order):
+            candidates = order[begin:begin + size]
+            if best_time is not None:
+                candidates = candidates[bound[candidates] < best_time]
+                if len(candidates) == 0:
+                    break
+            blocked, failed, times, starts, fails = self.route_safeness(
+                candidates, from_position, from_angle, view, start_time, memoise=True)
+            for row, i in enumerate(candidates.tolist()):
+                route = self.global_routes[i]
+                if blocked[row]:
+                    self.draw_blocked(route, failed[row], starts[row], fails[row], view)
+                    continue
+                length = numpy.count_nonzero(route >= 0)
+                if best_time is None or times[row, length] < best_time:
+                    best_time = float(times[row, length])
+                    best_path = [self.globalnodes[j].position for j in route[:length]]
+            begin += size
+            size *= 4
+        if best_path is None:
+            return None, None
+        return best_path, best_time
+
+    def route_safeness(self, candidates, from_position, from_angle,
+                       view, start_time, memoise=False):
+        """Tests the routes from position/angle via each of the candidate
+        global nodes (indices into globalnodes) along the global tree
+
+        All moves of all routes are tested at once. With memoise, the
+        safeness of moves along global edges is remembered for the rest of
+        the tick per edge, edge it is reached from (which gives the turn
+        at its start) and GLOBAL_MEMO_BUCKET of start time, and reused for
+        moves reached the same way starting in the same bucket. Returns
+          - if each route is blocked
+          - the index of its first move that isn't safe
+          - the times the moves start (and the last one ends) at
+          - the positions the moves start at, as rows of x, y
+          - the pedestrians (indices into view.pedestrians) the moves fail
+            on, -1 where they don't
+        the last three with a row per route and a column per move.
+        """
+        routes = self.global_routes[candidates]
+        valid = routes >= 0
+        nodes = numpy.maximum(routes, 0)
+        before = nodes[:, :-1]  # where the moves along the tree start
+
+        # a move starts where the previous one ended, the first moves go
+        # from from_position onto the tree
+        x2 = self.global_x[nodes]
+        y2 = self.global_y[nodes]
+        x1 = numpy.empty_like(x2)
+        y1 = numpy.empty_like(y2)
+        x1[:, 0] = from_position.x
+        y1[:, 0] = from_position.y
+        x1[:, 1:] = x2[:, :-1]
+        y1[:, 1:] = y2[:, :-1]
+        # same single precision roundings as Vec2d.angle() and length()
+        dx = x2[:, 0] - x1[:, 0]
+        dy = y2[:, 0] - y1[:, 0]
+        length = numpy.sqrt((dx * dx + dy * dy).astype(float)).astype(numpy.float32)
+
+        a2 = numpy.empty(x2.shape, dtype=numpy.float32)
+        a2[:, 0] = numpy.arctan2(dy.astype(float), dx.astype(float))
+        a2[:, 1:] = self.global_angle[before]
+        a1 = numpy.empty_like(a2)
+        a1[:, 0] = from_angle
+        a1[:, 1:] = a2[:, :-1]
+        turntime = numpy.abs(angle_diff_array(a1, a2)).astype(float) / self.turningspeed
+        times = numpy.empty((len(candidates), x2.shape[1] + 1))
+        times[:, 0] = start_time
+        times[:, 1] = length.astype(float) / self.speed
+        times[:, 2:] = self.global_movetime[before]
+        times[:, 1:] += turntime
+        times[:, 1:][~valid] = 0
+        numpy.add.accumulate(times, axis=1, out=times)
+
+        evaluator = self.safeness_evaluator(view)
+        unsafe = numpy.zeros(valid.shape, dtype=bool)
+        test = valid
+        if memoise:
+            # from the second move along the tree on, a move only depends
+            # on its edge, the edge before it and its start time, and the
+            # node the edge before starts at gives both
+            memo = self.edge_memo()
+            via = before[:, :-1]
+            buckets = (times[:, 2:-1] / self.GLOBAL_MEMO_BUCKET).astype(int)
+            memoised = valid[:, 2:] & (buckets < memo.shape[1])
+            known = numpy.zeros(valid.shape, dtype=numpy.int8)
+            known[:, 2:][memoised] = memo[via[memoised], buckets[memoised]]
+            unsafe[known == -1] = True
+            test = valid & (known == 0)
+
+        clear = numpy.empty(valid.shape, dtype=bool)
+        clear[:, 0] = self.segments_clear(
+            numpy.column_stack((x1[:, 0], y1[:, 0], x2[:, 0], y2[:, 0])))
+        clear[:, 1:] = self.global_clear[before]
+        segments = numpy.column_stack((x1[test], y1[test], x2[test], y2[test]))
+        turn_safe, turn_fail = evaluator.turns(
+            segments[:, :2], a1[test], a2[test], times[:, :-1][test], self.turningspeed)
+        line_safe, line_fail = evaluator.segments(
+            segments[:, :2], segments[:, 2:], (times[:, :-1] + turntime)[test], self.speed)
+
+        unsafe[test] = ~clear[test] | (turn_safe == 0) | (line_safe == 0)
+        fails = -numpy.ones(valid.shape, dtype=int)
+        fails[test] = numpy.where(turn_fail != -1, turn_fail, line_fail)
+        if memoise:
+            tested = test[:, 2:] & memoised
+            memo[via[tested], buckets[tested]] = numpy.where(unsafe[:, 2:][tested], -1, 1)
+        return (unsafe.any(axis=1), unsafe.argmax(axis=1), times,
+                numpy.dstack((x1, y1)), fails)
+
+    def draw_blocked(self, route, failed, starts, fails, view):
+        """Debug drawing of a route that is blocked at move failed"""
+        if DRAW_BLOCKED_PATHS:
+            self.debugsurface.line(
+                self.globalnodes[route[0]].position,
+                Vec2d(*starts[failed].tolist()),
+                "red"
+            )
+        if fails[failed] != -1:
+            pedestrian = view.pedestrians[fails[failed]]
+            self.debugsurface.line(
+                Vec2d(*starts[failed].tolist()),
+                pedestrian.position,
+                "pink"
+            )
+            self.debugsurface.circle(
+                pedestrian.position,
+                10,
+                "red",
+                2
             )
-
-            if safeness < self.SAFETY_THRESHOLD:
-                if DRAW_BLOCKED_PATHS:
-                    self.debugsurface.line(
-                        from_position,
-                        global_candidate.position,
-                        "red"
-                    )
-                continue
-            # TODO: make optimality/suboptimality an option
-            # With global nodes sorted by time to goal,
-            # this is a pretty fast heuristic
-            return path, time_to_goal
-        #     if best_path is None or time_to_goal < best_time_to_goal:
-        #         best_path = path
-        #         best_time_to_goal = time_to_goal
-        return None, None
-        # return (best_path, best_time_to_goal)
 
     def backtrack_via_global(self, global_candidate, from_position,
                              from_angle, view, start_time, start_safeness):
-        # create a start linked to the candidate
-        current_node = Node(
-            from_position,
-            None,
-            global_candidate
-        )
-        safeness = start_safeness
-        current_angle = from_angle
-        current_time = start_time
-        # follow global tree to goal, and check for collisions
-        path = []
-
-        while current_node.parent and safeness >= self.SAFETY_THRESHOLD:
-            self.safeness_fail_pedestrian = None
-            move_time, move_safeness = self.test_move(
-                current_node.position,
-                current_angle,
-                current_node.parent.position,
-                view,
-                current_time
-            )
-            safeness *= move_safeness
-            if safeness < self.SAFETY_THRESHOLD:
-                if DRAW_BLOCKED_PATHS:
-                    self.debugsurface.line(
-                        global_candidate.position,
-                        current_node.position,
-                        "red"
-                    )
-                if self.safeness_fail_pedestrian:
-                    self.debugsurface.line(
-                        current_node.position,
-                        self.safeness_fail_pedestrian.position,
-                        "pink"
-                    )
-                    self.debugsurface.circle(
-                        self.safeness_fail_pedestrian.position,
-                        10,
-                        "red",
-                        2
-                    )
-
-            current_time += move_time
-            current_direction = \
-                current_node.parent.position - current_node.position
-            current_angle = current_direction.angle()
-            current_node = current_node.parent
-            path.append(current_node.position)
-        return safeness, path, current_time
+        """Moves from position/angle to global_candidate and on along the
+        global tree to the goal
+
+        Returns (safeness, path, time) up to and including the first move
+        that isn't safe
+        """
+        if start_safeness < self.SAFETY_THRESHOLD:
+            return start_safeness, [], start_time
+        i = self.global_index[id(global_candidate)]
+        blocked, failed, times, starts, fails = self.route_safeness(
+            numpy.array([i]), from_position, from_angle, view, start_time)
+        route = self.global_routes[i]
+        length = numpy.count_nonzero(route >= 0)
+        if blocked[0]:
+            length = failed[0] + 1
+        return (start_safeness * (not blocked[0]),
+                [self.globalnodes[j].position for j in route[:length]],
+                float(times[0, length]))
+
+
+class BestFirstArty(Arty):
+    """Arty taking the fastest safe route via the global tree
+
+    The global search is best-first with memoised global edges, so the local
+    search doesn't test the same edges over and over again.
+    """
+    GLOBAL_SEARCH = "best"
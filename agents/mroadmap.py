@@ -17,7 +17,7 @@ class MRoadMap(Agent):
         self.NODES = parameter
         self.cdist = 10000000
 
-    def think(self, dt, view, debugsurface):
+    def think(self, dt, view, debugsurface, deadline=None):
         if not self.goal:  # have no goal?
             return
         #debugsurface.fill((255, 0, 0, 100))
@@ -32,7 +32,7 @@ class MRoadMap(Agent):
             if ccourse:
                 break
 
-        gb = graphbuilder.GraphBuilder(self.speed, self.turningspeed)
+        gb = graphbuilder.GraphBuilder(self.speed, self.turningspeed, self.goal)
 
         safe_distance = self.radius + self.FREEMARGIN  # some margin is nice
         start = gb.node(self.position, self.angle)
@@ -43,15 +43,19 @@ class MRoadMap(Agent):
         else:
             for i in xrange(self.NODES / 2):  # global planning
                 newpos = Vec2d(640 * random.random(), 480 * random.random())
-                for pos in gb.positions():
-                    if graphbuilder.free_path(Vec2d(*pos), newpos, view, safe_distance):
+                positions = gb.positions()
+                free = graphbuilder.free_paths([(pos, newpos) for pos in positions], view, safe_distance)
+                for pos, is_free in zip(positions, free):
+                    if is_free:
                         gb.connect(pos, newpos)
                         pygame.draw.aaline(debugsurface, (0, 255, 0, 255), pos, newpos)
 
             for i in xrange(self.NODES - self.NODES / 2):  # some extra local points to handle the crowd
                 newpos = self.position + Vec2d((2 * random.random() - 1) * self.view_range, (2 * random.random() - 1) * self.view_range)
-                for pos in gb.positions():
-                    if graphbuilder.free_path(Vec2d(*pos), newpos, view, safe_distance):
+                positions = gb.positions()
+                free = graphbuilder.free_paths([(pos, newpos) for pos in positions], view, safe_distance)
+                for pos, is_free in zip(positions, free):
+                    if is_free:
                         gb.connect(pos, newpos)
                         pygame.draw.aaline(debugsurface, (0, 255, 0, 255), pos, newpos)
 
@@ -1,8 +1,10 @@
+import numpy
 from keiro.agent import Agent
 from keiro import graphbuilder
 from keiro import astar
 from keiro.geometry import linesegdist2
 from keiro.vector2d import Vec2d
+from keiro.world import View
 
 
 class RoadMap(Agent):
@@ -14,12 +16,13 @@ class RoadMap(Agent):
         super(RoadMap, self).__init__(parameter, **kwargs)
         self.NODES = parameter
         self.cdist = 10000000
+        # global samples kept from ticks cut short by the deadline
+        self.samples = []
+        self.links = []  # (position, sample) clear of the static obstacles
+        self.samples_goal = None
 
-    def think(self, dt, view, debugsurface):
-        if not self.goal:  # have no goal?
-            return
-        #debugsurface.fill((255, 0, 0, 100))
-        ccourse = False
+    def course_blocked(self, view):
+        """Returns if a visible pedestrian is in the way of the current waypoints"""
         last_pos = self.position
         for i in xrange(self.waypoint_len()):
             for pedestrian in view.pedestrians:
@@ -32,17 +35,49 @@ class RoadMap(Agent):
                     pedestrian.position
                 )
                 if closest_dist2 <= safe_dist2:
-                    ccourse = True
-                    break
+                    return True
             last_pos = self.waypoint(i).position
-            if ccourse:
-                break
+        return False
 
-        gb = graphbuilder.GraphBuilder(self.speed, self.turningspeed)
+    def free_links(self, segments, obstacles, pedestrians, safe_distance):
+        """The segments clear of obstacles, and also free of pedestrians
+
+        As two boolean arrays, obstacles and pedestrians are views with only
+        those in them (obstacles None to take them as clear).
+        """
+        if obstacles is None:
+            clear = numpy.ones(len(segments), dtype=bool)
+        else:
+            clear = graphbuilder.free_paths(segments, obstacles, safe_distance)
+        free = clear.copy()
+        if pedestrians.pedestrians and clear.any():
+            free[clear] = graphbuilder.free_paths(
+                [s for s, is_clear in zip(segments, clear) if is_clear],
+                pedestrians, safe_distance
+            )
+        return clear, free
+
+    def think(self, dt, view, debugsurface, deadline=None):
+        """Plan on a roadmap sampled for this tick
+
+        At the deadline, sampling stops and the roadmap so far is searched.
+        The global samples of a tick that was cut short are kept, with their
+        links that are clear of the static obstacles, and the next tick goes
+        on sampling from there until the goal changes. The current path is
+        only replaced by a better one.
+        """
+        if not self.goal:  # have no goal?
+            return
+        #debugsurface.fill((255, 0, 0, 100))
+        ccourse = self.course_blocked(view)
+
+        gb = graphbuilder.CompactGraphBuilder(
+            self.speed, self.turningspeed, self.goal)
 
         safe_distance = self.radius + self.FREEMARGIN  # some margin is nice
         start = gb.node(self.position, self.angle)
-        end = gb.node(self.goal, None)
+        gb.node(self.goal, None)  # so that the samples are linked to the goal
+        start_position = tuple(self.position)
 
         if graphbuilder.free_path(
             self.position,
@@ -52,44 +87,85 @@ class RoadMap(Agent):
         ):
             gb.connect(self.position, self.goal)
         else:
-            # using half of the points for global planning
             world_size = view.world_bounds[1::2]
-            for i in xrange(self.NODES / 2):
+            # links are tested against the obstacles and the pedestrians
+            # separately, so the ones clear of the obstacles can be kept
+            obstacles = View(view.obstacles, [], world_size)
+            pedestrians = View([], view.pedestrians, world_size)
+            if self.samples_goal != tuple(self.goal):
+                self.samples = []
+                self.links = []
+                self.samples_goal = tuple(self.goal)
+
+            # the samples from ticks that ran out of time
+            free = self.free_links(self.links, None, pedestrians, safe_distance)[1]
+            for (pos, newpos), is_free in zip(self.links, free):
+                if is_free:
+                    gb.connect(pos, newpos)
+                    debugsurface.line(pos, newpos, "green")
+            clear, free = self.free_links(
+                [(self.position, pos) for pos in self.samples],
+                obstacles, pedestrians, safe_distance
+            )
+            for pos, is_free in zip(self.samples, free):
+                if is_free:
+                    gb.connect(self.position, pos)
+                    debugsurface.line(self.position, pos, "green")
+
+            # using half of the points for global planning
+            for i in xrange(len(self.samples), self.NODES / 2):
+                if self.out_of_time(deadline):
+                    break
                 newpos = Vec2d(
                     world_size[0] * self.random.random(),
                     world_size[1] * self.random.random()
                 )
-                for pos in gb.positions():
-                    if graphbuilder.free_path(
-                        Vec2d(*pos), newpos, view, safe_distance
-                    ):
+                self.samples.append(newpos)
+                positions = gb.positions()
+                clear, free = self.free_links(
+                    [(pos, newpos) for pos in positions],
+                    obstacles, pedestrians, safe_distance
+                )
+                for pos, is_clear, is_free in zip(positions, clear, free):
+                    if is_clear and pos != start_position:
+                        self.links.append((pos, newpos))
+                    if is_free:
                         gb.connect(pos, newpos)
                         debugsurface.line(pos, newpos, "green")
+            else:
+                # all sampled, the next tick samples from scratch
+                self.samples = []
+                self.links = []
 
             # some extra local points (within view range) to handle the crowd
             for i in xrange(self.NODES - self.NODES / 2):
+                if self.out_of_time(deadline):
+                    break
                 random_offset = Vec2d(
                     (2 * self.random.random() - 1) * self.view_range,
                     (2 * self.random.random() - 1) * self.view_range
                 )
                 newpos = self.position + random_offset
-                for pos in gb.positions():
-                    if graphbuilder.free_path(
-                        Vec2d(*pos), newpos, view, safe_distance
-                    ):
+                positions = gb.positions()
+                clear, free = self.free_links(
+                    [(pos, newpos) for pos in positions],
+                    obstacles, pedestrians, safe_distance
+                )
+                for pos, is_free in zip(positions, free):
+                    if is_free:
                         gb.connect(pos, newpos)
                         debugsurface.line(pos, newpos, "green")
 
             for p in gb.positions():
                 debugsurface.circle(p, 2, "black", 0)
 
-        nodes = gb.all_nodes()
-        result = astar.shortest_path(start, end, nodes)
+        # the goal can be reached at any angle
+        result = gb.shortest_path_any(start, gb.nodes_at(self.goal))
         if result.success:
             result.path = [tuple(self.position)]
             for i in result.indices:
-                if result.path[-1] != nodes[i].position:
-                    result.path.append(nodes[i].position)
+                if result.path[-1] != gb.position(i):
+                    result.path.append(gb.position(i))
 
         if ccourse is True:
             self.waypoint_clear()
@@ -104,3 +180,118 @@ class RoadMap(Agent):
             for p in result.path:
                 self.waypoint_push(Vec2d(*p))
             self.cdist = result.total_cost
+
+
+class IncrementalRoadMap(RoadMap):
+    """RoadMap that keeps one roadmap for the whole run
+
+    The roadmap is only checked against the static obstacles when it is
+    built, and searched with D* Lite (astar.DStarLite) which keeps its search
+    tree between ticks. Every tick the edges that visible pedestrians are in
+    the way of get blocked (and the ones they left unblocked) and the current
+    position is connected to the nearby nodes, so replanning only has to
+    repair what changed in the view. Costs are travel times, turning is not
+    taken into account.
+    """
+    INFINITY = float('inf')
+
+    def __init__(self, parameter, **kwargs):
+        if parameter is None:
+            parameter = 50
+        super(IncrementalRoadMap, self).__init__(parameter, **kwargs)
+        self.graph = None
+        self.roadmap_goal = None
+
+    def build_roadmap(self, view, safe_distance):
+        self.graph = astar.DStarLite()
+        self.graph.set_heuristic(self.speed)
+        self.base_cost = {}  # roadmap edge => unblocked cost
+        self.blocked = set()
+        self.roadmap_goal = tuple(self.goal)
+        positions = [Vec2d(*self.goal)]
+        self.goal_node = self.graph.add_node(*self.goal)
+        world_size = view.world_bounds[1::2]
+        for i in xrange(self.NODES):
+            newpos = Vec2d(
+                world_size[0] * self.random.random(),
+                world_size[1] * self.random.random()
+            )
+            node = self.graph.add_node(*newpos)
+            for other, pos in enumerate(positions):
+                if graphbuilder.free_path_obstacles_only(
+                    pos, newpos, view, safe_distance
+                ):
+                    cost = pos.distance_to(newpos) / self.speed
+                    self.base_cost[self.graph.add_edge(node, other, cost)] = cost
+                    self.base_cost[self.graph.add_edge(other, node, cost)] = cost
+            positions.append(newpos)
+        self.start = self.graph.add_node(*self.position)
+        self.graph.set_goal(self.goal_node)
+        self.graph.set_start(self.start)
+
+    def node_position(self, node):
+        return Vec2d(self.graph.node_x(node), self.graph.node_y(node))
+
+    def update_blocked(self, view, safe_distance):
+        """Blocks the roadmap edges that visible pedestrians are in the way of"""
+        graph = self.graph
+        blocked = set()
+        for pedestrian in view.pedestrians:
+            pos = pedestrian.position
+            for edge in graph.edges_near(pos.x, pos.y,
+                                         safe_distance + pedestrian.radius):
+                if edge in self.base_cost:  # not from the current position
+                    blocked.add(edge)
+        for edge in blocked - self.blocked:
+            graph.set_edge_cost(edge, self.INFINITY)
+        for edge in self.blocked - blocked:
+            graph.set_edge_cost(edge, self.base_cost[edge])
+        self.blocked = blocked
+
+    def connect_start(self, view, safe_distance):
+        """Connects the current position to the free nodes nearby (or anywhere if none)"""
+        graph = self.graph
+        graph.remove_edges(self.start)
+        graph.move_node(self.start, self.position.x, self.position.y)
+        for search_range in (self.view_range, self.INFINITY):
+            nodes = [node for node in graph.nodes_near(
+                self.position.x, self.position.y, search_range
+            ) if node != self.start]
+            positions = [self.node_position(node) for node in nodes]
+            free = graphbuilder.free_paths(
+                [(self.position, pos) for pos in positions], view, safe_distance
+            )
+            for node, pos, is_free in zip(nodes, positions, free):
+                if is_free:
+                    graph.add_edge(self.start, node,
+                                   self.position.distance_to(pos) / self.speed)
+            if graph.num_edges() > len(self.base_cost):
+                break
+        # the goal is always worth a try
+        pos = Vec2d(*self.goal)
+        if (pos.distance_to(self.position) > self.view_range and
+                graphbuilder.free_path(self.position, pos, view, safe_distance)):
+            graph.add_edge(self.start, self.goal_node,
+                           self.position.distance_to(pos) / self.speed)
+
+    def think(self, dt, view, debugsurface, deadline=None):
+        # replanning only repairs what changed, there is nothing to cut short
+        if not self.goal:  # have no goal?
+            return
+        safe_distance = self.radius + self.FREEMARGIN  # some margin is nice
+        if self.graph is None or tuple(self.goal) != self.roadmap_goal:
+            self.build_roadmap(view, safe_distance)
+        ccourse = self.course_blocked(view)
+        self.update_blocked(view, safe_distance)
+        self.connect_start(view, safe_distance)
+
+        for node in xrange(self.graph.num_nodes()):
+            debugsurface.circle(self.node_position(node), 2, "black", 0)
+
+        result = self.graph.shortest_path()
+        if result.success:
+            self.waypoint_clear()
+            for node in result.indices[1:]:
+                self.waypoint_push(self.node_position(node))
+        elif ccourse:
+            self.waypoint_clear()
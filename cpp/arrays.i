@@ -0,0 +1,76 @@
+/* arrays.i
+Typemaps for passing contiguous NumPy arrays (or anything else with the
+buffer protocol) to C++ without copying, as (pointer, number of elements):
+
+    %apply (const float *IN_ARRAY, int IN_SIZE) {(const float *x, int nx)};
+
+and for arrays that are written to in place (the buffer must be writable):
+
+    %apply (bool *INPLACE_ARRAY, int INPLACE_SIZE) {(bool *mask, int nmask)};
+*/
+%{
+static bool _buffer_format_is(const char *format, char expected){
+    // native or little endian single character formats, e.g. "f", "<f", "=i"
+    if(format == NULL)
+        return expected == 'B';
+    if(*format == '@' || *format == '=' || *format == '<')
+        ++format;
+    return format[0] == expected && format[1] == '\0';
+}
+
+static bool _get_array(PyObject *input, Py_buffer *view, char format, size_t itemsize, const char *name,
+                       int flags = 0){
+    if(PyObject_GetBuffer(input, view, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT | flags) != 0)
+        return false;
+    bool ok = (size_t)view->itemsize == itemsize && (_buffer_format_is(view->format, format) ||
+        (format == 'i' && sizeof(long) == sizeof(int) && _buffer_format_is(view->format, 'l')));
+    if(!ok){
+        PyBuffer_Release(view);
+        PyErr_Format(PyExc_TypeError, "expected a contiguous array of %s", name);
+    }
+    return ok;
+}
+%}
+
+%define %_array_typemaps(TYPE, FORMAT, NAME)
+%typemap(in) (const TYPE *IN_ARRAY, int IN_SIZE) (Py_buffer view, int has_view = 0) {
+    if(!_get_array($input, &view, FORMAT, sizeof(TYPE), NAME))
+        SWIG_fail;
+    has_view = 1;
+    $1 = (TYPE*)view.buf;
+    $2 = (int)(view.len / sizeof(TYPE));
+}
+%typemap(freearg) (const TYPE *IN_ARRAY, int IN_SIZE) {
+    if(has_view$argnum)
+        PyBuffer_Release(&view$argnum);
+}
+%typemap(typecheck, precedence=SWIG_TYPECHECK_POINTER) (const TYPE *IN_ARRAY, int IN_SIZE) {
+    $1 = PyObject_CheckBuffer($input) ? 1 : 0;
+}
+%enddef
+
+%_array_typemaps(float, 'f', "float32")
+%_array_typemaps(int, 'i', "int32")
+%_array_typemaps(double, 'd', "float64")
+
+%define %_inplace_typemaps(TYPE, FORMAT, NAME)
+%typemap(in) (TYPE *INPLACE_ARRAY, int INPLACE_SIZE) (Py_buffer view, int has_view = 0) {
+    if(!_get_array($input, &view, FORMAT, sizeof(TYPE), NAME, PyBUF_WRITABLE))
+        SWIG_fail;
+    has_view = 1;
+    $1 = (TYPE*)view.buf;
+    $2 = (int)(view.len / sizeof(TYPE));
+}
+%typemap(freearg) (TYPE *INPLACE_ARRAY, int INPLACE_SIZE) {
+    if(has_view$argnum)
+        PyBuffer_Release(&view$argnum);
+}
+%typemap(typecheck, precedence=SWIG_TYPECHECK_POINTER) (TYPE *INPLACE_ARRAY, int INPLACE_SIZE) {
+    $1 = PyObject_CheckBuffer($input) ? 1 : 0;
+}
+%enddef
+
+%_inplace_typemaps(bool, '?', "bool")
+%_inplace_typemaps(float, 'f', "float32")
+%_inplace_typemaps(int, 'i', "int32")
+%_inplace_typemaps(double, 'd', "float64")
@@ -1,6 +1,7 @@
 #include "astar.hpp"
 #include <cstdio>
 #include <cassert>
+#include <cmath>
 
 Path shortest_path(Node &start, Node &goal, const std::vector<Node*> &nodes){
 	bool return_path = (nodes.size() != 0);
@@ -12,6 +13,7 @@ Path shortest_path(Node &start, Node &goal, const std::vector<Node*> &nodes){
 		}
 	}
 	Path result;
+	result.expanded = 0;
 	std::priority_queue<pqnode, std::vector<pqnode>, std::greater<pqnode> > pq;
 	start.cost_here = 0;
 	pq.push(pqnode(start.cost_through_here(), &start));
@@ -27,6 +29,7 @@ Path shortest_path(Node &start, Node &goal, const std::vector<Node*> &nodes){
 			continue; //we have visited node before at a lower cost
 		}
 		node._best_expanded = n.first;
+		++result.expanded;
 		//printf("expanding %d\n", node.index);
 		for(size_t i = 0; i<node.edges.size(); i++){
 			float newcost = node.cost_here + node.edges[i].cost;
@@ -57,6 +60,26 @@ Path shortest_path(Node &start, Node &goal, const std::vector<Node*> &nodes){
 	return result;
 }
 
+float distance_heuristic(float x, float y, float goal_x, float goal_y, float speed){
+	float dx = goal_x - x, dy = goal_y - y;
+	return (float)sqrt(dx*dx + dy*dy) / speed;
+}
+
+float turning_heuristic(float x, float y, float angle, float goal_x, float goal_y,
+                        float speed, float turning_speed){
+	float dx = goal_x - x, dy = goal_y - y;
+	float h = distance_heuristic(x, y, goal_x, goal_y, speed);
+	if(dx == 0 && dy == 0)
+		return h;
+	double turn = fmod(std::abs(atan2(dy, dx) - angle), 2*M_PI);
+	if(turn > M_PI)
+		turn = 2*M_PI - turn;
+	turn -= M_PI/2;
+	if(turn > 0 && turning_speed > 0)
+		h += (float)(turn / turning_speed);
+	return h;
+}
+
 
 int main(void){
 	Node a(6), b(5), c(0), d(0);
@@ -1,3 +1,6 @@
+#ifndef _ASTAR_HPP
+#define _ASTAR_HPP
+
 #include <vector>
 #include <queue>
 #include <limits>
@@ -14,6 +17,7 @@ struct Edge{
 struct Path{
 	bool success;
 	float total_cost;
+	int expanded; // number of nodes expanded by the search
 	std::vector<int> indices;
 };
 
@@ -44,3 +48,15 @@ typedef std::pair<float,Node*> pqnode;
 
 //A* shortest path
 Path shortest_path(Node &start, Node &goal, const std::vector<Node*> &nodes = std::vector<Node*>());
+
+// Admissible and consistent estimates of the cost from (x, y) to the goal, for
+// Node::est_cost_there. Straight line travel time at speed:
+float distance_heuristic(float x, float y, float goal_x, float goal_y, float speed = 1);
+// Same plus a lower bound on the time for turning, for graphs where turning
+// from angle costs angle difference / turning_speed. Every path to the goal
+// has some leg within 90 degrees of the direction to the goal, so at least
+// the turn from angle to that leg is needed.
+float turning_heuristic(float x, float y, float angle, float goal_x, float goal_y,
+                        float speed, float turning_speed);
+
+#endif
@@ -1,8 +1,11 @@
 /* astar.i */
 %module astar
 %include "std_vector.i"
+%include "arrays.i"
 %{
 #include "astar.hpp"
+#include "csrgraph.hpp"
+#include "dstarlite.hpp"
 %}
 %template(int_vector) std::vector<int>; 
 %template(node_vector) std::vector<Node*>; 
@@ -10,6 +13,7 @@
 struct Path{
 	bool success;
 	float total_cost;
+	int expanded;
 	std::vector<int> indices;
 };
 
@@ -22,3 +26,71 @@ public:
 };
 
 Path shortest_path(Node &start, Node &goal, const std::vector<Node*> &nodes = std::vector<Node*>());
+float distance_heuristic(float x, float y, float goal_x, float goal_y, float speed = 1);
+float turning_heuristic(float x, float y, float angle, float goal_x, float goal_y,
+                        float speed, float turning_speed);
+
+%apply (const float *IN_ARRAY, int IN_SIZE) {
+    (const float *x, int nx), (const float *y, int ny), (const float *angle, int nangle),
+    (const float *costs, int ncosts)
+};
+%apply (const int *IN_ARRAY, int IN_SIZE) {
+    (const int *sources, int nsources), (const int *targets, int ntargets),
+    (const int *goals, int ngoals)
+};
+
+class CSRGraph {
+public:
+    CSRGraph();
+    bool build(const float *x, int nx, const float *y, int ny, const float *angle, int nangle,
+               const int *sources, int nsources, const int *targets, int ntargets,
+               const float *costs, int ncosts);
+    int num_nodes() const;
+    int num_edges() const;
+    void set_heuristic(float speed, float turning_speed = 0);
+    Path shortest_path(int start, int goal);
+    Path shortest_path_any(int start, const int *goals, int ngoals);
+    Path bidirectional_path(int start, int goal);
+};
+
+class DStarLite {
+public:
+    DStarLite();
+    int add_node(float x, float y);
+    void move_node(int node, float x, float y);
+    float node_x(int node) const;
+    float node_y(int node) const;
+    int add_edge(int from, int to, float cost);
+    void set_edge_cost(int edge, float cost);
+    void remove_edge(int edge);
+    void remove_edges(int node);
+    float edge_cost(int edge) const;
+    int edge_source(int edge) const;
+    int edge_target(int edge) const;
+    int num_nodes() const;
+    int num_edges() const;
+    void set_heuristic(float speed);
+    void set_start(int start);
+    void set_goal(int goal);
+    std::vector<int> nodes_near(float x, float y, float range) const;
+    std::vector<int> edges_near(float x, float y, float range) const;
+    Path shortest_path();
+    float cost_to_goal(int node) const;
+};
+
+%pythoncode %{
+def csr_graph(x, y, sources, targets, costs, angles=None):
+    """CSRGraph from array likes, angles may contain nan for nodes without angle"""
+    import numpy
+    def floats(a):
+        return numpy.ascontiguousarray(a, dtype=numpy.float32)
+    def ints(a):
+        return numpy.ascontiguousarray(a, dtype=numpy.int32)
+    graph = CSRGraph()
+    if angles is None:
+        angles = ()
+    if not graph.build(floats(x), floats(y), floats(angles),
+                       ints(sources), ints(targets), floats(costs)):
+        raise ValueError("inconsistent array sizes or node indices out of range")
+    return graph
+%}
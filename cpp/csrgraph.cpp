@@ -0,0 +1,341 @@
+#include <cmath>
+#include <queue>
+#include <limits>
+#include <algorithm>
+#include "csrgraph.hpp"
+
+typedef std::pair<float, int> pqentry;
+
+CSRGraph::CSRGraph()
+    :speed(0),
+    turning_speed(0),
+    current(0)
+{
+    offsets.push_back(0);
+    rev_offsets.push_back(0);
+}
+
+bool CSRGraph::build(const float *x_, int nx, const float *y_, int ny, const float *angle_, int nangle,
+                     const int *sources, int nsources, const int *targets_, int ntargets,
+                     const float *costs_, int ncosts){
+    x.clear(); y.clear(); angle.clear();
+    offsets.assign(1, 0);
+    targets.clear(); costs.clear();
+    rev_offsets.assign(1, 0);
+    rev_sources.clear(); rev_costs.clear();
+    stamp.clear();
+    if(nx != ny || (nangle != 0 && nangle != nx) || nsources != ntargets || nsources != ncosts)
+        return false;
+    for(int i = 0; i<nsources; ++i){
+        if(sources[i] < 0 || sources[i] >= nx || targets_[i] < 0 || targets_[i] >= nx)
+            return false;
+    }
+    x.assign(x_, x_ + nx);
+    y.assign(y_, y_ + ny);
+    if(nangle != 0)
+        angle.assign(angle_, angle_ + nangle);
+    else
+        angle.assign(nx, std::numeric_limits<float>::quiet_NaN());
+
+    // counting sort of the edges on source
+    offsets.assign(nx + 1, 0);
+    for(int i = 0; i<nsources; ++i)
+        ++offsets[sources[i] + 1];
+    for(int i = 0; i<nx; ++i)
+        offsets[i + 1] += offsets[i];
+    targets.resize(nsources);
+    costs.resize(nsources);
+    std::vector<int> fill(offsets.begin(), offsets.end() - 1);
+    for(int i = 0; i<nsources; ++i){
+        int k = fill[sources[i]]++;
+        targets[k] = targets_[i];
+        costs[k] = costs_[i];
+    }
+
+    // and on target
+    rev_offsets.assign(nx + 1, 0);
+    for(int i = 0; i<nsources; ++i)
+        ++rev_offsets[targets_[i] + 1];
+    for(int i = 0; i<nx; ++i)
+        rev_offsets[i + 1] += rev_offsets[i];
+    rev_sources.resize(nsources);
+    rev_costs.resize(nsources);
+    fill.assign(rev_offsets.begin(), rev_offsets.end() - 1);
+    for(int i = 0; i<nsources; ++i){
+        int k = fill[targets_[i]]++;
+        rev_sources[k] = sources[i];
+        rev_costs[k] = costs_[i];
+    }
+
+    stamp.assign(nx, 0);
+    cost_here.resize(nx);
+    best_expanded.resize(nx);
+    parent.resize(nx);
+    back_cost.resize(nx);
+    back_parent.resize(nx);
+    closed.resize(nx);
+    back_closed.resize(nx);
+    is_goal.resize(nx);
+    current = 0;
+    return true;
+}
+
+int CSRGraph::num_nodes() const{
+    return (int)x.size();
+}
+
+int CSRGraph::num_edges() const{
+    return (int)targets.size();
+}
+
+void CSRGraph::set_heuristic(float speed_, float turning_speed_){
+    speed = speed_;
+    turning_speed = turning_speed_;
+}
+
+float CSRGraph::estimate(int node, int goal) const{
+    if(!(speed > 0))
+        return 0;
+    if(angle[node] == angle[node] && turning_speed > 0) // has an angle
+        return turning_heuristic(x[node], y[node], angle[node], x[goal], y[goal], speed, turning_speed);
+    return distance_heuristic(x[node], y[node], x[goal], y[goal], speed);
+}
+
+void CSRGraph::reset_scratch(){
+    if(++current == 0){ // wrapped around, old stamps could look valid
+        std::fill(stamp.begin(), stamp.end(), 0);
+        current = 1;
+    }
+}
+
+Path CSRGraph::shortest_path(int start, int goal){
+    /*
+    Same search as ::shortest_path() on Nodes, ties are broken on node index
+    */
+    Path result;
+    result.success = false;
+    result.total_cost = 0;
+    result.expanded = 0;
+    int n = num_nodes();
+    if(start < 0 || start >= n || goal < 0 || goal >= n)
+        return result;
+    reset_scratch();
+    const float inf = std::numeric_limits<float>::max();
+    std::priority_queue<pqentry, std::vector<pqentry>, std::greater<pqentry> > pq;
+    stamp[start] = current;
+    cost_here[start] = 0;
+    best_expanded[start] = inf;
+    parent[start] = -1;
+    pq.push(pqentry(estimate(start, goal), start));
+    while(!pq.empty()){
+        pqentry top = pq.top();
+        pq.pop();
+        int node = top.second;
+        if(node == goal)
+            break;
+        if(top.first >= best_expanded[node])
+            continue; //we have visited node before at a lower cost
+        best_expanded[node] = top.first;
+        ++result.expanded;
+        for(int k = offsets[node]; k<offsets[node + 1]; ++k){
+            int to = targets[k];
+            float newcost = cost_here[node] + costs[k];
+            if(stamp[to] != current){
+                stamp[to] = current;
+                cost_here[to] = inf;
+                best_expanded[to] = inf;
+                parent[to] = -1;
+            }
+            if(newcost < cost_here[to]){
+                cost_here[to] = newcost;
+                parent[to] = node;
+                pq.push(pqentry(newcost + estimate(to, goal), to));
+            }
+        }
+    }
+    if(stamp[goal] != current || (parent[goal] == -1 && goal != start))
+        return result;
+    result.success = true;
+    result.total_cost = cost_here[goal];
+    for(int node = goal; node != -1; node = parent[node])
+        result.indices.push_back(node);
+    std::reverse(result.indices.begin(), result.indices.end());
+    return result;
+}
+
+void CSRGraph::touch(int node){
+    if(stamp[node] == current)
+        return;
+    const float inf = std::numeric_limits<float>::max();
+    stamp[node] = current;
+    cost_here[node] = back_cost[node] = inf;
+    best_expanded[node] = inf;
+    parent[node] = back_parent[node] = -1;
+    closed[node] = back_closed[node] = is_goal[node] = false;
+}
+
+Path CSRGraph::trace(int start, int node) const{
+    Path result;
+    result.success = true;
+    result.total_cost = cost_here[node];
+    result.expanded = 0;
+    for(; node != -1; node = parent[node])
+        result.indices.push_back(node);
+    std::reverse(result.indices.begin(), result.indices.end());
+    return result;
+}
+
+float CSRGraph::estimate_any(int node, const std::vector<int> &goals) const{
+    if(!(speed > 0))
+        return 0;
+    float best = std::numeric_limits<float>::max();
+    for(size_t i = 0; i<goals.size(); ++i)
+        best = std::min(best, estimate(node, goals[i]));
+    return best;
+}
+
+Path CSRGraph::shortest_path_any(int start, const int *goals, int ngoals){
+    Path result;
+    result.success = false;
+    result.total_cost = 0;
+    result.expanded = 0;
+    int n = num_nodes();
+    if(start < 0 || start >= n)
+        return result;
+    reset_scratch();
+    std::vector<int> valid;
+    for(int i = 0; i<ngoals; ++i){
+        if(goals[i] >= 0 && goals[i] < n){
+            touch(goals[i]);
+            is_goal[goals[i]] = true;
+            valid.push_back(goals[i]);
+        }
+    }
+    if(valid.empty())
+        return result;
+    std::priority_queue<pqentry, std::vector<pqentry>, std::greater<pqentry> > pq;
+    touch(start);
+    cost_here[start] = 0;
+    pq.push(pqentry(estimate_any(start, valid), start));
+    while(!pq.empty()){
+        pqentry top = pq.top();
+        pq.pop();
+        int node = top.second;
+        if(is_goal[node]){
+            int expanded = result.expanded;
+            result = trace(start, node);
+            result.expanded = expanded;
+            return result;
+        }
+        if(top.first >= best_expanded[node])
+            continue;
+        best_expanded[node] = top.first;
+        ++result.expanded;
+        for(int k = offsets[node]; k<offsets[node + 1]; ++k){
+            int to = targets[k];
+            float newcost = cost_here[node] + costs[k];
+            touch(to);
+            if(newcost < cost_here[to]){
+                cost_here[to] = newcost;
+                parent[to] = node;
+                pq.push(pqentry(newcost + estimate_any(to, valid), to));
+            }
+        }
+    }
+    return result;
+}
+
+float CSRGraph::potential(int node, int start, int goal) const{
+    if(!(speed > 0))
+        return 0;
+    return (distance_heuristic(x[node], y[node], x[goal], y[goal], speed) -
+            distance_heuristic(x[start], y[start], x[node], y[node], speed)) / 2;
+}
+
+Path CSRGraph::bidirectional_path(int start, int goal){
+    /*
+    Bidirectional Dijkstra on costs reduced by the potential (the average of
+    the estimates to the goal and from the start), which keeps reduced costs
+    non-negative and the same in both directions. The best path seen through
+    an edge between the two searches is kept in mu, and the search stops once
+    the two queue tops together can't beat it.
+    */
+    Path result;
+    result.success = false;
+    result.total_cost = 0;
+    result.expanded = 0;
+    int n = num_nodes();
+    if(start < 0 || start >= n || goal < 0 || goal >= n)
+        return result;
+    reset_scratch();
+    touch(start);
+    touch(goal);
+    if(start == goal){
+        cost_here[start] = 0;
+        return trace(start, start);
+    }
+    const float inf = std::numeric_limits<float>::max();
+    std::priority_queue<pqentry, std::vector<pqentry>, std::greater<pqentry> > forward, backward;
+    cost_here[start] = 0;
+    back_cost[goal] = 0;
+    forward.push(pqentry(potential(start, start, goal), start));
+    backward.push(pqentry(-potential(goal, start, goal), goal));
+    float mu = inf;
+    int meet = -1;
+    while(!forward.empty() && !backward.empty()){
+        if(forward.top().first + backward.top().first >= mu)
+            break;
+        if(forward.size() <= backward.size()){
+            int node = forward.top().second;
+            forward.pop();
+            if(closed[node])
+                continue;
+            closed[node] = true;
+            ++result.expanded;
+            for(int k = offsets[node]; k<offsets[node + 1]; ++k){
+                int to = targets[k];
+                float newcost = cost_here[node] + costs[k];
+                touch(to);
+                if(newcost < cost_here[to]){
+                    cost_here[to] = newcost;
+                    parent[to] = node;
+                    forward.push(pqentry(newcost + potential(to, start, goal), to));
+                    if(back_cost[to] < inf && newcost + back_cost[to] < mu){
+                        mu = newcost + back_cost[to];
+                        meet = to;
+                    }
+                }
+            }
+        } else {
+            int node = backward.top().second;
+            backward.pop();
+            if(back_closed[node])
+                continue;
+            back_closed[node] = true;
+            ++result.expanded;
+            for(int k = rev_offsets[node]; k<rev_offsets[node + 1]; ++k){
+                int from = rev_sources[k];
+                float newcost = back_cost[node] + rev_costs[k];
+                touch(from);
+                if(newcost < back_cost[from]){
+                    back_cost[from] = newcost;
+                    back_parent[from] = node;
+                    backward.push(pqentry(newcost - potential(from, start, goal), from));
+                    if(cost_here[from] < inf && newcost + cost_here[from] < mu){
+                        mu = newcost + cost_here[from];
+                        meet = from;
+                    }
+                }
+            }
+        }
+    }
+    if(meet == -1)
+        return result;
+    int expanded = result.expanded;
+    result = trace(start, meet);
+    for(int node = back_parent[meet]; node != -1; node = back_parent[node])
+        result.indices.push_back(node);
+    result.total_cost = mu;
+    result.expanded = expanded;
+    return result;
+}
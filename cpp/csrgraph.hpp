@@ -0,0 +1,61 @@
+#ifndef _CSRGRAPH_HPP
+#define _CSRGRAPH_HPP
+
+#include <vector>
+#include "astar.hpp"
+
+// Directed graph in compressed sparse row form: the edges leaving node i are
+// targets[offsets[i]] ... targets[offsets[i+1]-1], with matching costs. Nodes
+// have coordinates and optionally an angle (nan for none) for the heuristic.
+// Built once from arrays and searched any number of times, the per search
+// state lives in scratch arrays that are invalidated in constant time.
+class CSRGraph {
+public:
+    CSRGraph();
+    // edge i goes from sources[i] to targets[i], edges keep their relative order.
+    // Returns false (leaving the graph empty) if sizes or node indices don't match up.
+    bool build(const float *x, int nx, const float *y, int ny, const float *angle, int nangle,
+               const int *sources, int nsources, const int *targets, int ntargets,
+               const float *costs, int ncosts);
+    int num_nodes() const;
+    int num_edges() const;
+    // Costs are assumed to be distance / speed plus turning / turning_speed
+    // between nodes with angles (see turning_heuristic). speed 0 (the default)
+    // searches without a heuristic.
+    void set_heuristic(float speed, float turning_speed = 0);
+    // A* from start to goal, path indices are node indices
+    Path shortest_path(int start, int goal);
+    // A* from start to whichever of the goals is cheapest to reach, the
+    // search stops when the first goal is expanded and the path ends there.
+    // The heuristic is the smallest estimate over all goals, so with many
+    // goals a plain Dijkstra (speed 0) can be faster.
+    Path shortest_path_any(int start, const int *goals, int ngoals);
+    // Searches from both ends at once and stops when the searches meet and
+    // no cheaper meeting point can remain. Uses the distance part of the
+    // heuristic only, as the average of the forward and backward estimates.
+    Path bidirectional_path(int start, int goal);
+private:
+    float estimate(int node, int goal) const;
+    float estimate_any(int node, const std::vector<int> &goals) const;
+    float potential(int node, int start, int goal) const;
+    void reset_scratch();
+    void touch(int node);
+    Path trace(int start, int node) const;
+    std::vector<float> x, y, angle;
+    std::vector<int> offsets, targets;
+    std::vector<float> costs;
+    // the same edges sorted on target, for searching backwards
+    std::vector<int> rev_offsets, rev_sources;
+    std::vector<float> rev_costs;
+    float speed, turning_speed;
+    // scratch, entries are only valid where stamp == current stamp
+    std::vector<unsigned int> stamp;
+    unsigned int current;
+    std::vector<float> cost_here, best_expanded;
+    std::vector<int> parent;
+    std::vector<float> back_cost;
+    std::vector<int> back_parent; // next node towards the goal
+    std::vector<bool> closed, back_closed, is_goal;
+};
+
+#endif
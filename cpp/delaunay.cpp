@@ -0,0 +1,609 @@
+#include <cstddef>
+#include <utility>
+#include "delaunay.hpp"
+
+/*
+Triangles are kept in a vector with their neighbours, dead triangles are
+reused. The hull edges have ghost triangles (a, b, INF) with the outside of
+the hull to the left of a->b, so every triangle has three neighbours and
+points outside of the hull are inserted like the ones inside.
+*/
+
+DelaunayTriangulation::DelaunayTriangulation()
+    :npoints(0), nreal(0), last(-1), stamp(0), meshed(false){}
+
+int DelaunayTriangulation::insert(double x, double y){
+    int v;
+    if(free_ids.empty()){
+        v = (int)points.size();
+        points.push_back(Point());
+    } else {
+        v = free_ids.back();
+        free_ids.pop_back();
+    }
+    Point &p = points[v];
+    p.x = x;
+    p.y = y;
+    p.state = PENDING;
+    p.tri = -1;
+    ++npoints;
+    if(meshed){
+        insert_point(v);
+    } else {
+        start_mesh();
+    }
+    return v;
+}
+
+void DelaunayTriangulation::remove(int v){
+    if(!contains(v)) return;
+    if(points[v].state == MESH){
+        take_out(v);
+    }
+    points[v].state = FREE;
+    free_ids.push_back(v);
+    --npoints;
+}
+
+void DelaunayTriangulation::move(int v, double x, double y){
+    if(!contains(v)) return;
+    Point &p = points[v];
+    if(p.x == x && p.y == y) return;
+    switch(p.state){
+    case PENDING:
+        p.x = x;
+        p.y = y;
+        start_mesh();
+        break;
+    case HIDDEN:
+        p.x = x;
+        p.y = y;
+        insert_point(v);
+        break;
+    case MESH:
+        if(relocate(v, x, y)) return;
+        take_out(v);
+        points[v].x = x;
+        points[v].y = y;
+        points[v].state = PENDING;
+        if(meshed){
+            insert_point(v);
+        } else {
+            start_mesh();
+        }
+        break;
+    default:
+        break;
+    }
+}
+
+void DelaunayTriangulation::clear(){
+    points.clear();
+    free_ids.clear();
+    triangles.clear();
+    free_triangles.clear();
+    npoints = 0;
+    nreal = 0;
+    last = -1;
+    meshed = false;
+}
+
+bool DelaunayTriangulation::contains(int v) const{
+    return v >= 0 && v < (int)points.size() && points[v].state != FREE;
+}
+
+double DelaunayTriangulation::x(int v) const{
+    return contains(v) ? points[v].x : 0.0;
+}
+
+double DelaunayTriangulation::y(int v) const{
+    return contains(v) ? points[v].y : 0.0;
+}
+
+int DelaunayTriangulation::num_points() const{
+    return npoints;
+}
+
+int DelaunayTriangulation::num_triangles() const{
+    return nreal;
+}
+
+bool DelaunayTriangulation::get_triangles(int *out, int nout) const{
+    if(nout != nreal * 3) return false;
+    for(size_t t = 0; t < triangles.size(); ++t){
+        if(!triangles[t].alive || is_ghost(t)) continue;
+        for(int i = 0; i < 3; ++i){
+            *out++ = triangles[t].v[i];
+        }
+    }
+    return true;
+}
+
+int DelaunayTriangulation::num_incident(int v) const{
+    if(!contains(v) || points[v].state != MESH) return 0;
+    std::vector<int> around;
+    star(v, around);
+    int n = 0;
+    for(size_t k = 0; k < around.size(); ++k){
+        if(!is_ghost(around[k])) ++n;
+    }
+    return n;
+}
+
+bool DelaunayTriangulation::get_incident(int v, int *out, int nout) const{
+    if(nout != num_incident(v) * 3) return false;
+    if(nout == 0) return true;
+    std::vector<int> around;
+    star(v, around);
+    // start after a ghost, if there is one, so the triangles are in order
+    size_t first = 0;
+    for(size_t k = 0; k < around.size(); ++k){
+        if(is_ghost(around[k])){
+            first = k + 1;
+        }
+    }
+    for(size_t k = 0; k < around.size(); ++k){
+        const Triangle &t = triangles[around[(first + k) % around.size()]];
+        if(t.v[0] == INF || t.v[1] == INF || t.v[2] == INF) continue;
+        int i = t.v[0] == v ? 0 : (t.v[1] == v ? 1 : 2);
+        *out++ = v;
+        *out++ = t.v[(i + 1) % 3];
+        *out++ = t.v[(i + 2) % 3];
+    }
+    return true;
+}
+
+bool DelaunayTriangulation::is_ghost(int t) const{
+    const int *v = triangles[t].v;
+    return v[0] == INF || v[1] == INF || v[2] == INF;
+}
+
+int DelaunayTriangulation::new_triangle(int a, int b, int c){
+    int t;
+    if(free_triangles.empty()){
+        t = (int)triangles.size();
+        triangles.push_back(Triangle());
+    } else {
+        t = free_triangles.back();
+        free_triangles.pop_back();
+    }
+    Triangle &tri = triangles[t];
+    tri.v[0] = a;
+    tri.v[1] = b;
+    tri.v[2] = c;
+    tri.n[0] = tri.n[1] = tri.n[2] = -1;
+    tri.alive = true;
+    tri.mark = 0;
+    if(a != INF && b != INF && c != INF){
+        ++nreal;
+    }
+    return t;
+}
+
+void DelaunayTriangulation::free_triangle(int t){
+    if(!is_ghost(t)){
+        --nreal;
+    }
+    triangles[t].alive = false;
+    free_triangles.push_back(t);
+}
+
+// makes other the neighbour of t across the edge opposite t.v[i], and the
+// other way around
+void DelaunayTriangulation::link(int t, int i, int other){
+    Triangle &tri = triangles[t];
+    tri.n[i] = other;
+    int j = edge_index(other, tri.v[(i + 1) % 3], tri.v[(i + 2) % 3]);
+    triangles[other].n[j] = t;
+}
+
+// index of the corner of t that isn't on the edge a, b
+int DelaunayTriangulation::edge_index(int t, int a, int b) const{
+    const int *v = triangles[t].v;
+    for(int i = 0; i < 3; ++i){
+        if(v[i] != a && v[i] != b) return i;
+    }
+    return -1;
+}
+
+// twice the signed area of a, b, (x, y), positive if counterclockwise
+double DelaunayTriangulation::orient(int a, int b, double x, double y) const{
+    const Point &pa = points[a];
+    const Point &pb = points[b];
+    return (pb.x - pa.x) * (y - pa.y) - (pb.y - pa.y) * (x - pa.x);
+}
+
+// positive if (x, y) is inside the circle through the counterclockwise
+// a, b, c
+double DelaunayTriangulation::incircle(int a, int b, int c,
+        double x, double y) const{
+    double adx = points[a].x - x, ady = points[a].y - y;
+    double bdx = points[b].x - x, bdy = points[b].y - y;
+    double cdx = points[c].x - x, cdy = points[c].y - y;
+    return (adx * adx + ady * ady) * (bdx * cdy - cdx * bdy)
+        + (bdx * bdx + bdy * bdy) * (cdx * ady - adx * cdy)
+        + (cdx * cdx + cdy * cdy) * (adx * bdy - bdx * ady);
+}
+
+// whether a point at (x, y) would take away triangle t
+bool DelaunayTriangulation::conflict(int t, double x, double y) const{
+    const int *v = triangles[t].v;
+    for(int i = 0; i < 3; ++i){
+        if(v[i] != INF) continue;
+        int a = v[(i + 1) % 3];
+        int b = v[(i + 2) % 3];
+        double o = orient(a, b, x, y);
+        if(o != 0) return o > 0;
+        // on the line of the hull edge, it has to be between its ends
+        const Point &pa = points[a];
+        const Point &pb = points[b];
+        return (x - pa.x) * (pb.x - pa.x) + (y - pa.y) * (pb.y - pa.y) > 0
+            && (x - pb.x) * (pa.x - pb.x) + (y - pb.y) * (pa.y - pb.y) > 0;
+    }
+    return incircle(v[0], v[1], v[2], x, y) > 0;
+}
+
+// a triangle that (x, y) is in, or a ghost triangle that it is in conflict
+// with if it is outside of the hull
+int DelaunayTriangulation::locate(double x, double y) const{
+    int t = last;
+    if(t < 0 || !triangles[t].alive){
+        t = -1;
+        for(size_t k = 0; k < triangles.size() && t < 0; ++k){
+            if(triangles[k].alive) t = k;
+        }
+    }
+    if(is_ghost(t)){
+        const Triangle &g = triangles[t];
+        t = g.n[g.v[0] == INF ? 0 : (g.v[1] == INF ? 1 : 2)];
+    }
+    // walk towards the point, starting on a different edge every step so
+    // the walk can't go in circles
+    int limit = 4 * (int)triangles.size() + 16;
+    for(int step = 0; step < limit; ++step){
+        const Triangle &tri = triangles[t];
+        int next = -1;
+        for(int k = 0; k < 3 && next < 0; ++k){
+            int i = (step + k) % 3;
+            if(orient(tri.v[(i + 1) % 3], tri.v[(i + 2) % 3], x, y) < 0){
+                next = tri.n[i];
+            }
+        }
+        if(next < 0) return t;
+        if(is_ghost(next)) return next;
+        t = next;
+    }
+    // rounding errors, look at all of them
+    int outside = -1;
+    for(size_t k = 0; k < triangles.size(); ++k){
+        if(!triangles[k].alive) continue;
+        if(is_ghost(k)){
+            if(outside < 0 && conflict(k, x, y)) outside = k;
+            continue;
+        }
+        const int *v = triangles[k].v;
+        if(orient(v[0], v[1], x, y) >= 0 && orient(v[1], v[2], x, y) >= 0
+                && orient(v[2], v[0], x, y) >= 0){
+            return k;
+        }
+    }
+    return outside;
+}
+
+// puts pending point v into the triangulation, or hides it if there already
+// is a point at the same place
+void DelaunayTriangulation::insert_point(int v){
+    double x = points[v].x, y = points[v].y;
+    int t = locate(x, y);
+    if(t < 0){
+        points[v].state = HIDDEN;
+        return;
+    }
+    for(int i = 0; i < 3; ++i){
+        int c = triangles[t].v[i];
+        if(c != INF && points[c].x == x && points[c].y == y){
+            points[v].state = HIDDEN;
+            return;
+        }
+    }
+
+    // the cavity of triangles in conflict, and the edges around it
+    ++stamp;
+    std::vector<int> cavity(1, t);
+    std::vector<std::pair<int, int> > boundary;  // triangle, edge index
+    triangles[t].mark = stamp;
+    for(size_t k = 0; k < cavity.size(); ++k){
+        int c = cavity[k];
+        for(int i = 0; i < 3; ++i){
+            int nb = triangles[c].n[i];
+            if(triangles[nb].mark == stamp) continue;
+            if(conflict(nb, x, y)){
+                triangles[nb].mark = stamp;
+                cavity.push_back(nb);
+            } else {
+                boundary.push_back(std::make_pair(c, i));
+            }
+        }
+    }
+
+    // fan from v to the boundary, the new triangle over edge a->b is
+    // (a, b, v), its neighbours start at b and end at a
+    std::vector<std::pair<int, int> > starting, ending;
+    std::vector<int> fan;
+    for(size_t k = 0; k < boundary.size(); ++k){
+        int c = boundary[k].first;
+        int i = boundary[k].second;
+        int a = triangles[c].v[(i + 1) % 3];
+        int b = triangles[c].v[(i + 2) % 3];
+        int nb = triangles[c].n[i];
+        int nt = new_triangle(a, b, v);
+        link(nt, 2, nb);
+        starting.push_back(std::make_pair(a, nt));
+        ending.push_back(std::make_pair(b, nt));
+        fan.push_back(nt);
+    }
+    for(size_t k = 0; k < fan.size(); ++k){
+        int nt = fan[k];
+        int b = triangles[nt].v[1];
+        for(size_t j = 0; j < starting.size(); ++j){
+            if(starting[j].first == b){
+                link(nt, 0, starting[j].second);
+                break;
+            }
+        }
+    }
+    for(size_t k = 0; k < cavity.size(); ++k){
+        free_triangle(cavity[k]);
+    }
+    for(size_t k = 0; k < fan.size(); ++k){
+        int nt = fan[k];
+        for(int i = 0; i < 3; ++i){
+            int c = triangles[nt].v[i];
+            if(c != INF) points[c].tri = nt;
+        }
+        if(!is_ghost(nt)) last = nt;
+    }
+    if(last < 0 || !triangles[last].alive) last = fan[0];
+    points[v].state = MESH;
+}
+
+// the triangles around mesh point v, counterclockwise
+void DelaunayTriangulation::star(int v, std::vector<int> &around) const{
+    around.clear();
+    int first = points[v].tri;
+    int t = first;
+    do {
+        around.push_back(t);
+        const Triangle &tri = triangles[t];
+        int i = tri.v[0] == v ? 0 : (tri.v[1] == v ? 1 : 2);
+        t = tri.n[(i + 1) % 3];
+    } while(t != first && around.size() <= triangles.size());
+}
+
+// fills the hole mesh point v leaves behind, false if it can't be done
+// without making the triangulation degenerate
+bool DelaunayTriangulation::remove_point(int v){
+    std::vector<int> around;
+    star(v, around);
+    size_t k = around.size();
+    // the link of v, counterclockwise, and the triangles across its edges
+    std::vector<int> poly(k), outer(k);
+    int nghosts = 0;
+    for(size_t j = 0; j < k; ++j){
+        const Triangle &tri = triangles[around[j]];
+        int i = tri.v[0] == v ? 0 : (tri.v[1] == v ? 1 : 2);
+        poly[j] = tri.v[(i + 1) % 3];
+        outer[j] = tri.n[i];
+        if(tri.v[0] == INF || tri.v[1] == INF || tri.v[2] == INF) ++nghosts;
+    }
+    double x = points[v].x, y = points[v].y;
+
+    // plan the ears first, so nothing is changed if it doesn't work out
+    std::vector<int> ears;
+    std::vector<int> rest(poly);
+    bool hull = nghosts > 0;
+    int made = 0;  // real triangles
+    while(rest.size() > 3 || (hull && rest.size() > 2)){
+        size_t n = rest.size();
+        int best = -1;
+        double highest = 0;
+        for(size_t j = 0; j < n; ++j){
+            int a = rest[(j + n - 1) % n], b = rest[j], c = rest[(j + 1) % n];
+            if(a == INF || b == INF || c == INF) continue;
+            double o = orient(a, b, points[c].x, points[c].y);
+            if(o <= 0) continue;
+            // the power of v with respect to the circle of the ear
+            double power = -incircle(a, b, c, x, y) / o;
+            if(best < 0 || power > highest){
+                best = j;
+                highest = power;
+            }
+        }
+        if(best < 0) break;
+        ears.push_back(rest[best]);
+        rest.erase(rest.begin() + best);
+        ++made;
+    }
+    if(!hull){
+        if(rest.size() != 3) return false;
+        int a = rest[0], b = rest[1], c = rest[2];
+        if(orient(a, b, points[c].x, points[c].y) <= 0) return false;
+        ++made;
+    }
+    int real_left = nreal - ((int)k - nghosts) + made;
+    if(real_left <= 0) return false;
+
+    // now for real
+    for(size_t j = 0; j < k; ++j){
+        free_triangle(around[j]);
+    }
+    std::vector<int> created;
+    for(size_t e = 0; e < ears.size(); ++e){
+        size_t n = poly.size();
+        size_t j = 0;
+        while(poly[j] != ears[e]) ++j;
+        size_t before = (j + n - 1) % n;
+        int a = poly[before], b = poly[j], c = poly[(j + 1) % n];
+        int nt = new_triangle(a, b, c);
+        link(nt, 2, outer[before]);
+        link(nt, 0, outer[j]);
+        created.push_back(nt);
+        outer[before] = nt;
+        poly.erase(poly.begin() + j);
+        outer.erase(outer.begin() + j);
+    }
+    if(!hull){
+        int nt = new_triangle(poly[0], poly[1], poly[2]);
+        link(nt, 2, outer[0]);
+        link(nt, 0, outer[1]);
+        link(nt, 1, outer[2]);
+        created.push_back(nt);
+    } else {
+        // ghosts over the rest of the hull, poly[j] == INF is the start
+        size_t n = poly.size();
+        size_t j = 0;
+        while(poly[j] != INF) ++j;
+        int previous = outer[j];  // across INF, first
+        for(size_t m = 1; m + 1 < n; ++m){
+            size_t i = (j + m) % n;
+            int nt = new_triangle(poly[i], poly[(i + 1) % n], INF);
+            link(nt, 2, outer[i]);
+            link(nt, 1, previous);
+            created.push_back(nt);
+            previous = nt;
+        }
+        link(previous, 0, outer[(j + n - 1) % n]);
+    }
+    for(size_t e = 0; e < created.size(); ++e){
+        int nt = created[e];
+        for(int i = 0; i < 3; ++i){
+            int c = triangles[nt].v[i];
+            if(c != INF) points[c].tri = nt;
+        }
+        if(!is_ghost(nt)) last = nt;
+    }
+    if(!triangles[last].alive) last = created[0];
+    return true;
+}
+
+// moves mesh point v if the triangulation stays Delaunay without changing
+// anything else
+bool DelaunayTriangulation::relocate(int v, double x, double y){
+    for(size_t k = 0; k < points.size(); ++k){
+        if(points[k].state == HIDDEN
+                && points[k].x == points[v].x && points[k].y == points[v].y){
+            return false;
+        }
+    }
+    std::vector<int> around;
+    star(v, around);
+    for(size_t k = 0; k < around.size(); ++k){
+        if(is_ghost(around[k])) return false;
+        const Triangle &tri = triangles[around[k]];
+        int i = tri.v[0] == v ? 0 : (tri.v[1] == v ? 1 : 2);
+        int a = tri.v[(i + 1) % 3], b = tri.v[(i + 2) % 3];
+        if(orient(a, b, x, y) <= 0) return false;
+    }
+    for(size_t k = 0; k < around.size(); ++k){
+        const Triangle &tri = triangles[around[k]];
+        int i = tri.v[0] == v ? 0 : (tri.v[1] == v ? 1 : 2);
+        int a = tri.v[(i + 1) % 3], b = tri.v[(i + 2) % 3];
+        for(int e = 0; e < 3; ++e){
+            int nb = tri.n[e];
+            int d = triangles[nb].v[edge_index(nb, tri.v[(e + 1) % 3],
+                                               tri.v[(e + 2) % 3])];
+            if(d == INF || d == v) continue;
+            // (v, a, b) with v at x, y against d
+            double pvx = points[v].x, pvy = points[v].y;
+            points[v].x = x;
+            points[v].y = y;
+            bool inside = incircle(v, a, b, points[d].x, points[d].y) > 0;
+            points[v].x = pvx;
+            points[v].y = pvy;
+            if(inside) return false;
+        }
+    }
+    points[v].x = x;
+    points[v].y = y;
+    return true;
+}
+
+// takes mesh point v out of the triangulation, and puts the points that were
+// hidden under it back in
+void DelaunayTriangulation::take_out(int v){
+    if(remove_point(v)){
+        points[v].state = FREE;
+    } else {
+        points[v].state = FREE;
+        rebuild();
+    }
+    double x = points[v].x, y = points[v].y;
+    for(size_t k = 0; k < points.size(); ++k){
+        if(points[k].state == HIDDEN && points[k].x == x && points[k].y == y){
+            points[k].state = PENDING;
+            if(meshed){
+                insert_point(k);
+            }
+        }
+    }
+    if(!meshed){
+        start_mesh();
+    }
+}
+
+// starts the triangulation once there are three pending points that aren't
+// on a line, and puts in the rest of the pending points
+void DelaunayTriangulation::start_mesh(){
+    if(meshed) return;
+    int a = -1, b = -1, c = -1;
+    for(size_t k = 0; k < points.size() && c < 0; ++k){
+        if(points[k].state != PENDING) continue;
+        const Point &p = points[k];
+        if(a < 0){
+            a = k;
+        } else if(b < 0){
+            if(p.x != points[a].x || p.y != points[a].y) b = k;
+        } else if(orient(a, b, p.x, p.y) != 0){
+            c = k;
+        }
+    }
+    if(c < 0) return;
+    if(orient(a, b, points[c].x, points[c].y) < 0){
+        std::swap(b, c);
+    }
+    int t = new_triangle(a, b, c);
+    int gab = new_triangle(b, a, INF);
+    int gbc = new_triangle(c, b, INF);
+    int gca = new_triangle(a, c, INF);
+    link(t, 2, gab);
+    link(t, 0, gbc);
+    link(t, 1, gca);
+    link(gab, 0, gca);
+    link(gab, 1, gbc);
+    link(gbc, 0, gab);
+    link(gbc, 1, gca);
+    points[a].tri = points[b].tri = points[c].tri = t;
+    points[a].state = points[b].state = points[c].state = MESH;
+    last = t;
+    meshed = true;
+    for(size_t k = 0; k < points.size(); ++k){
+        if(points[k].state == PENDING){
+            insert_point(k);
+        }
+    }
+}
+
+// triangulates all the points again from scratch
+void DelaunayTriangulation::rebuild(){
+    triangles.clear();
+    free_triangles.clear();
+    nreal = 0;
+    last = -1;
+    meshed = false;
+    for(size_t k = 0; k < points.size(); ++k){
+        if(points[k].state != FREE){
+            points[k].state = PENDING;
+        }
+    }
+    start_mesh();
+}
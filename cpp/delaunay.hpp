@@ -0,0 +1,86 @@
+#ifndef _DELAUNAY_HPP
+#define _DELAUNAY_HPP
+
+#include <vector>
+
+// Delaunay triangulation that is kept up to date as points are inserted,
+// moved and removed, for sets of points where most stay put between
+// updates.
+//
+// Points are inserted with Bowyer-Watson: the triangles whose circumcircle
+// contains the new point are replaced by a fan from it. Removed points leave
+// a hole that is filled in again ear by ear, taking the ear whose circle has
+// the highest power with respect to the removed point (Devillers), which keeps
+// the triangulation Delaunay. Moving a point only changes its coordinates if
+// its triangles stay Delaunay, and removes and inserts it otherwise.
+//
+// The convex hull is closed with ghost triangles to a vertex at infinity, so
+// points can go anywhere. Points stay out of the triangulation while there
+// are no three points that aren't on a line, and while they are on top of
+// another point.
+//
+// Every point has an id, given by insert, that stays the same until it is
+// removed. Triangles are given as rows of three ids in counterclockwise
+// order.
+class DelaunayTriangulation {
+public:
+    DelaunayTriangulation();
+    int insert(double x, double y);
+    void remove(int v);
+    void move(int v, double x, double y);
+    void clear();
+
+    bool contains(int v) const;
+    double x(int v) const;
+    double y(int v) const;
+    int num_points() const;
+    int num_triangles() const;
+    bool get_triangles(int *out, int nout) const;
+    // the triangles with point v as their first corner, counterclockwise
+    // around it
+    int num_incident(int v) const;
+    bool get_incident(int v, int *out, int nout) const;
+private:
+    enum State {FREE, PENDING, MESH, HIDDEN};
+    struct Point {
+        double x, y;
+        State state;
+        int tri;  // a triangle with the point as a corner, in the mesh
+    };
+    struct Triangle {
+        int v[3];  // counterclockwise, INF for the vertex at infinity
+        int n[3];  // neighbour across the edge opposite v[i]
+        bool alive;
+        int mark;
+    };
+    static const int INF = -1;
+
+    bool is_ghost(int t) const;
+    int new_triangle(int a, int b, int c);
+    void free_triangle(int t);
+    void link(int t, int i, int other);
+    int edge_index(int t, int a, int b) const;
+    double orient(int a, int b, double x, double y) const;
+    double incircle(int a, int b, int c, double x, double y) const;
+    bool conflict(int t, double x, double y) const;
+
+    int locate(double x, double y) const;
+    void insert_point(int v);
+    bool remove_point(int v);
+    bool relocate(int v, double x, double y);
+    void take_out(int v);
+    void star(int v, std::vector<int> &triangles) const;
+    void start_mesh();
+    void rebuild();
+
+    std::vector<Point> points;
+    std::vector<int> free_ids;
+    std::vector<Triangle> triangles;
+    std::vector<int> free_triangles;
+    int npoints, nreal;
+    int last;  // recently made triangle, where point location starts
+    int stamp;  // for marking triangles
+    bool meshed;
+};
+
+#endif
@@ -0,0 +1,389 @@
+#include <cmath>
+#include <limits>
+#include <algorithm>
+#include "dstarlite.hpp"
+
+static const float INF = std::numeric_limits<float>::infinity();
+// side of the grid cells for nodes_near and edges_near
+static const float GRID_CELL = 32;
+static const size_t MIN_GRID_CAPACITY = 64;
+
+static float segment_distance2(float ax, float ay, float bx, float by, float px, float py){
+    float dx = bx - ax, dy = by - ay;
+    float len2 = dx*dx + dy*dy;
+    float t = 0;
+    if(len2 > 0)
+        t = std::max(0.0f, std::min(1.0f, ((px - ax)*dx + (py - ay)*dy)/len2));
+    float cx = ax + t*dx - px, cy = ay + t*dy - py;
+    return cx*cx + cy*cy;
+}
+
+DStarLite::DStarLite()
+    :speed(0),
+    start(-1),
+    goal(-1),
+    initialized(false),
+    km(0),
+    grid_capacity(MIN_GRID_CAPACITY)
+{
+    node_grid.reset(GRID_CELL, grid_capacity);
+    edge_grid.reset(GRID_CELL, grid_capacity);
+}
+
+bool DStarLite::valid_node(int node) const{
+    return node >= 0 && node < num_nodes();
+}
+
+bool DStarLite::valid_edge(int edge) const{
+    return edge >= 0 && edge < (int)edges.size() && edges[edge].alive;
+}
+
+int DStarLite::add_node(float x_, float y_){
+    x.push_back(x_);
+    y.push_back(y_);
+    out.push_back(std::vector<int>());
+    in.push_back(std::vector<int>());
+    g.push_back(INF);
+    rhs.push_back(INF);
+    queued_key.push_back(Key(INF, INF));
+    queued.push_back(false);
+    node_grid.insert(num_nodes() - 1, Vec2d(x_, y_));
+    grow_grids();
+    return num_nodes() - 1;
+}
+
+void DStarLite::move_node(int node, float x_, float y_){
+    if(!valid_node(node))
+        return;
+    if(initialized && node == start && speed > 0)
+        km += distance_heuristic(x[node], y[node], x_, y_, speed);
+    for(size_t i = 0; i<out[node].size(); ++i)
+        grid_edge(out[node][i], false);
+    for(size_t i = 0; i<in[node].size(); ++i)
+        grid_edge(in[node][i], false);
+    node_grid.move(node, Vec2d(x[node], y[node]), Vec2d(x_, y_));
+    x[node] = x_;
+    y[node] = y_;
+    for(size_t i = 0; i<out[node].size(); ++i)
+        grid_edge(out[node][i], true);
+    for(size_t i = 0; i<in[node].size(); ++i)
+        grid_edge(in[node][i], true);
+    if(initialized && node != start && queued[node])
+        enqueue(node); // its key depends on its own position
+}
+
+float DStarLite::node_x(int node) const{
+    return valid_node(node) ? x[node] : 0;
+}
+
+float DStarLite::node_y(int node) const{
+    return valid_node(node) ? y[node] : 0;
+}
+
+int DStarLite::add_edge(int from, int to, float cost){
+    if(!valid_node(from) || !valid_node(to))
+        return -1;
+    int edge;
+    if(free_edges.empty()){
+        edge = (int)edges.size();
+        edges.push_back(DEdge());
+    } else {
+        edge = free_edges.back();
+        free_edges.pop_back();
+    }
+    DEdge &e = edges[edge];
+    e.from = from;
+    e.to = to;
+    e.cost = cost;
+    e.alive = true;
+    out[from].push_back(edge);
+    in[to].push_back(edge);
+    grid_edge(edge, true);
+    grow_grids();
+    if(initialized)
+        update_vertex(from);
+    return edge;
+}
+
+void DStarLite::set_edge_cost(int edge, float cost){
+    if(!valid_edge(edge) || edges[edge].cost == cost)
+        return;
+    edges[edge].cost = cost;
+    if(initialized)
+        update_vertex(edges[edge].from);
+}
+
+void DStarLite::unlink(std::vector<int> &list, int edge){
+    for(size_t i = 0; i<list.size(); ++i){
+        if(list[i] == edge){
+            list[i] = list.back();
+            list.pop_back();
+            return;
+        }
+    }
+}
+
+void DStarLite::remove_edge(int edge){
+    if(!valid_edge(edge))
+        return;
+    grid_edge(edge, false);
+    DEdge &e = edges[edge];
+    e.alive = false;
+    unlink(out[e.from], edge);
+    unlink(in[e.to], edge);
+    free_edges.push_back(edge);
+    if(initialized)
+        update_vertex(e.from);
+}
+
+void DStarLite::remove_edges(int node){
+    if(!valid_node(node))
+        return;
+    while(!out[node].empty())
+        remove_edge(out[node].back());
+    while(!in[node].empty())
+        remove_edge(in[node].back());
+}
+
+float DStarLite::edge_cost(int edge) const{
+    return valid_edge(edge) ? edges[edge].cost : INF;
+}
+
+int DStarLite::edge_source(int edge) const{
+    return valid_edge(edge) ? edges[edge].from : -1;
+}
+
+int DStarLite::edge_target(int edge) const{
+    return valid_edge(edge) ? edges[edge].to : -1;
+}
+
+int DStarLite::num_nodes() const{
+    return (int)x.size();
+}
+
+int DStarLite::num_edges() const{
+    return (int)(edges.size() - free_edges.size());
+}
+
+void DStarLite::set_heuristic(float speed_){
+    speed = speed_;
+    initialized = false;
+}
+
+void DStarLite::set_start(int start_){
+    if(initialized && valid_node(start) && valid_node(start_))
+        km += heuristic(start, start_);
+    start = start_;
+}
+
+void DStarLite::set_goal(int goal_){
+    goal = goal_;
+    initialized = false;
+}
+
+void DStarLite::edge_cells(int edge, std::vector<Vec2d> &centers) const{
+    // the centers of the cells the edge passes through, column by column
+    centers.clear();
+    const DEdge &e = edges[edge];
+    double ax = x[e.from], ay = y[e.from], bx = x[e.to], by = y[e.to];
+    if(ax > bx){
+        std::swap(ax, bx);
+        std::swap(ay, by);
+    }
+    double dx = bx - ax;
+    int c0 = (int)std::floor(ax/GRID_CELL), c1 = (int)std::floor(bx/GRID_CELL);
+    for(int c = c0; c <= c1; ++c){
+        double y0 = ay, y1 = by;
+        if(dx > 0){
+            double xl = std::max(ax, (double)c*GRID_CELL);
+            double xr = std::min(bx, (double)(c+1)*GRID_CELL);
+            y0 = ay + (by - ay)*(xl - ax)/dx;
+            y1 = ay + (by - ay)*(xr - ax)/dx;
+        }
+        if(y0 > y1)
+            std::swap(y0, y1);
+        // a little slack to be safe from rounding errors
+        int r0 = (int)std::floor(y0/GRID_CELL - 1e-6), r1 = (int)std::floor(y1/GRID_CELL + 1e-6);
+        for(int r = r0; r <= r1; ++r)
+            centers.push_back(Vec2d((c + 0.5)*GRID_CELL, (r + 0.5)*GRID_CELL));
+    }
+}
+
+void DStarLite::grid_edge(int edge, bool insert){
+    std::vector<Vec2d> centers;
+    edge_cells(edge, centers);
+    for(size_t i = 0; i<centers.size(); ++i){
+        if(insert)
+            edge_grid.insert(edge, centers[i]);
+        else
+            edge_grid.remove(edge, centers[i]);
+    }
+}
+
+void DStarLite::grow_grids(){
+    // the hashes have a fixed number of buckets, rebuild them larger as the graph grows
+    if(node_grid.size() <= grid_capacity && edge_grid.size() <= grid_capacity)
+        return;
+    while(node_grid.size() > grid_capacity || edge_grid.size() > grid_capacity)
+        grid_capacity *= 2;
+    node_grid.reset(GRID_CELL, grid_capacity);
+    edge_grid.reset(GRID_CELL, grid_capacity);
+    for(int i = 0; i<num_nodes(); ++i)
+        node_grid.insert(i, Vec2d(x[i], y[i]));
+    for(size_t i = 0; i<edges.size(); ++i){
+        if(edges[i].alive)
+            grid_edge((int)i, true);
+    }
+}
+
+std::vector<int> DStarLite::nodes_near(float px, float py, float range) const{
+    std::vector<int> candidates, result;
+    node_grid.query(Vec2d(px, py), range, candidates);
+    float range2 = range*range;
+    for(size_t j = 0; j<candidates.size(); ++j){
+        int i = candidates[j];
+        float dx = x[i] - px, dy = y[i] - py;
+        if(dx*dx + dy*dy <= range2)
+            result.push_back(i);
+    }
+    return result;
+}
+
+std::vector<int> DStarLite::edges_near(float px, float py, float range) const{
+    std::vector<int> candidates, result;
+    edge_grid.query(Vec2d(px, py), range, candidates);
+    float range2 = range*range;
+    for(size_t j = 0; j<candidates.size(); ++j){
+        const DEdge &e = edges[candidates[j]];
+        if(e.alive && segment_distance2(x[e.from], y[e.from], x[e.to], y[e.to], px, py) <= range2)
+            result.push_back(candidates[j]);
+    }
+    return result;
+}
+
+float DStarLite::heuristic(int a, int b) const{
+    if(!(speed > 0))
+        return 0;
+    return distance_heuristic(x[a], y[a], x[b], y[b], speed);
+}
+
+DStarLite::Key DStarLite::calculate_key(int node) const{
+    float m = std::min(g[node], rhs[node]);
+    return Key(m + heuristic(start, node) + km, m);
+}
+
+void DStarLite::enqueue(int node){
+    dequeue(node);
+    queued_key[node] = calculate_key(node);
+    queued[node] = true;
+    queue.insert(std::make_pair(queued_key[node], node));
+}
+
+void DStarLite::dequeue(int node){
+    if(!queued[node])
+        return;
+    queue.erase(std::make_pair(queued_key[node], node));
+    queued[node] = false;
+}
+
+void DStarLite::update_vertex(int node){
+    if(node != goal){
+        float best = INF;
+        const std::vector<int> &succ = out[node];
+        for(size_t i = 0; i<succ.size(); ++i){
+            const DEdge &e = edges[succ[i]];
+            best = std::min(best, e.cost + g[e.to]);
+        }
+        rhs[node] = best;
+    }
+    if(g[node] != rhs[node])
+        enqueue(node);
+    else
+        dequeue(node);
+}
+
+void DStarLite::initialize(){
+    std::fill(g.begin(), g.end(), INF);
+    std::fill(rhs.begin(), rhs.end(), INF);
+    std::fill(queued.begin(), queued.end(), false);
+    queue.clear();
+    km = 0;
+    rhs[goal] = 0;
+    enqueue(goal);
+    initialized = true;
+}
+
+int DStarLite::compute_shortest_path(){
+    int expanded = 0;
+    while(!queue.empty()){
+        Key top = queue.begin()->first;
+        if(!(top < calculate_key(start)) && rhs[start] == g[start])
+            break;
+        int node = queue.begin()->second;
+        Key key = calculate_key(node);
+        if(top < key){ // km or positions changed since it was queued
+            enqueue(node);
+            continue;
+        }
+        dequeue(node);
+        ++expanded;
+        const std::vector<int> &pred = in[node];
+        if(g[node] > rhs[node]){
+            g[node] = rhs[node];
+        } else {
+            g[node] = INF;
+            update_vertex(node);
+        }
+        for(size_t i = 0; i<pred.size(); ++i)
+            update_vertex(edges[pred[i]].from);
+    }
+    return expanded;
+}
+
+Path DStarLite::shortest_path(){
+    Path result;
+    result.success = false;
+    result.total_cost = 0;
+    result.expanded = 0;
+    if(!valid_node(start) || !valid_node(goal))
+        return result;
+    if(!initialized)
+        initialize();
+    result.expanded = compute_shortest_path();
+    if(!(g[start] < INF))
+        return result;
+
+    // follow the cheapest successors down to the goal
+    int node = start;
+    result.indices.push_back(node);
+    while(node != goal){
+        int best = -1;
+        float best_cost = INF, edge = 0;
+        const std::vector<int> &succ = out[node];
+        for(size_t i = 0; i<succ.size(); ++i){
+            const DEdge &e = edges[succ[i]];
+            float c = e.cost + g[e.to];
+            if(c < best_cost || (c == best_cost && best != -1 && e.to < best)){
+                best = e.to;
+                best_cost = c;
+                edge = e.cost;
+            }
+        }
+        if(best == -1 || (int)result.indices.size() > num_nodes()){
+            result.indices.clear();
+            result.total_cost = 0;
+            return result;
+        }
+        result.total_cost += edge;
+        result.indices.push_back(best);
+        node = best;
+    }
+    result.success = true;
+    return result;
+}
+
+float DStarLite::cost_to_goal(int node) const{
+    if(!initialized || !valid_node(node))
+        return INF;
+    return g[node];
+}
@@ -0,0 +1,90 @@
+#ifndef _DSTARLITE_HPP
+#define _DSTARLITE_HPP
+
+#include <set>
+#include <vector>
+#include <utility>
+#include "astar.hpp"
+#include "spatialhash.hpp"
+
+/*
+Incremental shortest paths (D* Lite, Koenig & Likhachev 2002) on a graph that
+is edited between searches. The search runs backwards from the goal and keeps
+its cost-to-goal estimates between calls to shortest_path(), so after edges are
+added, removed or change cost, or the start moves, only the part of the search
+tree that is affected gets repaired instead of searching from scratch.
+
+Edge costs are given by the caller (infinity blocks an edge), node positions
+only feed the heuristic: distance / speed, which must not overestimate the
+cost. Edge ids stay valid until the edge is removed, after which they may be
+reused by add_edge(). Nodes and edges are kept in grids (an edge in every
+cell it passes through) so the range queries only look at the cells nearby.
+*/
+class DStarLite {
+public:
+    DStarLite();
+    int add_node(float x, float y);
+    // moving the start node is cheap, moving other nodes requeues them
+    void move_node(int node, float x, float y);
+    float node_x(int node) const;
+    float node_y(int node) const;
+    int add_edge(int from, int to, float cost);
+    void set_edge_cost(int edge, float cost);
+    void remove_edge(int edge);
+    // removes all edges to and from node
+    void remove_edges(int node);
+    float edge_cost(int edge) const;
+    int edge_source(int edge) const;
+    int edge_target(int edge) const;
+    int num_nodes() const;
+    int num_edges() const;
+    // speed 0 searches without a heuristic, changing it restarts the search
+    void set_heuristic(float speed);
+    void set_start(int start);
+    // changing the goal restarts the search
+    void set_goal(int goal);
+    // nodes within range of (x, y), and edges passing within range of it
+    std::vector<int> nodes_near(float x, float y, float range) const;
+    std::vector<int> edges_near(float x, float y, float range) const;
+    // path from the start to the goal, expanded counts this call only
+    Path shortest_path();
+    // cost of the cheapest path from node to the goal found so far
+    float cost_to_goal(int node) const;
+private:
+    typedef std::pair<float, float> Key;
+    struct DEdge {
+        int from, to;
+        float cost;
+        bool alive;
+    };
+    bool valid_node(int node) const;
+    bool valid_edge(int edge) const;
+    float heuristic(int a, int b) const;
+    Key calculate_key(int node) const;
+    void update_vertex(int node);
+    void enqueue(int node);
+    void dequeue(int node);
+    int compute_shortest_path();
+    void initialize();
+    void unlink(std::vector<int> &edges, int edge);
+    void edge_cells(int edge, std::vector<Vec2d> &centers) const;
+    void grid_edge(int edge, bool insert);
+    void grow_grids();
+
+    std::vector<float> x, y;
+    std::vector<DEdge> edges;
+    std::vector<int> free_edges;
+    std::vector<std::vector<int> > out, in;
+    float speed;
+    int start, goal;
+    bool initialized;
+    float km;
+    std::vector<float> g, rhs;
+    std::vector<Key> queued_key;
+    std::vector<bool> queued;
+    std::set<std::pair<Key, int> > queue;
+    SpatialHash node_grid, edge_grid;
+    size_t grid_capacity;
+};
+
+#endif
@@ -0,0 +1,92 @@
+#include <algorithm>
+#include "freepaths.hpp"
+#include "geometry.hpp"
+
+FreePathChecker::FreePathChecker()
+    :max_radius(0),
+    dirty(true)
+{
+}
+
+void FreePathChecker::set_obstacles(const float *o, int n){
+    obstacles.resize(n / 4);
+    for(size_t i = 0; i<obstacles.size(); ++i)
+        obstacles[i] = Segment(Vec2d(o[4*i], o[4*i + 1]), Vec2d(o[4*i + 2], o[4*i + 3]));
+    dirty = true;
+}
+
+void FreePathChecker::set_pedestrians(const float *p, int n){
+    pedestrians.resize(n / 3);
+    radii.resize(n / 3);
+    max_radius = 0;
+    for(size_t i = 0; i<pedestrians.size(); ++i){
+        pedestrians[i] = Vec2d(p[3*i], p[3*i + 1]);
+        radii[i] = p[3*i + 2];
+        max_radius = std::max(max_radius, radii[i]);
+    }
+    dirty = true;
+}
+
+void FreePathChecker::build(){
+    std::vector<Segment> all(obstacles);
+    for(size_t i = 0; i<pedestrians.size(); ++i)
+        all.push_back(Segment(pedestrians[i], pedestrians[i]));
+    grid.build(all);
+    dirty = false;
+}
+
+bool FreePathChecker::free_path(const Vec2d &p1, const Vec2d &p2, double safe_distance){
+    /*
+    Same tests (and same float/double roundings) as graphbuilder.free_path
+    */
+    return clear(p1, p2, safe_distance, true);
+}
+
+bool FreePathChecker::traversable(const Vec2d &p1, const Vec2d &p2, double min_distance){
+    return clear(p1, p2, min_distance, false);
+}
+
+bool FreePathChecker::clear(const Vec2d &p1, const Vec2d &p2, double safe_distance, bool touching_blocks){
+    if(dirty)
+        build();
+    float margin = (float)(safe_distance + max_radius) + 1; // slack for rounding
+    grid.query_box(std::min(p1.x, p2.x) - margin, std::min(p1.y, p2.y) - margin,
+                   std::max(p1.x, p2.x) + margin, std::max(p1.y, p2.y) + margin, candidates);
+    int nobstacles = (int)obstacles.size();
+    double safe2 = safe_distance*safe_distance;
+    for(size_t k = 0; k<candidates.size(); ++k){
+        int id = candidates[k];
+        if(id < nobstacles){
+            double d2 = line_distance2(p1, p2, obstacles[id].first, obstacles[id].second);
+            if(d2 < safe2 || (touching_blocks && d2 == safe2))
+                return false;
+        } else {
+            id -= nobstacles;
+            double d = safe_distance + radii[id];
+            double d2 = linesegdist2(p1, p2, pedestrians[id]);
+            if(d2 < d*d || (touching_blocks && d2 == d*d))
+                return false;
+        }
+    }
+    return true;
+}
+
+bool FreePathChecker::free_paths(const float *s, int nsegments, double safe_distance,
+                                 bool *mask, int nmask){
+    return check_paths(s, nsegments, safe_distance, mask, nmask, true);
+}
+
+bool FreePathChecker::traversable_paths(const float *s, int nsegments, double min_distance,
+                                        bool *mask, int nmask){
+    return check_paths(s, nsegments, min_distance, mask, nmask, false);
+}
+
+bool FreePathChecker::check_paths(const float *s, int nsegments, double safe_distance,
+                                  bool *mask, int nmask, bool touching_blocks){
+    if(nsegments % 4 != 0 || nmask != nsegments / 4)
+        return false;
+    for(int i = 0; i<nmask; ++i)
+        mask[i] = clear(Vec2d(s[4*i], s[4*i + 1]), Vec2d(s[4*i + 2], s[4*i + 3]),
+                        safe_distance, touching_blocks);
+    return true;
+}
@@ -0,0 +1,45 @@
+#ifndef _FREEPATHS_HPP
+#define _FREEPATHS_HPP
+
+#include <vector>
+#include "vector2d.hpp"
+#include "segmentgrid.hpp"
+
+// Batched version of graphbuilder.free_path(): checks many candidate path
+// segments against the same obstacles and pedestrians. Both are kept in one
+// SegmentGrid (pedestrians as zero length segments) that is rebuilt when
+// either of them is set, so every path is only tested against what is close
+// to it.
+class FreePathChecker {
+public:
+    FreePathChecker();
+    // rows of x1, y1, x2, y2
+    void set_obstacles(const float *obstacles, int nobstacles);
+    // rows of x, y, radius
+    void set_pedestrians(const float *pedestrians, int npedestrians);
+    // mask[i] is set to whether path segment i (a row of x1, y1, x2, y2) keeps
+    // more than safe_distance from every obstacle, and more than safe_distance
+    // plus the radius from every pedestrian. Returns false if the sizes don't match.
+    bool free_paths(const float *segments, int nsegments, double safe_distance,
+                    bool *mask, int nmask);
+    bool free_path(const Vec2d &p1, const Vec2d &p2, double safe_distance);
+    // Same, but only paths closer than (instead of at most) min_distance are
+    // blocked, like the traversability test of the Arty roadmap
+    bool traversable_paths(const float *segments, int nsegments, double min_distance,
+                           bool *mask, int nmask);
+    bool traversable(const Vec2d &p1, const Vec2d &p2, double min_distance);
+private:
+    void build();
+    bool check_paths(const float *s, int nsegments, double safe_distance,
+                     bool *mask, int nmask, bool touching_blocks);
+    bool clear(const Vec2d &p1, const Vec2d &p2, double safe_distance, bool touching_blocks);
+    std::vector<Segment> obstacles;
+    std::vector<Vec2d> pedestrians;
+    std::vector<float> radii;
+    float max_radius;
+    bool dirty;
+    SegmentGrid grid; // obstacles first, then pedestrians
+    std::vector<int> candidates;
+};
+
+#endif
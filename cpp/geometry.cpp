@@ -43,10 +43,68 @@ float angle_diff(float a1, float a2){
     /*
     Returns angle difference a1 - a2 in an interval between -2pi and 2pi regardless of the absolute value of the inputs
     */ 
-    float anglediff = (float)fmod(a1 - a2, 2*M_PI);
+    float anglediff = a1 - a2;
+    if(!(std::abs(anglediff) < 2*M_PI)) // fmod is the identity below 2pi, skip the call
+        anglediff = (float)fmod(anglediff, 2*M_PI);
     if(anglediff > M_PI)
         anglediff -= 2*(float)M_PI;
     else if (anglediff < -M_PI)
         anglediff += 2*(float)M_PI;
     return anglediff;
 }
+
+// linesegdist2 and line_distance2 for the array functions, taking a segment
+// of zero length as a point instead of giving nan
+static float point_or_segdist2(const Vec2d &l1, const Vec2d &l2, const Vec2d &p){
+    if(l1.x == l2.x && l1.y == l2.y)
+        return l1.distance_to2(p);
+    return linesegdist2(l1, l2, p);
+}
+
+static float point_or_line_distance2(const Vec2d &l11, const Vec2d &l12, const Vec2d &l21, const Vec2d &l22){
+    if (_sign((l21 - l11).cross(l22 - l11)) != _sign((l21 - l12).cross(l22 - l12)) &&
+        _sign((l11 - l21).cross(l12 - l21)) != _sign((l11 - l22).cross(l12 - l22)))
+        return 0;
+    float dists[] = {point_or_segdist2(l11, l12, l21), point_or_segdist2(l11, l12, l22),
+        point_or_segdist2(l21, l22, l11), point_or_segdist2(l21, l22, l12)};
+    return *std::min_element(dists, dists+4);
+}
+
+bool linesegdist2_matrix(const float *points, int npoints, const float *segments, int nsegments,
+                         float *out, int nout){
+    int n = npoints/2, m = nsegments/4;
+    if(npoints % 2 != 0 || nsegments % 4 != 0 || nout != n*m)
+        return false;
+    for(int i = 0; i<n; ++i){
+        Vec2d p(points[2*i], points[2*i + 1]);
+        for(int j = 0; j<m; ++j){
+            const float *s = segments + 4*j;
+            out[i*m + j] = point_or_segdist2(Vec2d(s[0], s[1]), Vec2d(s[2], s[3]), p);
+        }
+    }
+    return true;
+}
+
+bool line_distance2_matrix(const float *segments1, int nsegments1, const float *segments, int nsegments,
+                           float *out, int nout){
+    int n = nsegments1/4, m = nsegments/4;
+    if(nsegments1 % 4 != 0 || nsegments % 4 != 0 || nout != n*m)
+        return false;
+    for(int i = 0; i<n; ++i){
+        const float *a = segments1 + 4*i;
+        Vec2d a1(a[0], a[1]), a2(a[2], a[3]);
+        for(int j = 0; j<m; ++j){
+            const float *s = segments + 4*j;
+            out[i*m + j] = point_or_line_distance2(a1, a2, Vec2d(s[0], s[1]), Vec2d(s[2], s[3]));
+        }
+    }
+    return true;
+}
+
+bool angle_diff_array(const float *a1, int na1, const float *a2, int na2, float *out, int nout){
+    if(na1 != na2 || na1 != nout)
+        return false;
+    for(int i = 0; i<nout; ++i)
+        out[i] = angle_diff(a1[i], a2[i]);
+    return true;
+}
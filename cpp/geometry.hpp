@@ -7,4 +7,15 @@ float linesegdist2(Vec2d l1, Vec2d l2, Vec2d p);
 float line_distance2(Vec2d l11, Vec2d l12, Vec2d l21, Vec2d l22);
 float angle_diff(float a1, float a2);
 
+// Array versions of the above on flat row major arrays, points are rows of
+// x, y and segments rows of x1, y1, x2, y2. out gets one row per point (or
+// segment in segments1) with one column per segment in segments. They return
+// false, leaving out untouched, if the sizes don't add up.
+bool linesegdist2_matrix(const float *points, int npoints, const float *segments, int nsegments,
+                         float *out, int nout);
+bool line_distance2_matrix(const float *segments1, int nsegments1, const float *segments, int nsegments,
+                           float *out, int nout);
+// out[i] = angle_diff(a1[i], a2[i])
+bool angle_diff_array(const float *a1, int na1, const float *a2, int na2, float *out, int nout);
+
 #endif
\ No newline at end of file
@@ -1,9 +1,205 @@
 %module geometry
+%include "arrays.i"
 %{
 #include "geometry.hpp"
 #include "vector2d.hpp"
+#include "freepaths.hpp"
+#include "safeness.hpp"
+#include "voronoi.hpp"
+#include "delaunay.hpp"
 %}
 
 float linesegdist2(Vec2d l1, Vec2d l2, Vec2d p);
 float line_distance2(Vec2d l11, Vec2d l12, Vec2d l21, Vec2d l22);
 float angle_diff(float a1, float a2);
+
+%apply (const float *IN_ARRAY, int IN_SIZE) {
+    (const float *points, int npoints), (const float *segments, int nsegments),
+    (const float *segments1, int nsegments1),
+    (const float *a1, int na1), (const float *a2, int na2)
+};
+%apply (float *INPLACE_ARRAY, int INPLACE_SIZE) {(float *out, int nout)};
+%rename(_linesegdist2_matrix) linesegdist2_matrix;
+%rename(_line_distance2_matrix) line_distance2_matrix;
+%rename(_angle_diff_array) angle_diff_array;
+bool linesegdist2_matrix(const float *points, int npoints, const float *segments, int nsegments,
+                         float *out, int nout);
+bool line_distance2_matrix(const float *segments1, int nsegments1, const float *segments, int nsegments,
+                           float *out, int nout);
+bool angle_diff_array(const float *a1, int na1, const float *a2, int na2, float *out, int nout);
+
+%pythoncode %{
+import numpy as _numpy
+
+
+def _rows(a, columns, name):
+    """a as a contiguous float32 array with the given number of columns"""
+    a = _numpy.ascontiguousarray(a, dtype=_numpy.float32)
+    if a.size == 0:
+        return a.reshape(0, columns)
+    if a.shape[-1] != columns:
+        raise ValueError("%s should have %d coordinates per row" % (name, columns))
+    return a.reshape(-1, columns)
+
+
+def linesegdist2_matrix(points, segments):
+    """linesegdist2 from every point (rows of x, y) to every segment (rows of
+    x1, y1, x2, y2) as a len(points) x len(segments) float32 array
+
+    Segments of zero length are taken as points.
+    """
+    points = _rows(points, 2, "points")
+    segments = _rows(segments, 4, "segments")
+    out = _numpy.empty((len(points), len(segments)), dtype=_numpy.float32)
+    _linesegdist2_matrix(points.ravel(), segments.ravel(), out.ravel())
+    return out
+
+
+def line_distance2_matrix(segments1, segments2):
+    """line_distance2 between every pair of segments (rows of x1, y1, x2, y2)
+    as a len(segments1) x len(segments2) float32 array
+
+    Segments of zero length are taken as points.
+    """
+    segments1 = _rows(segments1, 4, "segments1")
+    segments2 = _rows(segments2, 4, "segments2")
+    out = _numpy.empty((len(segments1), len(segments2)), dtype=_numpy.float32)
+    _line_distance2_matrix(segments1.ravel(), segments2.ravel(), out.ravel())
+    return out
+
+
+def angle_diff_array(a1, a2):
+    """angle_diff elementwise, a1 and a2 are broadcast against each other"""
+    a1, a2 = _numpy.broadcast_arrays(_numpy.asarray(a1, dtype=_numpy.float32),
+                                     _numpy.asarray(a2, dtype=_numpy.float32))
+    out = _numpy.empty(a1.shape, dtype=_numpy.float32)
+    _angle_diff_array(_numpy.ascontiguousarray(a1).ravel(),
+                      _numpy.ascontiguousarray(a2).ravel(), out.ravel())
+    return out
+%}
+
+%apply (const float *IN_ARRAY, int IN_SIZE) {
+    (const float *obstacles, int nobstacles), (const float *pedestrians, int npedestrians),
+    (const float *segments, int nsegments)
+};
+%apply (bool *INPLACE_ARRAY, int INPLACE_SIZE) {(bool *mask, int nmask)};
+
+class FreePathChecker {
+public:
+    FreePathChecker();
+    void set_obstacles(const float *obstacles, int nobstacles);
+    void set_pedestrians(const float *pedestrians, int npedestrians);
+    bool free_paths(const float *segments, int nsegments, double safe_distance,
+                    bool *mask, int nmask);
+    bool free_path(const Vec2d &p1, const Vec2d &p2, double safe_distance);
+    bool traversable_paths(const float *segments, int nsegments, double min_distance,
+                           bool *mask, int nmask);
+    bool traversable(const Vec2d &p1, const Vec2d &p2, double min_distance);
+};
+
+%apply (const double *IN_ARRAY, int IN_SIZE) {
+    (const double *points, int npoints), (const double *turns, int nturns),
+    (const double *segments, int nsegments)
+};
+%apply (int *INPLACE_ARRAY, int INPLACE_SIZE) {(int *fail, int nfail)};
+
+class PedestrianSafeness {
+public:
+    PedestrianSafeness();
+    void set_agent(double radius, double margin);
+    void set_pedestrians(const float *pedestrians, int npedestrians);
+    int num_pedestrians() const;
+    void predict(double slice_time, int nslices);
+    double horizon() const;
+    int static_fail(const Vec2d &position, double time) const;
+    int turn_fail(const Vec2d &position, double start_time, double end_time) const;
+    int line_fail(const Vec2d &position, const Vec2d &velocity,
+                  double start_time, double end_time) const;
+    int segment_fail(const Vec2d &p1, const Vec2d &p2, double start_time, double speed) const;
+    bool static_fails(const double *points, int npoints, int *fail, int nfail) const;
+    bool turn_fails(const double *turns, int nturns, double turningspeed,
+                    int *fail, int nfail) const;
+    bool segment_fails(const double *segments, int nsegments, double speed,
+                       int *fail, int nfail) const;
+};
+
+%apply (const double *IN_ARRAY, int IN_SIZE) {(const double *points, int npoints)};
+%apply (double *INPLACE_ARRAY, int INPLACE_SIZE) {(double *out, int nout)};
+%apply (int *INPLACE_ARRAY, int INPLACE_SIZE) {(int *out, int nout)};
+
+class Voronoi {
+public:
+    Voronoi();
+    void compute(const double *points, int npoints);
+    int num_vertices() const;
+    int num_lines() const;
+    int num_edges() const;
+    int num_triangles() const;
+    bool get_vertices(double *out, int nout) const;
+    bool get_lines(double *out, int nout) const;
+    bool get_edges(int *out, int nout) const;
+    bool get_triangles(int *out, int nout) const;
+};
+
+class DelaunayTriangulation {
+public:
+    DelaunayTriangulation();
+    int insert(double x, double y);
+    void remove(int v);
+    void move(int v, double x, double y);
+    void clear();
+    bool contains(int v) const;
+    double x(int v) const;
+    double y(int v) const;
+    int num_points() const;
+    int num_triangles() const;
+    bool get_triangles(int *out, int nout) const;
+    int num_incident(int v) const;
+    bool get_incident(int v, int *out, int nout) const;
+};
+
+%pythoncode %{
+def _voronoi(points):
+    """Voronoi of points, a sequence of points or an array of rows of x, y"""
+    if not isinstance(points, _numpy.ndarray):
+        try:
+            points = [(p.x, p.y) for p in points]
+        except AttributeError:
+            points = [tuple(p) for p in points]
+    points = _numpy.ascontiguousarray(points, dtype=_numpy.float64)
+    if points.size == 0:
+        points = points.reshape(0, 2)
+    if points.ndim != 2 or points.shape[1] != 2:
+        raise ValueError("points should have two coordinates each")
+    v = Voronoi()
+    v.compute(points.ravel())
+    return v
+
+
+def _result(count, columns, dtype, get):
+    """rows of a Voronoi result as a list of tuples"""
+    rows = _numpy.empty((count, columns), dtype=dtype)
+    get(rows.ravel())
+    return zip(*rows.T.tolist())
+
+
+def voronoi_diagram(points):
+    """The Voronoi diagram of points (Fortune's algorithm) as a tuple of:
+
+       (1) a list of 2-tuples, the x, y coordinates of the vertices
+       (2) a list of 3-tuples (a, b, c), the lines a*x + b*y = c of the edges
+       (3) a list of 3-tuples (l, v1, v2), the edges: l is the index of the
+           line, v1 and v2 are the indices of the vertices at the ends, -1
+           where the edge goes to infinity
+    """
+    v = _voronoi(points)
+    return (_result(v.num_vertices(), 2, _numpy.float64, v.get_vertices),
+            _result(v.num_lines(), 3, _numpy.float64, v.get_lines),
+            _result(v.num_edges(), 3, _numpy.int32, v.get_edges))
+
+
+def delaunay_triangulation(points):
+    """The Delaunay triangles of points as a list of 3-tuples of point indices"""
+    v = _voronoi(points)
+    return _result(v.num_triangles(), 3, _numpy.int32, v.get_triangles)
+%}
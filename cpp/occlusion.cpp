@@ -0,0 +1,185 @@
+#include <algorithm>
+#include <cmath>
+#include "occlusion.hpp"
+#include "geometry.hpp"
+
+static const float PI = (float)M_PI;
+
+void AngularIntervals::clear(){
+    spans.clear();
+}
+
+void AngularIntervals::add(float a, float b){
+    a = angle_diff(a, 0);
+    b = angle_diff(b, 0);
+    if(a <= b){
+        add_span(a, b);
+    } else { // wraps around at pi
+        add_span(a, PI);
+        add_span(-PI, b);
+    }
+}
+
+void AngularIntervals::add_all(){
+    spans.clear();
+    spans[-PI] = PI;
+}
+
+void AngularIntervals::add_span(float a, float b){
+    std::map<float, float>::iterator it = spans.upper_bound(a);
+    if(it != spans.begin()){
+        std::map<float, float>::iterator prev = it;
+        --prev;
+        if(prev->second >= a){ // overlaps the interval starting before a
+            a = prev->first;
+            b = std::max(b, prev->second);
+            spans.erase(prev);
+        }
+    }
+    while(it != spans.end() && it->first <= b){
+        b = std::max(b, it->second);
+        spans.erase(it++);
+    }
+    spans[a] = b;
+}
+
+bool AngularIntervals::contains(float angle) const{
+    std::map<float, float>::const_iterator it = spans.upper_bound(angle);
+    if(it == spans.begin())
+        return false;
+    --it;
+    return angle <= it->second;
+}
+
+size_t AngularIntervals::size() const{
+    return spans.size();
+}
+
+struct WallShadow {
+    float far;
+    float start, width; // counter clockwise from start
+    bool operator<(const WallShadow &other) const{
+        return far < other.far;
+    }
+};
+
+struct KeyOrder {
+    const std::vector<float> &key;
+    KeyOrder(const std::vector<float> &k):key(k){}
+    bool operator()(int a, int b) const{
+        return key[a] < key[b] || (key[a] == key[b] && a < b);
+    }
+};
+
+struct KeyLess {
+    const std::vector<float> &key;
+    KeyLess(const std::vector<float> &k):key(k){}
+    bool operator()(int a, float v) const{
+        return key[a] < v;
+    }
+    bool operator()(float v, int a) const{
+        return v < key[a];
+    }
+};
+
+// number of indices in sorted (by key) with lo <= key <= hi, first one in *first
+static size_t key_range(const std::vector<int> &sorted, const std::vector<float> &key,
+                        float lo, float hi, size_t *first){
+    std::vector<int>::const_iterator a = std::lower_bound(sorted.begin(), sorted.end(), lo, KeyLess(key));
+    std::vector<int>::const_iterator b = std::upper_bound(a, sorted.end(), hi, KeyLess(key));
+    *first = a - sorted.begin();
+    return b - a;
+}
+
+void occlusion_visibility(const Vec2d &observer,
+                          const std::vector<Vec2d> &positions,
+                          const std::vector<float> &radii,
+                          const std::vector<Segment> &segments,
+                          std::vector<bool> &visible){
+    size_t k = positions.size();
+    visible.assign(k, true);
+    std::vector<float> dist(k), angle(k);
+    std::vector<int> by_dist(k), by_angle(k);
+    for(size_t i = 0; i<k; ++i){
+        Vec2d diff = positions[i] - observer;
+        dist[i] = diff.length();
+        angle[i] = diff.angle();
+        by_dist[i] = by_angle[i] = (int)i;
+    }
+    std::sort(by_dist.begin(), by_dist.end(), KeyOrder(dist));
+    std::sort(by_angle.begin(), by_angle.end(), KeyOrder(angle));
+
+    // Segments at about the same distance as a disc need an exact test, those
+    // entirely in front of it are handled by the sweep below
+    std::vector<WallShadow> walls;
+    std::vector<int> ambiguous;
+    for(size_t w = 0; w<segments.size(); ++w){
+        const Vec2d &p1 = segments[w].first, &p2 = segments[w].second;
+        if(p1 == p2)
+            continue;
+        float near = (float)sqrt(linesegdist2(p1, p2, observer));
+        float far = std::max(p1.distance_to(observer), p2.distance_to(observer));
+        float a1 = (p1 - observer).angle(), a2 = (p2 - observer).angle();
+        float span = angle_diff(a2, a1);
+        WallShadow shadow;
+        shadow.far = far;
+        shadow.start = span >= 0 ? a1 : a2;
+        shadow.width = std::abs(span);
+
+        ambiguous.clear();
+        if(near == 0){ // observer is touching the wall, anything can be behind it
+            ambiguous = by_dist;
+        } else {
+            // candidates are the discs within [near, far] or the discs within the
+            // angular span of the wall, whichever are fewer
+            size_t bandfirst, arcfirst, wrapfirst = 0, nwrap = 0;
+            size_t nband = key_range(by_dist, dist, near, far, &bandfirst);
+            float end = shadow.start + shadow.width;
+            size_t narc = key_range(by_angle, angle, shadow.start, std::min(end, PI), &arcfirst);
+            if(end > PI)
+                nwrap = key_range(by_angle, angle, -PI, end - 2*PI, &wrapfirst);
+            if(nband <= narc + nwrap){
+                ambiguous.assign(by_dist.begin() + bandfirst, by_dist.begin() + bandfirst + nband);
+            } else {
+                ambiguous.assign(by_angle.begin() + arcfirst, by_angle.begin() + arcfirst + narc);
+                ambiguous.insert(ambiguous.end(), by_angle.begin() + wrapfirst, by_angle.begin() + wrapfirst + nwrap);
+            }
+        }
+        for(size_t a = 0; a<ambiguous.size(); ++a){
+            int i = ambiguous[a];
+            if(visible[i] && dist[i] >= near && dist[i] <= far &&
+               line_distance2(observer, positions[i], p1, p2) == 0)
+                visible[i] = false;
+        }
+        walls.push_back(shadow);
+    }
+    std::sort(walls.begin(), walls.end());
+
+    // sweep outwards from the observer
+    AngularIntervals shadows;
+    size_t w = 0;
+    for(size_t g = 0; g<k; ){
+        float d = dist[by_dist[g]];
+        while(w < walls.size() && walls[w].far < d){
+            shadows.add(walls[w].start, walls[w].start + walls[w].width);
+            ++w;
+        }
+        // discs at the same distance don't shadow each other
+        size_t end = g;
+        for(; end<k && dist[by_dist[end]] == d; ++end){
+            int i = by_dist[end];
+            if(visible[i] && shadows.contains(angle[i]))
+                visible[i] = false;
+        }
+        for(; g<end; ++g){
+            int i = by_dist[g];
+            float r = std::abs(radii[i]);
+            if(dist[i] <= r){
+                shadows.add_all();
+            } else {
+                float half = (float)asin(r / dist[i]);
+                shadows.add(angle[i] - half, angle[i] + half);
+            }
+        }
+    }
+}
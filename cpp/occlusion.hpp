@@ -0,0 +1,39 @@
+#ifndef _OCCLUSION_HPP
+#define _OCCLUSION_HPP
+
+#include <map>
+#include <vector>
+#include "vector2d.hpp"
+#include "segmentgrid.hpp"
+
+// Union of closed angular intervals within [-pi, pi]
+class AngularIntervals {
+public:
+    void clear();
+    // adds the interval going counter clockwise from angle a to angle b
+    void add(float a, float b);
+    void add_all();
+    bool contains(float angle) const;
+    size_t size() const;
+private:
+    void add_span(float a, float b);
+    std::map<float, float> spans; // start => end, disjoint and sorted
+};
+
+/*
+Shadow casting visibility test for discs (pedestrians) and line segments
+(obstacles) as seen from observer. Discs are swept in order of distance and
+each of them shadows the angular interval it covers for every disc further
+away. Segments that are entirely closer than a disc shadow it the same way,
+segments at about the same distance are tested exactly.
+
+visible[i] is set to whether the centre of disc i can be seen. Runs in
+O((k + m) log k) for k discs and m segments, plus the exact tests.
+*/
+void occlusion_visibility(const Vec2d &observer,
+                          const std::vector<Vec2d> &positions,
+                          const std::vector<float> &radii,
+                          const std::vector<Segment> &segments,
+                          std::vector<bool> &visible);
+
+#endif
@@ -1,9 +1,20 @@
 #include <cmath>
+#include <algorithm>
+#include <string>
 #include "geometry.hpp"
 #include "particle.hpp"
+#include "occlusion.hpp"
+#include "workerpool.hpp"
+
+// cell size of the particle index when all radii are zero
+static const float DEFAULT_CELL_SIZE = 16;
+// particles per chunk handed to a worker thread
+static const size_t PARALLEL_GRAIN = 64;
 
 Particle::Particle(float x, float y, float dir)
     :world(NULL),
+    slot(-1),
+    handle_(-1),
     radius(0),
     velocity(0,0),
     speed(0),
@@ -50,6 +61,10 @@ const ParticleState& Particle::waypoint(int i) const{
     return path[i];
 }
 
+int Particle::handle() const{
+    return handle_;
+}
+
 void Particle::set_state(const Vec2d &v, float angle_){
     position = v;
     angle = angle_;
@@ -57,6 +72,8 @@ void Particle::set_state(const Vec2d &v, float angle_){
 
 Obstacle::Obstacle(const Vec2d &p1, const Vec2d &p2) :
     world(NULL),
+    slot(-1),
+    handle_(-1),
     p1(p1),
     p2(p2)
 {
@@ -67,85 +84,516 @@ Obstacle::~Obstacle(){
         world->unbind(this);
 }
 
+int Obstacle::handle() const{
+    return handle_;
+}
+
+void ParticleArrays::resize(size_t n){
+    x.resize(n);
+    y.resize(n);
+    angle.resize(n);
+    vx.resize(n);
+    vy.resize(n);
+    radius.resize(n);
+    speed.resize(n);
+}
+
+void ParticleArrays::store(size_t i, const Particle *p){
+    x[i] = p->position.x;
+    y[i] = p->position.y;
+    angle[i] = p->angle;
+    vx[i] = p->velocity.x;
+    vy[i] = p->velocity.y;
+    radius[i] = p->radius;
+    speed[i] = p->speed;
+}
+
+void ParticleArrays::remove(size_t i){
+    // the last element takes the place of element i, as in World::unbind()
+    size_t last = size() - 1;
+    x[i] = x[last]; y[i] = y[last]; angle[i] = angle[last];
+    vx[i] = vx[last]; vy[i] = vy[last];
+    radius[i] = radius[last]; speed[i] = speed[last];
+    resize(last);
+}
+
+size_t ParticleArrays::size() const{
+    return x.size();
+}
+
+const std::vector<float> *ParticleArrays::field(const char *name) const{
+    std::string n(name);
+    if(n == "x") return &x;
+    if(n == "y") return &y;
+    if(n == "angle") return &angle;
+    if(n == "vx") return &vx;
+    if(n == "vy") return &vy;
+    if(n == "radius") return &radius;
+    if(n == "speed") return &speed;
+    return NULL;
+}
+
+World::World()
+    :pool(NULL),
+    num_threads(0),
+    next_handle(0),
+    use_spatial_index(true),
+    particle_index_dirty(true),
+    max_particle_radius(0),
+    obstacle_index_dirty(true),
+    obstacle_rebuilds(0),
+    obstacle_queries(0),
+    obstacle_tests(0)
+{
+}
 
 World::~World(){
     for(size_t i = 0; i<particles.size(); ++i){
         particles[i]->world = NULL;
     }
+    for(size_t i = 0; i<obstacles.size(); ++i){
+        obstacles[i]->world = NULL;
+    }
+    delete pool;
 }
 void World::unbind(Particle *p){
-    for(size_t i = 0; i<particles.size(); ++i){
-        if(particles[i] == p){
-            particles.erase(particles.begin() + i);
-            --i;
-        }
-    }
+    /*
+    Constant time, the last particle takes the place of the removed one
+    */
+    if(p->world != this)
+        return;
+    size_t i = (size_t)p->slot;
+    Particle *last = particles.back();
+    particles[i] = last;
+    last->slot = (int)i;
+    particles.pop_back();
+    particle_arrays.remove(i);
     p->world = NULL;
+    p->slot = p->handle_ = -1;
+    particle_index_dirty = true; // indices have shifted
 }
 
 void World::unbind(Obstacle *l){
-    for(size_t i = 0; i<obstacles.size(); ++i){
-        if(obstacles[i] == l){
-            obstacles.erase(obstacles.begin() + i);
-            --i;
-        }
-    }
+    if(l->world != this)
+        return;
+    size_t i = (size_t)l->slot;
+    Obstacle *last = obstacles.back();
+    obstacles[i] = last;
+    last->slot = (int)i;
+    obstacles.pop_back();
     l->world = NULL;
+    l->slot = l->handle_ = -1;
+    obstacle_index_dirty = true;
 }
 
 void World::bind(Particle *p) {
+    if(p->world != NULL)
+        p->world->unbind(p);
+    p->slot = (int)particles.size();
+    p->handle_ = next_handle++;
     particles.push_back(p);
     p->world = this;
+    if(!particle_index_dirty)
+        particle_index.insert(p->slot, p->position);
+    particle_arrays.resize(particles.size());
+    particle_arrays.store(particles.size() - 1, p);
 }
 
 void World::bind(Obstacle *l) {
+    if(l->world != NULL)
+        l->world->unbind(l);
+    l->slot = (int)obstacles.size();
+    l->handle_ = next_handle++;
     obstacles.push_back(l);
     l->world = this;
+    obstacle_index_dirty = true;
 }
 
 void World::update(float dt){
     //update all particles
+    integrate(dt);
+    if(num_threads > 0){
+        collide_particles_parallel();
+        collide_obstacles_parallel();
+        store_arrays();
+        return;
+    }
+    //collision detection between all pairs of particles
+    if(use_spatial_index)
+        collide_particles_indexed();
+    else
+        collide_particles();
+    //collision detection between particles and obstacles
+    if(use_spatial_index)
+        collide_obstacles_indexed();
+    else
+        collide_obstacles();
+    store_arrays();
+}
+
+class IntegrateTask : public ParallelTask {
+public:
+    IntegrateTask(const std::vector<Particle*> &particles, float dt)
+        :particles(particles), dt(dt){}
+    void run(size_t begin, size_t end){
+        for(size_t i = begin; i<end; ++i)
+            particles[i]->update(dt);
+    }
+private:
+    const std::vector<Particle*> &particles;
+    float dt;
+};
+
+void World::integrate(float dt){
+    // particles don't interact while integrating, so the order doesn't matter
+    if(num_threads > 0){
+        IntegrateTask task(particles, dt);
+        pool->run(task, particles.size(), PARALLEL_GRAIN);
+        return;
+    }
     for(size_t i = 0, sz = particles.size(); i<sz; ++i){
         particles[i]->update(dt);
     }
-    //collision detection between all pairs of particles
+}
+
+void World::set_threads(int n){
+    num_threads = std::max(n, 0);
+    if(num_threads == 0){
+        delete pool;
+        pool = NULL;
+        return;
+    }
+    if(pool == NULL)
+        pool = new WorkerPool();
+    pool->set_threads(num_threads);
+}
+
+int World::threads() const{
+    return num_threads;
+}
+
+void World::store_arrays(){
+    size_t sz = particles.size();
+    particle_arrays.resize(sz);
+    for(size_t i = 0; i<sz; ++i)
+        particle_arrays.store(i, particles[i]);
+}
+
+const ParticleArrays &World::arrays() const{
+    return particle_arrays;
+}
+
+bool World::collide(Particle *a, Particle *b){
+    float dist2 = a->position.distance_to2(b->position);
+    float safe_dist = a->radius + b->radius;
+    float safe_dist2 = safe_dist*safe_dist;
+    if(!(dist2 < safe_dist2))
+        return false;
+    //collision
+    a->collisions++;
+    b->collisions++;
+    float diff = (float)sqrt(dist2) - (float)sqrt(safe_dist2);
+    Vec2d dirv(1,0); // dummy bounce-vector when units stack exactly on top of each other
+    if(dist2 != 0)
+        dirv = (a->position - b->position).norm();
+    float bounce = diff / 2;  // TODO: introduce particle 'weight' to guide how much each particle bounces in collisions
+    b->set_state(b->position + dirv*bounce, b->angle);
+    a->set_state(a->position - dirv*bounce, a->angle);
+    return true;
+}
+
+void World::collide_particles(){
     for(size_t i = 0, sz = particles.size(); i<sz; ++i){
         for(size_t j = i+1; j<sz; ++j){
-            float dist2 = particles[i]->position.distance_to2(particles[j]->position);
-            float safe_dist = particles[i]->radius + particles[j]->radius;
-            float safe_dist2 = safe_dist*safe_dist;
-            if(dist2 < safe_dist2){
-                //collision
-                particles[i]->collisions++;
-                particles[j]->collisions++;
-                float diff = (float)sqrt(dist2) - (float)sqrt(safe_dist2);
-                Vec2d dirv(1,0); // dummy bounce-vector when units stack exactly on top of each other
-                if(dist2 != 0)
-                    dirv = (particles[i]->position - particles[j]->position).norm();
-                float bounce = diff / 2;  // TODO: introduce particle 'weight' to guide how much each particle bounces in collisions
-                particles[j]->set_state(particles[j]->position + dirv*bounce, particles[j]->angle);
-                particles[i]->set_state(particles[i]->position - dirv*bounce, particles[i]->angle);
+            collide(particles[i], particles[j]);
+        }
+    }
+}
+
+void World::collide_particles_indexed(){
+    /*
+    Same pairs, in the same order and with the same arithmetic as collide_particles(),
+    but only pairs sharing a neighbourhood of grid cells are tested. Bounced particles
+    are moved between cells as they go, so the result is identical to the brute force pass.
+    */
+    size_t sz = particles.size();
+    particle_index_dirty = true; // positions changed in the integration step
+    update_particle_index();
+    float cell_size = particle_index.cell_size();
+    if(!(max_particle_radius > 0))
+        return; // dist2 < 0 never holds, nothing can collide
+
+    std::vector<int> candidates;
+    for(size_t i = 0; i<sz; ++i){
+        size_t next = i+1; // lowest index that has not been tested against i yet
+        bool rescan = true;
+        while(rescan){
+            rescan = false;
+            particle_index.query(particles[i]->position, cell_size, candidates);
+            for(size_t k = 0; k<candidates.size(); ++k){
+                size_t j = (size_t)candidates[k];
+                if(j < next)
+                    continue;
+                next = j+1;
+                Vec2d old_i = particles[i]->position;
+                Vec2d old_j = particles[j]->position;
+                if(collide(particles[i], particles[j])){
+                    particle_index.move((int)j, old_j, particles[j]->position);
+                    particle_index.move((int)i, old_i, particles[i]->position);
+                    if(!particle_index.same_cell(old_i, particles[i]->position)){
+                        rescan = true; // i has a new neighbourhood
+                        break;
+                    }
+                }
             }
         }
     }
-    //collision detection between particles and obstacles
+}
+
+bool World::collide(Particle *p, Obstacle *o){
+    float dist2 = linesegdist2(o->p1, o->p2, p->position);
+    float safe_dist = p->radius;
+    float safe_dist2 = safe_dist * safe_dist;
+    if(!(dist2 < safe_dist2))
+        return false;
+    //collision
+    p->collisions++;
+    // Vec2d dirv(1,0);
+    // Vec2d movement = p->position - p->previous_position;
+    p->set_state(p->previous_position, p->angle);
+    //　TODO: use the last movement vector to reverse the precice amount needed
+    return true;
+}
+
+void World::collide_obstacles(){
     for (size_t i = 0, sz = particles.size(); i<sz; ++i) {
         for(size_t j = 0, oz = obstacles.size(); j<oz; ++j) {
-            float dist2 = linesegdist2(obstacles[j]->p1, obstacles[j]->p2, particles[i]->position);
-            float safe_dist = particles[i]->radius;
-            float safe_dist2 = safe_dist * safe_dist;
-            if(dist2 < safe_dist2){
-                //collision
-                particles[i]->collisions++;
-                // Vec2d dirv(1,0);
-                // Vec2d movement = particles[i]->position - particles[i]->previous_position;
-                particles[i]->set_state(particles[i]->previous_position, particles[i]->angle); 
-                //　TODO: use the last movement vector to reverse the precice amount needed
+            collide(particles[i], obstacles[j]);
+        }
+    }
+}
+
+void World::update_particle_index() const{
+    if(!particle_index_dirty)
+        return;
+    size_t sz = particles.size();
+    max_particle_radius = 0;
+    for(size_t i = 0; i<sz; ++i)
+        max_particle_radius = std::max(max_particle_radius, std::abs(particles[i]->radius));
+    // a pair can only collide if closer than 2*max_radius, which is (just about) one cell,
+    // the margin covers float rounding in the distance test
+    float cell_size = max_particle_radius > 0 ? 2 * max_particle_radius * 1.001f : DEFAULT_CELL_SIZE;
+    particle_index.reset(cell_size, sz);
+    for(size_t i = 0; i<sz; ++i)
+        particle_index.insert((int)i, particles[i]->position);
+    particle_index_dirty = false;
+}
+
+void World::reindex(){
+    particle_index_dirty = true;
+    obstacle_index_dirty = true;
+    store_arrays();
+}
+
+void World::update_obstacle_index() const{
+    if(!obstacle_index_dirty)
+        return;
+    std::vector<Segment> segments;
+    segments.reserve(obstacles.size());
+    for(size_t j = 0; j<obstacles.size(); ++j)
+        segments.push_back(Segment(obstacles[j]->p1, obstacles[j]->p2));
+    obstacle_index.build(segments);
+    obstacle_index_dirty = false;
+    ++obstacle_rebuilds;
+}
+
+void World::collide_obstacles_indexed(){
+    /*
+    Same as collide_obstacles(), but each particle is only tested against the
+    obstacles near it, in the same order.
+    */
+    update_obstacle_index();
+    std::vector<int> candidates;
+    for(size_t i = 0, sz = particles.size(); i<sz; ++i)
+        collide_obstacles_near(i, candidates, obstacle_queries, obstacle_tests);
+}
+
+void World::collide_obstacles_near(size_t i, std::vector<int> &candidates, long &queries, long &tests){
+    /*
+    Obstacle collisions of particle i, using the obstacle index. A particle bounced
+    back to its previous position gets a new lookup for the remaining obstacles.
+    */
+    Particle *p = particles[i];
+    size_t next = 0; // lowest obstacle index not yet tested against p
+    bool rescan = true;
+    while(rescan){
+        rescan = false;
+        float range = std::abs(p->radius) * 1.001f;
+        obstacle_index.query(p->position, range, candidates);
+        ++queries;
+        for(size_t k = 0; k<candidates.size(); ++k){
+            size_t j = (size_t)candidates[k];
+            if(j < next)
+                continue;
+            next = j+1;
+            ++tests;
+            Vec2d old = p->position;
+            if(collide(p, obstacles[j]) && !(old == p->position)){
+                if(!particle_index_dirty)
+                    particle_index.move((int)i, old, p->position);
+                rescan = true;
+                break;
             }
         }
     }
 }
 
+class ParticleCollisionTask : public ParallelTask {
+public:
+    ParticleCollisionTask(const std::vector<Particle*> &particles, const std::vector<Vec2d> &start,
+                          const SpatialHash *index)
+        :particles(particles), start(start), index(index){}
+    void run(size_t begin, size_t end){
+        /*
+        Every particle sums up its own bounces against all particles it overlaps at
+        the start of the pass, in index order, and only moves itself. A pair gets the
+        same bounce as in World::collide(), each particle taking its half.
+        */
+        std::vector<int> candidates;
+        size_t sz = particles.size();
+        for(size_t i = begin; i<end; ++i){
+            Particle *p = particles[i];
+            if(index != NULL){
+                index->query(start[i], index->cell_size(), candidates);
+            } else {
+                candidates.resize(sz);
+                for(size_t j = 0; j<sz; ++j)
+                    candidates[j] = (int)j;
+            }
+            Vec2d position = start[i];
+            for(size_t k = 0; k<candidates.size(); ++k){
+                size_t j = (size_t)candidates[k];
+                if(j == i)
+                    continue;
+                // a is the lower index, as in the sequential pass
+                size_t a = std::min(i, j), b = std::max(i, j);
+                float dist2 = start[a].distance_to2(start[b]);
+                float safe_dist = particles[a]->radius + particles[b]->radius;
+                float safe_dist2 = safe_dist*safe_dist;
+                if(!(dist2 < safe_dist2))
+                    continue;
+                p->collisions++;
+                float diff = (float)sqrt(dist2) - (float)sqrt(safe_dist2);
+                Vec2d dirv(1,0);
+                if(dist2 != 0)
+                    dirv = (start[a] - start[b]).norm();
+                float bounce = diff / 2;
+                if(i == a)
+                    position = position - dirv*bounce;
+                else
+                    position = position + dirv*bounce;
+            }
+            p->position = position;
+        }
+    }
+private:
+    const std::vector<Particle*> &particles;
+    const std::vector<Vec2d> &start;
+    const SpatialHash *index;
+};
+
+void World::collide_particles_parallel(){
+    /*
+    Collisions are resolved from the positions at the start of the pass instead of
+    one pair after the other, so that the outcome doesn't depend on how the
+    particles are split between threads. Results differ from collide_particles().
+    */
+    size_t sz = particles.size();
+    std::vector<Vec2d> start(sz);
+    for(size_t i = 0; i<sz; ++i)
+        start[i] = particles[i]->position;
+    const SpatialHash *index = NULL;
+    if(use_spatial_index){
+        particle_index_dirty = true;
+        update_particle_index();
+        if(!(max_particle_radius > 0))
+            return;
+        index = &particle_index;
+    }
+    ParticleCollisionTask task(particles, start, index);
+    pool->run(task, sz, PARALLEL_GRAIN);
+    particle_index_dirty = true;
+}
+
+class ObstacleCollisionTask : public ParallelTask {
+public:
+    ObstacleCollisionTask(World &world, std::vector<long> &queries, std::vector<long> &tests)
+        :world(world), queries(queries), tests(tests){}
+    void run(size_t begin, size_t end){
+        world.collide_obstacles_range(begin, end, queries[begin / PARALLEL_GRAIN], tests[begin / PARALLEL_GRAIN]);
+    }
+private:
+    World &world;
+    std::vector<long> &queries, &tests;
+};
+
+void World::collide_obstacles_range(size_t begin, size_t end, long &queries, long &tests){
+    std::vector<int> candidates;
+    for(size_t i = begin; i<end; ++i){
+        if(use_spatial_index){
+            collide_obstacles_near(i, candidates, queries, tests);
+        } else {
+            for(size_t j = 0, oz = obstacles.size(); j<oz; ++j)
+                collide(particles[i], obstacles[j]);
+        }
+    }
+}
+
+void World::collide_obstacles_parallel(){
+    /*
+    Obstacle collisions only move the particle itself, so every particle is
+    handled as in the sequential pass, with the index stats counted per chunk
+    */
+    if(use_spatial_index)
+        update_obstacle_index();
+    if(particles.empty())
+        return;
+    size_t sz = particles.size(), chunks = (sz + PARALLEL_GRAIN - 1) / PARALLEL_GRAIN;
+    std::vector<long> queries(chunks, 0), tests(chunks, 0);
+    ObstacleCollisionTask task(*this, queries, tests);
+    pool->run(task, sz, PARALLEL_GRAIN);
+    for(size_t c = 0; c<chunks; ++c){
+        obstacle_queries += queries[c];
+        obstacle_tests += tests[c];
+    }
+}
+
+int World::obstacle_index_rebuilds() const{
+    return obstacle_rebuilds;
+}
+
+long World::obstacle_index_queries() const{
+    return obstacle_queries;
+}
+
+long World::obstacle_index_tests() const{
+    return obstacle_tests;
+}
+
+void World::reset_obstacle_index_stats(){
+    obstacle_queries = 0;
+    obstacle_tests = 0;
+}
+
+void World::set_spatial_index(bool enabled){
+    use_spatial_index = enabled;
+    reindex();
+}
+
+bool World::spatial_index() const{
+    return use_spatial_index;
+}
+
 int World::num_particles(){
     return (int)particles.size();
 }
@@ -153,16 +601,129 @@ int World::num_particles(){
 std::vector<Particle*> World::particles_in_range(const Particle *from, float range) const{
     float range2 = range*range;
     std::vector<Particle*> res;
-    for(size_t i = 0, sz = particles.size(); i<sz; ++i){
-        if(particles[i] != from && particles[i]->position.distance_to2(from->position) <= range2)
-            res.push_back(particles[i]);
+    if(!use_spatial_index){
+        for(size_t i = 0, sz = particles.size(); i<sz; ++i){
+            if(particles[i] != from && particles[i]->position.distance_to2(from->position) <= range2)
+                res.push_back(particles[i]);
+        }
+        return res;
+    }
+    update_particle_index();
+    std::vector<int> candidates;
+    particle_index.query(from->position, range, candidates);
+    for(size_t k = 0; k<candidates.size(); ++k){
+        Particle *p = particles[candidates[k]];
+        if(p != from && p->position.distance_to2(from->position) <= range2)
+            res.push_back(p);
+    }
+    return res;
+}
+
+std::vector<std::vector<Particle*> > World::all_particles_in_range(const std::vector<Particle*> &from, const std::vector<float> &ranges) const{
+    /*
+    particles_in_range() for every particle in from, ranges[i] being the range of from[i]
+    */
+    std::vector<std::vector<Particle*> > res(from.size());
+    for(size_t i = 0; i<from.size() && i<ranges.size(); ++i)
+        res[i] = particles_in_range(from[i], ranges[i]);
+    return res;
+}
+
+std::vector<std::vector<Particle*> > World::all_particles_in_view_range(const std::vector<Particle*> &from, const std::vector<float> &ranges) const{
+    /*
+    particles_in_view_range() for every particle in from, ranges[i] being the range of from[i]
+    */
+    std::vector<std::vector<Particle*> > res(from.size());
+    for(size_t i = 0; i<from.size() && i<ranges.size(); ++i)
+        res[i] = particles_in_view_range(from[i], ranges[i]);
+    return res;
+}
+
+struct NeighbourOrder {
+    const std::vector<float> &dist2;
+    NeighbourOrder(const std::vector<float> &d):dist2(d){}
+    bool operator()(int a, int b) const{
+        return dist2[a] < dist2[b] || (dist2[a] == dist2[b] && a < b);
+    }
+};
+
+std::vector<Particle*> World::nearest_particles(const Particle *from, int k) const{
+    /*
+    The k particles closest to from, closest first
+    */
+    std::vector<Particle*> res;
+    size_t sz = particles.size();
+    if(k <= 0)
+        return res;
+    std::vector<int> candidates, inside;
+    std::vector<float> dist2(sz);
+    float range = 0;
+    if(use_spatial_index){
+        update_particle_index();
+        range = particle_index.cell_size();
+    }
+    while(true){
+        // grow the search box until the circle inscribed in it holds k particles,
+        // everything outside of that circle is further away than those
+        if(use_spatial_index){
+            particle_index.query(from->position, range, candidates);
+        } else {
+            candidates.resize(sz);
+            for(size_t i = 0; i<sz; ++i)
+                candidates[i] = (int)i;
+        }
+        bool everything = candidates.size() == sz;
+        inside.clear();
+        for(size_t c = 0; c<candidates.size(); ++c){
+            int i = candidates[c];
+            if(particles[i] == from)
+                continue;
+            dist2[i] = particles[i]->position.distance_to2(from->position);
+            if(everything || dist2[i] <= range*range)
+                inside.push_back(i);
+        }
+        if(everything || (int)inside.size() >= k)
+            break;
+        range *= 2;
     }
+    std::sort(inside.begin(), inside.end(), NeighbourOrder(dist2));
+    for(size_t c = 0; c<inside.size() && (int)c<k; ++c)
+        res.push_back(particles[inside[c]]);
     return res;
 }
 
 std::vector<Particle*> World::particles_in_view_range(const Particle *from, float range) const{
     std::vector<Particle*> in_range = particles_in_range(from, range);
     std::vector<Particle*> res;
+    if(use_spatial_index){
+        /*
+        Shadow casting, see occlusion_visibility(). A pedestrian is hidden by
+        pedestrians closer to the observer whose disc covers the line of sight,
+        and by obstacles crossing it. Only the obstacles within range can do that.
+        */
+        update_obstacle_index();
+        std::vector<int> ids;
+        obstacle_index.query(from->position, range, ids);
+        std::vector<Segment> segments;
+        segments.reserve(ids.size());
+        for(size_t k = 0; k<ids.size(); ++k)
+            segments.push_back(Segment(obstacles[ids[k]]->p1, obstacles[ids[k]]->p2));
+        std::vector<Vec2d> positions(in_range.size());
+        std::vector<float> radii(in_range.size());
+        for(size_t i = 0; i<in_range.size(); ++i){
+            positions[i] = in_range[i]->position;
+            radii[i] = in_range[i]->radius;
+        }
+        std::vector<bool> visible;
+        occlusion_visibility(from->position, positions, radii, segments, visible);
+        for(size_t i = 0; i<in_range.size(); ++i){
+            if(visible[i])
+                res.push_back(in_range[i]);
+        }
+        return res;
+    }
+
+    // reference implementation, tests every pair
 
     bool occluded;
     for(size_t i = 0, sz = in_range.size(); i<sz; ++i){ // go through pedestrians in range
@@ -178,12 +739,9 @@ std::vector<Particle*> World::particles_in_view_range(const Particle *from, floa
             }
         }
         if(!occluded){
-            for(size_t j = 0, oz = obstacles.size(); j<oz; ++j) {
-                if(line_distance2(from->position,
-                                  in_range[i]->position,
-                                  obstacles[j]->p1,
-                                  obstacles[j]->p2)
-                   == 0) { // behind an obstacle
+            const Vec2d &a = from->position, &b = in_range[i]->position;
+            for(size_t k = 0, oz = obstacles.size(); k<oz; ++k) {
+                if(line_distance2(a, b, obstacles[k]->p1, obstacles[k]->p2) == 0) { // behind an obstacle
                     occluded = true;
                     break;
                 }
@@ -199,6 +757,10 @@ std::vector<Obstacle*> World::get_obstacles() const {
     return obstacles;
 }
 
+std::vector<Particle*> World::get_particles() const {
+    return particles;
+}
+
 /*
 TODO: prototype in python first
 float freepath_probability(std::vector<Particle*> particles, Vec2d l1, Vec2d l2, float start_time, float speed){
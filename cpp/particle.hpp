@@ -5,6 +5,8 @@
 #include <deque>
 #include <cstdio>
 #include "vector2d.hpp"
+#include "spatialhash.hpp"
+#include "segmentgrid.hpp"
 
 class ParticleState {
 public:
@@ -16,6 +18,8 @@ class World;
 class Particle : public ParticleState {
 	friend class World;
 	World *world;
+	int slot; // index in world->particles
+	int handle_;
 	std::deque<ParticleState> path;
 public:
 	Particle(float x=0, float y=0, float dir=1);
@@ -39,33 +43,110 @@ public:
 	const ParticleState &waypoint(int i=0) const;
 	virtual void update(float dt) = 0;
 	void set_state(const Vec2d &v, float angle);
+	// id given by the world when bound, stays the same until unbound, -1 when not bound
+	int handle() const;
 };
 
 class Obstacle {
 	friend class World;
 	World *world;
+	int slot; // index in world->obstacles
+	int handle_;
 public:
 	Obstacle(const Vec2d &p1, const Vec2d &p2);
 	~Obstacle();
 	Vec2d p1, p2;
+	int handle() const;
 };
 
+// Structure of arrays copy of the state of the particles in a World, one
+// element per particle in the order of World::get_particles(). Refreshed by
+// World::update(), bind(), unbind() and reindex(), so it reflects the state as
+// of the last of those.
+class ParticleArrays {
+public:
+	std::vector<float> x, y, angle, vx, vy, radius, speed;
+	void resize(size_t n);
+	void store(size_t i, const Particle *p);
+	void remove(size_t i);
+	size_t size() const;
+	// the array for a field name ("x", "vx", ...), NULL for unknown names
+	const std::vector<float> *field(const char *name) const;
+};
+
+class WorkerPool;
+
 class World{
 public:
-	World(){}
+	World();
 	~World();
+	// Binding and unbinding take constant time. Unbinding moves the last
+	// particle (obstacle) into the freed place, so the order isn't kept.
 	void bind(Particle *p);
 	void unbind(Particle *p);
 	void bind(Obstacle *l);
 	void unbind(Obstacle *l);
 	void update(float dt);
+	// moves the particles like update(), without resolving any collisions
+	void integrate(float dt);
 	int num_particles();
+	// Range queries use the spatial index of the last update(), positions assigned
+	// directly in between are picked up by the next update() (or reindex())
 	std::vector<Particle*> particles_in_range(const Particle *from, float range) const;
 	std::vector<Particle*> particles_in_view_range(const Particle *from, float range) const;
+	std::vector<std::vector<Particle*> > all_particles_in_range(const std::vector<Particle*> &from, const std::vector<float> &ranges) const;
+	std::vector<std::vector<Particle*> > all_particles_in_view_range(const std::vector<Particle*> &from, const std::vector<float> &ranges) const;
+	std::vector<Particle*> nearest_particles(const Particle *from, int k) const;
 	std::vector<Obstacle*> get_obstacles() const;
+	std::vector<Particle*> get_particles() const;
+	const ParticleArrays &arrays() const;
+	void reindex();
+	// Number of threads used by update(). 0, the default, is the sequential
+	// update. With 1 or more threads collisions are resolved from the positions
+	// at the start of each pass, which gives the same results for any number of
+	// threads (but not the same as the sequential update).
+	void set_threads(int n);
+	int threads() const;
+	// spatial indexing of collisions and range queries, on by default
+	void set_spatial_index(bool enabled);
+	bool spatial_index() const;
+	// obstacle index statistics: number of times it was (re)built since the world
+	// was created, number of particle lookups and number of exact segment tests done
+	int obstacle_index_rebuilds() const;
+	long obstacle_index_queries() const;
+	long obstacle_index_tests() const;
+	void reset_obstacle_index_stats();
 private:
+	bool collide(Particle *a, Particle *b);
+	void collide_particles();
+	void collide_particles_indexed();
+	bool collide(Particle *p, Obstacle *o);
+	void collide_obstacles();
+	void collide_obstacles_indexed();
+	void collide_obstacles_near(size_t i, std::vector<int> &candidates, long &queries, long &tests);
+	void collide_particles_parallel();
+	void collide_obstacles_parallel();
+	void collide_obstacles_range(size_t begin, size_t end, long &queries, long &tests);
+	friend class ObstacleCollisionTask;
+	void update_particle_index() const;
+	void update_obstacle_index() const;
+	void store_arrays();
 	std::vector<Particle*> particles;
 	std::vector<Obstacle*> obstacles;
+	ParticleArrays particle_arrays;
+	WorkerPool *pool;
+	int num_threads;
+	int next_handle;
+	bool use_spatial_index;
+	// the indices are caches, kept up to date lazily from const queries as well
+	mutable SpatialHash particle_index;
+	mutable bool particle_index_dirty;
+	mutable float max_particle_radius; // when the particle index was built
+	mutable SegmentGrid obstacle_index;
+	mutable bool obstacle_index_dirty;
+	mutable int obstacle_rebuilds;
+	mutable long obstacle_queries;
+	mutable long obstacle_tests;
 };
 
 #endif
\ No newline at end of file
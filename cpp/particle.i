@@ -32,6 +32,7 @@ public:
     int waypoint_len() const;
     const ParticleState &waypoint(int i=0) const;
     void set_state(const Vec2d &v, float angle);
+    int handle() const;
     virtual void update(float dt)=0;
 };
 
@@ -49,25 +50,96 @@ public:
     Obstacle(const Vec2d &p1, const Vec2d &p2);
     ~Obstacle();
     Vec2d p1, p2;
+    int handle() const;
 };
 
+%template(vector_float) std::vector<float>;
+%template(vector_particle) std::vector<Particle*>;
+%template(vector_vector_particle) std::vector<std::vector<Particle*> >;
+
 class World{
 public:
-    World(){}
+    World();
     ~World();
     void bind(Particle *p);
     void unbind(Particle *p);
     void bind(Obstacle *l);
     void unbind(Obstacle *l);
     void update(float dt);
+    void integrate(float dt);
     int num_particles();
     std::vector<Particle*> particles_in_range(const Particle *from, float range) const;
     std::vector<Particle*> particles_in_view_range(const Particle *from, float range) const;
+    std::vector<std::vector<Particle*> > all_particles_in_range(const std::vector<Particle*> &from, const std::vector<float> &ranges) const;
+    std::vector<std::vector<Particle*> > all_particles_in_view_range(const std::vector<Particle*> &from, const std::vector<float> &ranges) const;
+    std::vector<Particle*> nearest_particles(const Particle *from, int k) const;
     std::vector<Obstacle*> get_obstacles() const;
+    std::vector<Particle*> get_particles() const;
+    void reindex();
+    void set_threads(int n);
+    int threads() const;
+    void set_spatial_index(bool enabled);
+    bool spatial_index() const;
+    int obstacle_index_rebuilds() const;
+    long obstacle_index_queries() const;
+    long obstacle_index_tests() const;
+    void reset_obstacle_index_stats();
 private:
     std::vector<Particle*> particles;
     std::vector<Obstacle*> obstacles;
 };
 
-%template(vector_particle) std::vector<Particle*>;
 %template(vector_obstacle) std::vector<Obstacle*>;
+
+%pythoncode %{
+class _ArrayOwner(object):
+    """Base of the particle_array() views, holds a reference to the World
+
+    The buffer of the view doesn't keep the World (and so the memory) alive.
+    """
+    def __init__(self, array, world):
+        self.__array_interface__ = array.__array_interface__
+        self.array = array
+        self.world = world
+%}
+
+%extend World {
+    // read only buffer over one of the structure of arrays fields, no copying
+    PyObject *_array_buffer(const char *name) const {
+        const std::vector<float> *field = $self->arrays().field(name);
+        if(field == NULL){
+            PyErr_Format(PyExc_KeyError, "%s", name);
+            return NULL;
+        }
+        char *data = field->empty() ? NULL : (char*)&(*field)[0];
+        Py_ssize_t size = (Py_ssize_t)(field->size() * sizeof(float));
+%#if PY_MAJOR_VERSION >= 3
+        static float empty;
+        return PyMemoryView_FromMemory(data ? data : (char*)&empty, size, PyBUF_READ);
+%#else
+        if(data == NULL)
+            return PyBuffer_New(0);
+        return PyBuffer_FromMemory(data, size);
+%#endif
+    }
+
+    %pythoncode %{
+    PARTICLE_FIELDS = ("x", "y", "angle", "vx", "vy", "radius", "speed")
+
+    def particle_array(self, name):
+        """Read only float32 NumPy view of one field of the particle state
+
+        Element i belongs to get_particles()[i]. The view shares memory with the
+        world and sees the state as of the last update(). It keeps the world
+        alive, but it is only valid until the next bind() or unbind(), which
+        may move the arrays, so get new views every tick (or copy them).
+        """
+        import numpy
+        array = numpy.frombuffer(self._array_buffer(name), dtype=numpy.float32)
+        return numpy.asarray(_ArrayOwner(array, self))
+
+    def particle_arrays(self):
+        """Dict of particle_array() for all of PARTICLE_FIELDS"""
+        return dict((name, self.particle_array(name)) for name in self.PARTICLE_FIELDS)
+    %}
+}
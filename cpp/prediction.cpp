@@ -0,0 +1,54 @@
+#include <cmath>
+#include <algorithm>
+#include "prediction.hpp"
+
+PedestrianPrediction::PedestrianPrediction()
+    :slice_time(1)
+{
+}
+
+void PedestrianPrediction::build(const std::vector<Vec2d> &positions,
+                                 const std::vector<Vec2d> &velocities,
+                                 double slice_time_, int nslices){
+    slice_time = slice_time_;
+    slices.assign(std::max(nslices, 0), SegmentGrid());
+    std::vector<Segment> swept(positions.size());
+    for(int k = 0; k<(int)slices.size(); ++k){
+        // same extrapolation as the safeness tests
+        float t0 = (float)(k*slice_time), t1 = (float)((k + 1)*slice_time);
+        for(size_t i = 0; i<positions.size(); ++i)
+            swept[i] = Segment(positions[i] + velocities[i]*t0, positions[i] + velocities[i]*t1);
+        slices[k].build(swept);
+    }
+}
+
+void PedestrianPrediction::clear(){
+    slices.clear();
+}
+
+bool PedestrianPrediction::empty() const{
+    return slices.empty();
+}
+
+double PedestrianPrediction::horizon() const{
+    return slices.size()*slice_time;
+}
+
+bool PedestrianPrediction::query(float minx, float miny, float maxx, float maxy,
+                                 double start_time, double end_time,
+                                 std::vector<int> &result) const{
+    if(!(start_time >= 0) || !(end_time < horizon()))
+        return false;
+    int k0 = (int)std::floor(start_time/slice_time);
+    int k1 = std::min((int)std::floor(end_time/slice_time), (int)slices.size() - 1);
+    result.clear();
+    for(int k = k0; k <= k1; ++k){
+        slices[k].query_box(minx, miny, maxx, maxy, found);
+        result.insert(result.end(), found.begin(), found.end());
+    }
+    if(k1 > k0){
+        std::sort(result.begin(), result.end());
+        result.erase(std::unique(result.begin(), result.end()), result.end());
+    }
+    return true;
+}
@@ -0,0 +1,32 @@
+#ifndef _PREDICTION_HPP
+#define _PREDICTION_HPP
+
+#include <vector>
+#include "vector2d.hpp"
+#include "segmentgrid.hpp"
+
+// Space-time index of linearly extrapolated pedestrians. The time from 0 up
+// to the horizon is cut into slices, and during a slice every pedestrian
+// sweeps a line segment that is registered in the SegmentGrid of that slice.
+// Queries give the pedestrians that pass through a box during a time
+// interval (sorted, a superset - callers do the exact tests), so tests don't
+// have to go through all pedestrians.
+class PedestrianPrediction {
+public:
+    PedestrianPrediction();
+    void build(const std::vector<Vec2d> &positions, const std::vector<Vec2d> &velocities,
+               double slice_time, int nslices);
+    void clear();
+    bool empty() const;
+    double horizon() const;
+    // Returns false, without touching result, if the interval is not within
+    // [0, horizon()]
+    bool query(float minx, float miny, float maxx, float maxy,
+               double start_time, double end_time, std::vector<int> &result) const;
+private:
+    double slice_time;
+    std::vector<SegmentGrid> slices;
+    mutable std::vector<int> found;
+};
+
+#endif
@@ -0,0 +1,159 @@
+#include <cmath>
+#include <algorithm>
+#include "safeness.hpp"
+#include "geometry.hpp"
+
+/*
+The float/double roundings follow the python code in agents/arty.py, where
+Vec2d arithmetic is single precision and everything else is double, so the
+results are exactly the same.
+*/
+
+PedestrianSafeness::PedestrianSafeness()
+    :max_radius(0),
+    radius(0),
+    margin(0)
+{
+}
+
+void PedestrianSafeness::set_agent(double radius_, double margin_){
+    radius = radius_;
+    margin = margin_;
+}
+
+void PedestrianSafeness::set_pedestrians(const float *p, int n){
+    int count = n / 5;
+    positions.resize(count);
+    velocities.resize(count);
+    radii.resize(count);
+    everyone.resize(count);
+    max_radius = 0;
+    for(int i = 0; i<count; ++i){
+        positions[i] = Vec2d(p[5*i], p[5*i + 1]);
+        velocities[i] = Vec2d(p[5*i + 2], p[5*i + 3]);
+        radii[i] = p[5*i + 4];
+        max_radius = std::max(max_radius, radii[i]);
+        everyone[i] = i;
+    }
+    prediction.clear();
+}
+
+void PedestrianSafeness::predict(double slice_time, int nslices){
+    prediction.build(positions, velocities, slice_time, nslices);
+}
+
+double PedestrianSafeness::horizon() const{
+    return prediction.horizon();
+}
+
+const std::vector<int> &PedestrianSafeness::near(float minx, float miny, float maxx, float maxy,
+                                                 double start_time, double end_time) const{
+    if(prediction.empty())
+        return everyone;
+    float range = (float)(radius + margin + max_radius) + 1; // slack for rounding
+    if(prediction.query(minx - range, miny - range, maxx + range, maxy + range,
+                        start_time, end_time, candidates))
+        return candidates;
+    return everyone;
+}
+
+int PedestrianSafeness::num_pedestrians() const{
+    return (int)positions.size();
+}
+
+Vec2d PedestrianSafeness::future_position(int i, double time) const{
+    return positions[i] + velocities[i]*(float)time;
+}
+
+double PedestrianSafeness::safe_distance(int i) const{
+    return radius + radii[i] + margin;
+}
+
+int PedestrianSafeness::static_fail(const Vec2d &position, double time) const{
+    const std::vector<int> &ids = near(position.x, position.y, position.x, position.y, time, time);
+    for(size_t k = 0; k<ids.size(); ++k){
+        int i = ids[k];
+        if(position.distance_to(future_position(i, time)) < safe_distance(i))
+            return i;
+    }
+    return -1;
+}
+
+int PedestrianSafeness::turn_fail(const Vec2d &position, double start_time, double end_time) const{
+    const std::vector<int> &ids = near(position.x, position.y, position.x, position.y,
+                                       start_time, end_time);
+    for(size_t k = 0; k<ids.size(); ++k){
+        int i = ids[k];
+        double d = safe_distance(i);
+        if(linesegdist2(future_position(i, start_time), future_position(i, end_time), position) < d*d)
+            return i;
+    }
+    return -1;
+}
+
+int PedestrianSafeness::line_fail(const Vec2d &position, const Vec2d &velocity,
+                                  double start_time, double end_time) const{
+    /*
+    Closest approach of the agent and each pedestrian, both moving linearly
+    */
+    Vec2d end = position + velocity*(float)(end_time - start_time);
+    const std::vector<int> &ids = near(std::min(position.x, end.x), std::min(position.y, end.y),
+                                       std::max(position.x, end.x), std::max(position.y, end.y),
+                                       start_time, end_time);
+    for(size_t k = 0; k<ids.size(); ++k){
+        int i = ids[k];
+        Vec2d pd = position - future_position(i, start_time);
+        Vec2d vd = velocity - velocities[i];
+        float vd2 = vd.length2();
+        double t = 0;
+        if(vd2 != 0)
+            t = -(double)pd.dot(vd) / vd2;
+        t = std::max(std::min(t, end_time - start_time), 0.0);
+        double d = safe_distance(i);
+        if((pd + vd*(float)t).length2() < d*d)
+            return i;
+    }
+    return -1;
+}
+
+bool PedestrianSafeness::static_fails(const double *p, int n, int *fail, int nfail) const{
+    if(n % 3 != 0 || nfail != n / 3)
+        return false;
+    for(int i = 0; i<nfail; ++i)
+        fail[i] = static_fail(Vec2d((float)p[3*i], (float)p[3*i + 1]), p[3*i + 2]);
+    return true;
+}
+
+bool PedestrianSafeness::turn_fails(const double *t, int n, double turningspeed,
+                                    int *fail, int nfail) const{
+    if(n % 5 != 0 || nfail != n / 5)
+        return false;
+    for(int i = 0; i<nfail; ++i){
+        const double *row = t + 5*i;
+        double duration = std::abs((double)angle_diff((float)row[2], (float)row[3])) / turningspeed;
+        fail[i] = turn_fail(Vec2d((float)row[0], (float)row[1]), row[4], row[4] + duration);
+    }
+    return true;
+}
+
+int PedestrianSafeness::segment_fail(const Vec2d &p1, const Vec2d &p2,
+                                     double start_time, double speed) const{
+    if(p1 == p2)
+        return static_fail(p1, start_time);
+    Vec2d diff = p2 - p1;
+    float length = diff.length();
+    Vec2d velocity = diff*(float)speed/length;
+    return line_fail(p1, velocity, start_time, start_time + length/speed);
+}
+
+bool PedestrianSafeness::segment_fails(const double *s, int n, double speed,
+                                       int *fail, int nfail) const{
+    if(n % 5 != 0 || nfail != n / 5)
+        return false;
+    for(int i = 0; i<nfail; ++i){
+        const double *row = s + 5*i;
+        fail[i] = segment_fail(Vec2d((float)row[0], (float)row[1]), Vec2d((float)row[2], (float)row[3]),
+                               row[4], speed);
+    }
+    return true;
+}
@@ -0,0 +1,62 @@
+#ifndef _SAFENESS_HPP
+#define _SAFENESS_HPP
+
+#include <vector>
+#include "vector2d.hpp"
+#include "prediction.hpp"
+
+// Batched versions of the pedestrian tests of the Arty planner
+// (static_safeness, turn_safeness and line_pedestrian_safeness). Pedestrians
+// are extrapolated linearly from where they are when the view is taken, and
+// a test fails on the first pedestrian that gets closer than the agent radius
+// plus its own radius plus the margin. Every test gives the index of that
+// pedestrian, or -1 if the agent is safe.
+//
+// With predict(), the tests only look at the pedestrians that a
+// PedestrianPrediction finds close to the agent during the test (tests
+// reaching past its horizon still go through all of them).
+class PedestrianSafeness {
+public:
+    PedestrianSafeness();
+    void set_agent(double radius, double margin);
+    // rows of x, y, vx, vy, radius
+    void set_pedestrians(const float *pedestrians, int npedestrians);
+    int num_pedestrians() const;
+    // index the pedestrians in nslices time slices of slice_time each,
+    // until the pedestrians are set again
+    void predict(double slice_time, int nslices);
+    double horizon() const;
+
+    int static_fail(const Vec2d &position, double time) const;
+    // standing at position while turning from start_time to end_time
+    int turn_fail(const Vec2d &position, double start_time, double end_time) const;
+    int line_fail(const Vec2d &position, const Vec2d &velocity,
+                  double start_time, double end_time) const;
+    // moving straight from p1 to p2 at speed
+    int segment_fail(const Vec2d &p1, const Vec2d &p2, double start_time, double speed) const;
+
+    // rows of x, y, time
+    bool static_fails(const double *points, int npoints, int *fail, int nfail) const;
+    // rows of x, y, a1, a2, start time, turning from angle a1 to a2
+    bool turn_fails(const double *turns, int nturns, double turningspeed,
+                    int *fail, int nfail) const;
+    // rows of x1, y1, x2, y2, start time, moving straight at speed
+    bool segment_fails(const double *segments, int nsegments, double speed,
+                       int *fail, int nfail) const;
+private:
+    Vec2d future_position(int pedestrian, double time) const;
+    double safe_distance(int pedestrian) const;
+    // the pedestrians to test for an agent within the box (before adding
+    // the safe distance) between start_time and end_time
+    const std::vector<int> &near(float minx, float miny, float maxx, float maxy,
+                                 double start_time, double end_time) const;
+    std::vector<Vec2d> positions, velocities;
+    std::vector<float> radii;
+    float max_radius;
+    double radius, margin;
+    PedestrianPrediction prediction;
+    std::vector<int> everyone;
+    mutable std::vector<int> candidates;
+};
+
+#endif
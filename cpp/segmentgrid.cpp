@@ -0,0 +1,106 @@
+#include <algorithm>
+#include <cmath>
+#include "segmentgrid.hpp"
+
+// slack (in cells) when rasterizing segments, to be safe from rounding errors
+static const double RASTER_EPS = 1e-6;
+
+SegmentGrid::SegmentGrid()
+    :nsegments(0),
+    minx(0), miny(0), maxx(0), maxy(0),
+    cell(1),
+    nx(0), ny(0)
+{
+}
+
+void SegmentGrid::build(const std::vector<Segment> &segments){
+    nsegments = segments.size();
+    cells.clear();
+    nx = ny = 0;
+    if(nsegments == 0)
+        return;
+
+    minx = maxx = segments[0].first.x;
+    miny = maxy = segments[0].first.y;
+    for(size_t i = 0; i<nsegments; ++i){
+        const Segment &s = segments[i];
+        minx = std::min(minx, std::min(s.first.x, s.second.x));
+        maxx = std::max(maxx, std::max(s.first.x, s.second.x));
+        miny = std::min(miny, std::min(s.first.y, s.second.y));
+        maxy = std::max(maxy, std::max(s.first.y, s.second.y));
+    }
+    // aim for roughly one cell per segment
+    double w = (double)maxx - minx, h = (double)maxy - miny;
+    cell = std::max(std::sqrt(w*h/nsegments), std::max(w, h)/nsegments);
+    if(!(cell > 0))
+        cell = 1; // all segments are the same point
+    nx = (int)(w/cell) + 1;
+    ny = (int)(h/cell) + 1;
+    cells.resize((size_t)nx*ny);
+    for(size_t i = 0; i<nsegments; ++i)
+        add((int)i, segments[i]);
+}
+
+int SegmentGrid::column(double x) const{
+    double c = std::floor((x - minx)/cell);
+    return (int)std::max(0.0, std::min(c, (double)nx - 1));
+}
+
+int SegmentGrid::row(double y) const{
+    double r = std::floor((y - miny)/cell);
+    return (int)std::max(0.0, std::min(r, (double)ny - 1));
+}
+
+void SegmentGrid::add(int id, const Segment &s){
+    // walk the columns spanned by the segment and register the rows it covers in each
+    const Vec2d &a = s.first.x <= s.second.x ? s.first : s.second;
+    const Vec2d &b = s.first.x <= s.second.x ? s.second : s.first;
+    double dx = (double)b.x - a.x;
+    int c0 = column(a.x), c1 = column(b.x);
+    for(int c = c0; c <= c1; ++c){
+        double y0 = a.y, y1 = b.y;
+        if(dx > 0){
+            double xl = std::max((double)a.x, minx + c*cell);
+            double xr = std::min((double)b.x, minx + (c+1)*cell);
+            y0 = a.y + (b.y - a.y)*(xl - a.x)/dx;
+            y1 = a.y + (b.y - a.y)*(xr - a.x)/dx;
+        }
+        if(y0 > y1)
+            std::swap(y0, y1);
+        int r0 = row(y0 - RASTER_EPS*cell), r1 = row(y1 + RASTER_EPS*cell);
+        for(int r = r0; r <= r1; ++r)
+            cells[(size_t)r*nx + c].push_back(id);
+    }
+}
+
+void SegmentGrid::query(const Vec2d &center, float range, std::vector<int> &result) const{
+    query_box(center.x - range, center.y - range, center.x + range, center.y + range, result);
+}
+
+void SegmentGrid::query_box(float qminx, float qminy, float qmaxx, float qmaxy, std::vector<int> &result) const{
+    result.clear();
+    if(nsegments == 0 || qmaxx < minx || qminx > maxx || qmaxy < miny || qminy > maxy)
+        return;
+    int c0 = column(qminx), c1 = column(qmaxx);
+    int r0 = row(qminy), r1 = row(qmaxy);
+    for(int r = r0; r <= r1; ++r){
+        for(int c = c0; c <= c1; ++c){
+            const std::vector<int> &ids = cells[(size_t)r*nx + c];
+            result.insert(result.end(), ids.begin(), ids.end());
+        }
+    }
+    std::sort(result.begin(), result.end());
+    result.erase(std::unique(result.begin(), result.end()), result.end());
+}
+
+size_t SegmentGrid::size() const{
+    return nsegments;
+}
+
+int SegmentGrid::columns() const{
+    return nx;
+}
+
+int SegmentGrid::rows() const{
+    return ny;
+}
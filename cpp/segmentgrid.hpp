@@ -0,0 +1,35 @@
+#ifndef _SEGMENTGRID_HPP
+#define _SEGMENTGRID_HPP
+
+#include <vector>
+#include <utility>
+#include "vector2d.hpp"
+
+typedef std::pair<Vec2d, Vec2d> Segment;
+
+// Static uniform grid over a set of line segments, meant for obstacles that
+// don't change once the simulation is running. Each segment is registered in
+// every cell it passes through. Queries return the (sorted, unique) ids of
+// the segments registered in the cells overlapped by the query box, i.e. a
+// superset of the segments within range - callers do the exact test.
+class SegmentGrid {
+public:
+    SegmentGrid();
+    void build(const std::vector<Segment> &segments);
+    void query(const Vec2d &center, float range, std::vector<int> &result) const;
+    void query_box(float minx, float miny, float maxx, float maxy, std::vector<int> &result) const;
+    size_t size() const;
+    int columns() const;
+    int rows() const;
+private:
+    int column(double x) const;
+    int row(double y) const;
+    void add(int id, const Segment &s);
+    size_t nsegments;
+    float minx, miny, maxx, maxy;
+    double cell;
+    int nx, ny;
+    std::vector<std::vector<int> > cells;
+};
+
+#endif
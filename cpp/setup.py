@@ -20,9 +20,14 @@ particle_module = Extension(
         'particle.i',
         'linearparticle.cpp',
         'particle.cpp',
+        'spatialhash.cpp',
+        'segmentgrid.cpp',
+        'occlusion.cpp',
+        'workerpool.cpp',
         'geometry.cpp',
         'vector2d.cpp',
     ],
+    libraries=['pthread'],
     swig_opts=swig_opts
 )
 
@@ -31,8 +36,16 @@ geometry_module = Extension(
     sources=[
         'geometry.i',
         'geometry.cpp',
+        'freepaths.cpp',
+        'safeness.cpp',
+        'prediction.cpp',
+        'segmentgrid.cpp',
+        'voronoi.cpp',
+        'delaunay.cpp',
         'vector2d.cpp',
     ],
+    # the results have to match the python code, no fused multiply-adds
+    extra_compile_args=['-ffp-contract=off'],
     swig_opts=swig_opts
 )
 
@@ -41,6 +54,10 @@ astar_module = Extension(
     sources=[
         'astar.i',
         'astar.cpp',
+        'csrgraph.cpp',
+        'dstarlite.cpp',
+        'spatialhash.cpp',
+        'vector2d.cpp',
     ],
     swig_opts=swig_opts
 )
@@ -0,0 +1,103 @@
+#include <algorithm>
+#include <cmath>
+#include "spatialhash.hpp"
+
+// cell coordinates are clamped to this range so that far away (or nan)
+// positions still end up in some cell instead of overflowing the int cast
+static const int CELL_LIMIT = 1 << 20;
+static const size_t MIN_BUCKETS = 64;
+
+SpatialHash::SpatialHash()
+    :cell(1),
+    count(0),
+    buckets(MIN_BUCKETS)
+{
+}
+
+void SpatialHash::reset(float cell_size, size_t expected_size){
+    cell = cell_size > 0 ? cell_size : 1;
+    size_t nbuckets = MIN_BUCKETS;
+    while(nbuckets < 2*expected_size)
+        nbuckets *= 2;  // power of two, so bucket() can mask instead of mod
+    if(nbuckets != buckets.size())
+        buckets.resize(nbuckets);
+    clear();
+}
+
+void SpatialHash::clear(){
+    for(size_t i = 0; i<buckets.size(); ++i)
+        buckets[i].clear();
+    count = 0;
+}
+
+int SpatialHash::cell_coord(double v) const{
+    double c = std::floor(v / cell);
+    if(!(c > -CELL_LIMIT))
+        return -CELL_LIMIT;
+    if(c > CELL_LIMIT)
+        return CELL_LIMIT;
+    return (int)c;
+}
+
+size_t SpatialHash::bucket(int cx, int cy) const{
+    unsigned int h = ((unsigned int)cx * 73856093u) ^ ((unsigned int)cy * 19349663u);
+    return h & (buckets.size() - 1);
+}
+
+void SpatialHash::insert(int id, const Vec2d &p){
+    buckets[bucket(cell_coord(p.x), cell_coord(p.y))].push_back(id);
+    ++count;
+}
+
+void SpatialHash::remove(int id, const Vec2d &p){
+    std::vector<int> &b = buckets[bucket(cell_coord(p.x), cell_coord(p.y))];
+    for(size_t i = 0; i<b.size(); ++i){
+        if(b[i] == id){
+            b[i] = b.back();
+            b.pop_back();
+            --count;
+            return;
+        }
+    }
+}
+
+void SpatialHash::move(int id, const Vec2d &from, const Vec2d &to){
+    if(same_cell(from, to))
+        return;
+    remove(id, from);
+    insert(id, to);
+}
+
+bool SpatialHash::same_cell(const Vec2d &a, const Vec2d &b) const{
+    return cell_coord(a.x) == cell_coord(b.x) && cell_coord(a.y) == cell_coord(b.y);
+}
+
+void SpatialHash::query(const Vec2d &center, float range, std::vector<int> &result) const{
+    result.clear();
+    int x0 = cell_coord((double)center.x - range), x1 = cell_coord((double)center.x + range);
+    int y0 = cell_coord((double)center.y - range), y1 = cell_coord((double)center.y + range);
+    double ncells = ((double)x1 - x0 + 1) * ((double)y1 - y0 + 1);
+    if(ncells >= buckets.size()){
+        // the box covers more cells than there are buckets, cheaper to take everything
+        for(size_t i = 0; i<buckets.size(); ++i)
+            result.insert(result.end(), buckets[i].begin(), buckets[i].end());
+    } else {
+        for(int cx = x0; cx <= x1; ++cx){
+            for(int cy = y0; cy <= y1; ++cy){
+                const std::vector<int> &b = buckets[bucket(cx, cy)];
+                result.insert(result.end(), b.begin(), b.end());
+            }
+        }
+    }
+    // different cells can share a bucket, so the same id may show up twice
+    std::sort(result.begin(), result.end());
+    result.erase(std::unique(result.begin(), result.end()), result.end());
+}
+
+float SpatialHash::cell_size() const{
+    return cell;
+}
+
+size_t SpatialHash::size() const{
+    return count;
+}
@@ -0,0 +1,35 @@
+#ifndef _SPATIALHASH_HPP
+#define _SPATIALHASH_HPP
+
+#include <vector>
+#include <cstddef>
+#include "vector2d.hpp"
+
+// Uniform grid of square cells, hashed into a fixed number of buckets so that
+// the grid can cover an unbounded plane. Stores integer ids (e.g. indices into
+// World::particles). Queries return every id stored in the cells overlapped by
+// the query box, i.e. a superset of the ids within range - callers are
+// expected to do the exact distance test themselves.
+class SpatialHash {
+public:
+    SpatialHash();
+    void reset(float cell_size, size_t expected_size);
+    void clear();
+    void insert(int id, const Vec2d &p);
+    void remove(int id, const Vec2d &p);
+    void move(int id, const Vec2d &from, const Vec2d &to);
+    bool same_cell(const Vec2d &a, const Vec2d &b) const;
+    // Sorted, duplicate free ids of all cells overlapping the square
+    // [center - range, center + range]
+    void query(const Vec2d &center, float range, std::vector<int> &result) const;
+    float cell_size() const;
+    size_t size() const;
+private:
+    int cell_coord(double v) const;
+    size_t bucket(int cx, int cy) const;
+    float cell;
+    size_t count;
+    std::vector<std::vector<int> > buckets;
+};
+
+#endif
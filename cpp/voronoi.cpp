@@ -0,0 +1,562 @@
+#include <cmath>
+#include <deque>
+#include <algorithm>
+#include "voronoi.hpp"
+
+/*
+A line by line port of the python code, see voronoi.hpp. The comparisons and
+the order of the floating point operations are kept as they were.
+*/
+
+namespace {
+
+const double TOLERANCE = 1e-9;
+const double BIG_FLOAT = 1e38;
+const int LE = 0;
+const int RE = 1;
+
+struct Site {
+    double x, y;
+    int sitenum;
+    Site(double x_ = 0.0, double y_ = 0.0, int sitenum_ = 0)
+        :x(x_), y(y_), sitenum(sitenum_){}
+    double distance(const Site &other) const{
+        double dx = x - other.x;
+        double dy = y - other.y;
+        return std::sqrt(dx*dx + dy*dy);
+    }
+};
+
+int cmp(const Site &a, const Site &b){
+    if(a.y < b.y) return -1;
+    if(a.y > b.y) return 1;
+    if(a.x < b.x) return -1;
+    if(a.x > b.x) return 1;
+    return 0;
+}
+
+bool site_less(const Site &a, const Site &b){
+    return cmp(a, b) < 0;
+}
+
+bool is_equal(double a, double b, double relative_error = TOLERANCE){
+    double norm = std::max(std::fabs(a), std::fabs(b));
+    return (norm < relative_error) || (std::fabs(a - b) < (relative_error * norm));
+}
+
+struct Edge {
+    double a, b, c;
+    Site *ep[2];
+    Site *reg[2];
+    int edgenum;
+    Edge(): a(0.0), b(0.0), c(0.0), edgenum(0){
+        ep[0] = ep[1] = reg[0] = reg[1] = NULL;
+    }
+    bool set_endpoint(int lr, Site *site){
+        ep[lr] = site;
+        return ep[RE - lr] != NULL;
+    }
+};
+
+Edge DELETED;  // marker for the edges of deleted halfedges
+
+struct Halfedge {
+    Halfedge *left, *right, *qnext;
+    Edge *edge;
+    int pm;
+    Site *vertex;
+    double ystar;
+    Halfedge(Edge *edge_ = NULL, int pm_ = LE)
+        :left(NULL), right(NULL), qnext(NULL), edge(edge_), pm(pm_),
+        vertex(NULL), ystar(BIG_FLOAT){}
+
+    bool has_edge() const{
+        return edge != NULL && edge != &DELETED;
+    }
+    Site *leftreg(Site *def) const{
+        if(!has_edge()) return def;
+        return pm == LE ? edge->reg[LE] : edge->reg[RE];
+    }
+    Site *rightreg(Site *def) const{
+        if(!has_edge()) return def;
+        return pm == LE ? edge->reg[RE] : edge->reg[LE];
+    }
+    bool is_point_right_of(const Site &pt) const;
+};
+
+int cmp(const Halfedge &a, const Halfedge &b){
+    if(a.ystar > b.ystar) return 1;
+    if(a.ystar < b.ystar) return -1;
+    if(a.vertex->x > b.vertex->x) return 1;
+    if(a.vertex->x < b.vertex->x) return -1;
+    return 0;
+}
+
+bool Halfedge::is_point_right_of(const Site &pt) const{
+    const Edge *e = edge;
+    const Site *topsite = e->reg[1];
+    bool right_of_site = pt.x > topsite->x;
+
+    if(right_of_site && pm == LE)
+        return true;
+    if(!right_of_site && pm == RE)
+        return false;
+
+    bool above;
+    if(e->a == 1.0){
+        double dyp = pt.y - topsite->y;
+        double dxp = pt.x - topsite->x;
+        bool fast = false;
+        if((!right_of_site && e->b < 0.0) || (right_of_site && e->b >= 0.0)){
+            above = dyp >= e->b * dxp;
+            fast = above;
+        }else{
+            above = pt.x + pt.y * e->b > e->c;
+            if(e->b < 0.0)
+                above = !above;
+            if(!above)
+                fast = true;
+        }
+        if(!fast){
+            double dxs = topsite->x - e->reg[0]->x;
+            above = e->b * (dxp*dxp - dyp*dyp) < dxs*dyp*(1.0 + 2.0*dxp/dxs + e->b*e->b);
+            if(e->b < 0.0)
+                above = !above;
+        }
+    }else{  // e->b == 1.0
+        double yl = e->c - e->a * pt.x;
+        double t1 = pt.y - yl;
+        double t2 = pt.x - topsite->x;
+        double t3 = yl - topsite->y;
+        above = t1*t1 > t2*t2 + t3*t3;
+    }
+    return pm == LE ? above : !above;
+}
+
+// bucket index for a position of x within the table size, like int() with
+// clamping in python (which fails for infinities and nan instead)
+int bucket_index(double x, int size){
+    if(!(x < size))
+        return size - 1;
+    if(x < 0)
+        return 0;
+    return (int)x;
+}
+
+class Fortune {
+public:
+    Fortune(const double *points, int npoints);
+    void run(std::vector<double> &vertices, std::vector<double> &lines,
+             std::vector<int> &edges, std::vector<int> &triangles);
+private:
+    Site *new_site(double x, double y){
+        sitepool.push_back(Site(x, y));
+        return &sitepool.back();
+    }
+    Halfedge *new_halfedge(Edge *edge = NULL, int pm = LE){
+        halfedgepool.push_back(Halfedge(edge, pm));
+        return &halfedgepool.back();
+    }
+    Edge *bisect(Site *s1, Site *s2);
+    Site *intersect(Halfedge *el1, Halfedge *el2);
+
+    // edge list
+    void el_insert(Halfedge *left, Halfedge *he);
+    void el_delete(Halfedge *he);
+    Halfedge *gethash(int b);
+    Halfedge *leftbnd(const Site &pt);
+
+    // priority queue
+    void pq_insert(Halfedge *he, Site *site, double offset);
+    void pq_delete(Halfedge *he);
+    int pq_bucket(const Halfedge *he);
+    Site pq_min();
+    Halfedge *pq_pop();
+
+    void out_edge(const Edge *edge);
+
+    std::vector<Site> sites;
+    double xmin, xmax, ymin, ymax;
+    int vertexnum;
+
+    std::deque<Site> sitepool;
+    std::deque<Edge> edgepool;
+    std::deque<Halfedge> halfedgepool;
+
+    int el_hashsize;
+    double el_xmin, el_deltax;
+    std::vector<Halfedge*> el_hash;
+    Halfedge *leftend, *rightend;
+
+    double pq_ymin, pq_deltay;
+    int pq_hashsize, pq_count, pq_minidx;
+    std::vector<Halfedge*> pq_hash;
+
+    std::vector<int> *edges_out;
+};
+
+Fortune::Fortune(const double *points, int n)
+    :vertexnum(0), edges_out(NULL)
+{
+    xmin = xmax = points[0];
+    ymin = ymax = points[1];
+    for(int i = 0; i<n; ++i){
+        double x = points[2*i], y = points[2*i + 1];
+        sites.push_back(Site(x, y, i));
+        if(x < xmin) xmin = x;
+        if(y < ymin) ymin = y;
+        if(x > xmax) xmax = x;
+        if(y > ymax) ymax = y;
+    }
+    std::stable_sort(sites.begin(), sites.end(), site_less);
+
+    double exmin = xmin, exmax = xmax;
+    if(exmin > exmax) std::swap(exmin, exmax);
+    el_hashsize = (int)(2*std::sqrt((double)(n + 4)));
+    el_xmin = exmin;
+    el_deltax = exmax - exmin;
+    el_hash.assign(el_hashsize, NULL);
+    leftend = new_halfedge();
+    rightend = new_halfedge();
+    leftend->right = rightend;
+    rightend->left = leftend;
+    el_hash[0] = leftend;
+    el_hash[el_hashsize - 1] = rightend;
+
+    pq_ymin = ymin;
+    pq_deltay = ymax - ymin;
+    pq_hashsize = (int)(4*std::sqrt((double)n));
+    pq_count = 0;
+    pq_minidx = 0;
+    for(int i = 0; i<pq_hashsize; ++i)
+        pq_hash.push_back(new_halfedge());
+}
+
+Edge *Fortune::bisect(Site *s1, Site *s2){
+    edgepool.push_back(Edge());
+    Edge *newedge = &edgepool.back();
+    newedge->reg[0] = s1;
+    newedge->reg[1] = s2;
+
+    double dx = s2->x - s1->x;
+    double dy = s2->y - s1->y;
+    double adx = std::fabs(dx);
+    double ady = std::fabs(dy);
+
+    newedge->c = s1->x * dx + s1->y * dy + (dx*dx + dy*dy)*0.5;
+    if(adx > ady){
+        newedge->a = 1.0;
+        newedge->b = dy/dx;
+        newedge->c /= dx;
+    }else{
+        newedge->b = 1.0;
+        newedge->a = dx/dy;
+        newedge->c /= dy;
+    }
+    newedge->edgenum = (int)edgepool.size() - 1;
+    return newedge;
+}
+
+Site *Fortune::intersect(Halfedge *el1, Halfedge *el2){
+    if(!el1->has_edge() || !el2->has_edge())
+        return NULL;
+    Edge *e1 = el1->edge;
+    Edge *e2 = el2->edge;
+
+    // if the two edges bisect the same parent there is no intersection
+    if(e1->reg[1] == e2->reg[1])
+        return NULL;
+
+    double d = e1->a * e2->b - e1->b * e2->a;
+    if(is_equal(d, 0.0))
+        return NULL;
+
+    double xint = (e1->c*e2->b - e2->c*e1->b) / d;
+    double yint = (e2->c*e1->a - e1->c*e2->a) / d;
+    Halfedge *he;
+    Edge *e;
+    if(cmp(*e1->reg[1], *e2->reg[1]) < 0){
+        he = el1;
+        e = e1;
+    }else{
+        he = el2;
+        e = e2;
+    }
+
+    bool right_of_site = xint >= e->reg[1]->x;
+    if((right_of_site && he->pm == LE) || (!right_of_site && he->pm == RE))
+        return NULL;
+
+    return new_site(xint, yint);
+}
+
+void Fortune::el_insert(Halfedge *left, Halfedge *he){
+    he->left = left;
+    he->right = left->right;
+    left->right->left = he;
+    left->right = he;
+}
+
+void Fortune::el_delete(Halfedge *he){
+    he->left->right = he->right;
+    he->right->left = he->left;
+    he->edge = &DELETED;
+}
+
+Halfedge *Fortune::gethash(int b){
+    if(b < 0 || b >= el_hashsize)
+        return NULL;
+    Halfedge *he = el_hash[b];
+    if(he == NULL || he->edge != &DELETED)
+        return he;
+    // the hash table points to a deleted halfedge
+    el_hash[b] = NULL;
+    return NULL;
+}
+
+Halfedge *Fortune::leftbnd(const Site &pt){
+    int bucket = bucket_index((pt.x - el_xmin)/el_deltax * el_hashsize, el_hashsize);
+    Halfedge *he = gethash(bucket);
+    if(he == NULL){
+        for(int i = 1; ; ++i){
+            he = gethash(bucket - i);
+            if(he != NULL) break;
+            he = gethash(bucket + i);
+            if(he != NULL) break;
+        }
+    }
+
+    // search the linear list of halfedges for the correct one
+    if(he == leftend || (he != rightend && he->is_point_right_of(pt))){
+        he = he->right;
+        while(he != rightend && he->is_point_right_of(pt))
+            he = he->right;
+        he = he->left;
+    }else{
+        he = he->left;
+        while(he != leftend && !he->is_point_right_of(pt))
+            he = he->left;
+    }
+
+    if(bucket > 0 && bucket < el_hashsize - 1)
+        el_hash[bucket] = he;
+    return he;
+}
+
+int Fortune::pq_bucket(const Halfedge *he){
+    int bucket = bucket_index(((he->ystar - pq_ymin) / pq_deltay) * pq_hashsize, pq_hashsize);
+    if(bucket < pq_minidx)
+        pq_minidx = bucket;
+    return bucket;
+}
+
+void Fortune::pq_insert(Halfedge *he, Site *site, double offset){
+    he->vertex = site;
+    he->ystar = site->y + offset;
+    Halfedge *last = pq_hash[pq_bucket(he)];
+    Halfedge *next = last->qnext;
+    while(next != NULL && cmp(*he, *next) > 0){
+        last = next;
+        next = last->qnext;
+    }
+    he->qnext = last->qnext;
+    last->qnext = he;
+    ++pq_count;
+}
+
+void Fortune::pq_delete(Halfedge *he){
+    if(he->vertex != NULL){
+        Halfedge *last = pq_hash[pq_bucket(he)];
+        while(last->qnext != he)
+            last = last->qnext;
+        last->qnext = he->qnext;
+        --pq_count;
+        he->vertex = NULL;
+    }
+}
+
+Site Fortune::pq_min(){
+    while(pq_hash[pq_minidx]->qnext == NULL)
+        ++pq_minidx;
+    Halfedge *he = pq_hash[pq_minidx]->qnext;
+    return Site(he->vertex->x, he->ystar);
+}
+
+Halfedge *Fortune::pq_pop(){
+    Halfedge *curr = pq_hash[pq_minidx]->qnext;
+    pq_hash[pq_minidx]->qnext = curr->qnext;
+    --pq_count;
+    return curr;
+}
+
+void Fortune::out_edge(const Edge *edge){
+    edges_out->push_back(edge->edgenum);
+    edges_out->push_back(edge->ep[LE] != NULL ? edge->ep[LE]->sitenum : -1);
+    edges_out->push_back(edge->ep[RE] != NULL ? edge->ep[RE]->sitenum : -1);
+}
+
+void Fortune::run(std::vector<double> &vertices, std::vector<double> &lines,
+                  std::vector<int> &edges, std::vector<int> &triangles){
+    edges_out = &edges;
+    size_t nextsite = 0;
+    Site *bottomsite = &sites[nextsite++];
+    Site *newsite = nextsite < sites.size() ? &sites[nextsite++] : NULL;
+    Site minpt(-BIG_FLOAT, -BIG_FLOAT);
+    while(true){
+        if(pq_count != 0)
+            minpt = pq_min();
+
+        if(newsite != NULL && (pq_count == 0 || cmp(*newsite, minpt) < 0)){
+            // site event
+            Halfedge *lbnd = leftbnd(*newsite);
+            Halfedge *rbnd = lbnd->right;
+
+            Site *bot = lbnd->rightreg(bottomsite);
+            Edge *edge = bisect(bot, newsite);
+            lines.push_back(edge->a);
+            lines.push_back(edge->b);
+            lines.push_back(edge->c);
+
+            Halfedge *bisector = new_halfedge(edge, LE);
+            el_insert(lbnd, bisector);
+
+            Site *p = intersect(lbnd, bisector);
+            if(p != NULL){
+                pq_delete(lbnd);
+                pq_insert(lbnd, p, newsite->distance(*p));
+            }
+
+            lbnd = bisector;
+            bisector = new_halfedge(edge, RE);
+            el_insert(lbnd, bisector);
+
+            p = intersect(bisector, rbnd);
+            if(p != NULL)
+                pq_insert(bisector, p, newsite->distance(*p));
+
+            newsite = nextsite < sites.size() ? &sites[nextsite++] : NULL;
+        }else if(pq_count != 0){
+            // circle event
+            Halfedge *lbnd = pq_pop();
+            Halfedge *llbnd = lbnd->left;
+            Halfedge *rbnd = lbnd->right;
+            Halfedge *rrbnd = rbnd->right;
+
+            Site *bot = lbnd->leftreg(bottomsite);
+            Site *top = rbnd->rightreg(bottomsite);
+
+            Site *mid = lbnd->rightreg(bottomsite);
+            triangles.push_back(bot->sitenum);
+            triangles.push_back(top->sitenum);
+            triangles.push_back(mid->sitenum);
+
+            Site *v = lbnd->vertex;
+            v->sitenum = vertexnum++;
+            vertices.push_back(v->x);
+            vertices.push_back(v->y);
+
+            if(lbnd->edge->set_endpoint(lbnd->pm, v))
+                out_edge(lbnd->edge);
+            if(rbnd->edge->set_endpoint(rbnd->pm, v))
+                out_edge(rbnd->edge);
+
+            el_delete(lbnd);
+            pq_delete(rbnd);
+            el_delete(rbnd);
+
+            int pm = LE;
+            if(bot->y > top->y){
+                std::swap(bot, top);
+                pm = RE;
+            }
+
+            Edge *edge = bisect(bot, top);
+            lines.push_back(edge->a);
+            lines.push_back(edge->b);
+            lines.push_back(edge->c);
+
+            Halfedge *bisector = new_halfedge(edge, pm);
+            el_insert(llbnd, bisector);
+            if(edge->set_endpoint(RE - pm, v))
+                out_edge(edge);
+
+            Site *p = intersect(llbnd, bisector);
+            if(p != NULL){
+                pq_delete(llbnd);
+                pq_insert(llbnd, p, bot->distance(*p));
+            }
+
+            p = intersect(bisector, rrbnd);
+            if(p != NULL)
+                pq_insert(bisector, p, bot->distance(*p));
+        }else{
+            break;
+        }
+    }
+
+    for(Halfedge *he = leftend->right; he != rightend; he = he->right)
+        out_edge(he->edge);
+}
+
+bool copy_out(const std::vector<double> &from, double *out, int nout){
+    if((size_t)nout != from.size())
+        return false;
+    std::copy(from.begin(), from.end(), out);
+    return true;
+}
+
+bool copy_out(const std::vector<int> &from, int *out, int nout){
+    if((size_t)nout != from.size())
+        return false;
+    std::copy(from.begin(), from.end(), out);
+    return true;
+}
+
+}
+
+Voronoi::Voronoi(){
+}
+
+void Voronoi::compute(const double *points, int npoints){
+    vertices.clear();
+    lines.clear();
+    edges.clear();
+    triangles.clear();
+    int n = npoints / 2;
+    if(n == 0)
+        return;
+    Fortune fortune(points, n);
+    fortune.run(vertices, lines, edges, triangles);
+}
+
+int Voronoi::num_vertices() const{
+    return (int)vertices.size() / 2;
+}
+
+int Voronoi::num_lines() const{
+    return (int)lines.size() / 3;
+}
+
+int Voronoi::num_edges() const{
+    return (int)edges.size() / 3;
+}
+
+int Voronoi::num_triangles() const{
+    return (int)triangles.size() / 3;
+}
+
+bool Voronoi::get_vertices(double *out, int nout) const{
+    return copy_out(vertices, out, nout);
+}
+
+bool Voronoi::get_lines(double *out, int nout) const{
+    return copy_out(lines, out, nout);
+}
+
+bool Voronoi::get_edges(int *out, int nout) const{
+    return copy_out(edges, out, nout);
+}
+
+bool Voronoi::get_triangles(int *out, int nout) const{
+    return copy_out(triangles, out, nout);
+}
@@ -0,0 +1,39 @@
+#ifndef _VORONOI_HPP
+#define _VORONOI_HPP
+
+#include <vector>
+
+// Voronoi diagram and Delaunay triangulation of a set of points with
+// Fortune's sweep line algorithm, ported from the python implementation
+// (after Steve Fortune's C code and Bill Simons' python version) that the
+// agents used to carry. All arithmetic is in double precision like in
+// python, so the results are exactly the same as before.
+//
+// The results are the same as computeVoronoiDiagram and
+// computeDelaunayTriangulation of the python code gave:
+// - vertices: rows of x, y
+// - lines: rows of a, b, c of the lines a*x + b*y = c
+// - edges: rows of line index, vertex index, vertex index (-1 for an end
+//   going to infinity)
+// - triangles: rows of the indices of three points
+// The vertex with index i is the center of the circle through the points of
+// triangle i.
+class Voronoi {
+public:
+    Voronoi();
+    // rows of x, y
+    void compute(const double *points, int npoints);
+    int num_vertices() const;
+    int num_lines() const;
+    int num_edges() const;
+    int num_triangles() const;
+    bool get_vertices(double *out, int nout) const;
+    bool get_lines(double *out, int nout) const;
+    bool get_edges(int *out, int nout) const;
+    bool get_triangles(int *out, int nout) const;
+private:
+    std::vector<double> vertices, lines;
+    std::vector<int> edges, triangles;
+};
+
+#endif
@@ -0,0 +1,108 @@
+#include <algorithm>
+#include "workerpool.hpp"
+
+WorkerPool::WorkerPool()
+    :task(NULL),
+    next(0), total(0), grain(1),
+    busy(0),
+    generation(0),
+    stopping(false)
+{
+    pthread_mutex_init(&mutex, NULL);
+    pthread_cond_init(&wake, NULL);
+    pthread_cond_init(&done, NULL);
+}
+
+WorkerPool::~WorkerPool(){
+    stop();
+    pthread_cond_destroy(&done);
+    pthread_cond_destroy(&wake);
+    pthread_mutex_destroy(&mutex);
+}
+
+void WorkerPool::stop(){
+    pthread_mutex_lock(&mutex);
+    stopping = true;
+    pthread_cond_broadcast(&wake);
+    pthread_mutex_unlock(&mutex);
+    for(size_t i = 0; i<workers.size(); ++i)
+        pthread_join(workers[i], NULL);
+    workers.clear();
+    stopping = false;
+}
+
+void WorkerPool::set_threads(int n){
+    size_t extra = (size_t)std::max(n, 1) - 1; // the caller is one of them
+    if(extra == workers.size())
+        return;
+    stop();
+    for(size_t i = 0; i<extra; ++i){
+        pthread_t thread;
+        if(pthread_create(&thread, NULL, worker_main, this) != 0)
+            break; // make do with fewer threads
+        workers.push_back(thread);
+    }
+}
+
+int WorkerPool::threads() const{
+    return (int)workers.size() + 1;
+}
+
+void *WorkerPool::worker_main(void *p){
+    WorkerPool *pool = (WorkerPool*)p;
+    pthread_mutex_lock(&pool->mutex);
+    unsigned int seen = pool->generation;
+    while(true){
+        while(!pool->stopping && pool->generation == seen)
+            pthread_cond_wait(&pool->wake, &pool->mutex);
+        if(pool->stopping)
+            break;
+        seen = pool->generation;
+        ++pool->busy;
+        pthread_mutex_unlock(&pool->mutex);
+        pool->work();
+        pthread_mutex_lock(&pool->mutex);
+        if(--pool->busy == 0)
+            pthread_cond_signal(&pool->done);
+    }
+    pthread_mutex_unlock(&pool->mutex);
+    return NULL;
+}
+
+void WorkerPool::work(){
+    while(true){
+        pthread_mutex_lock(&mutex);
+        if(next >= total){
+            pthread_mutex_unlock(&mutex);
+            return;
+        }
+        size_t begin = next, end = std::min(total, next + grain);
+        next = end;
+        ParallelTask *current = task;
+        pthread_mutex_unlock(&mutex);
+        current->run(begin, end);
+    }
+}
+
+void WorkerPool::run(ParallelTask &t, size_t n, size_t g){
+    if(workers.empty()){
+        t.run(0, n);
+        return;
+    }
+    pthread_mutex_lock(&mutex);
+    task = &t;
+    next = 0;
+    total = n;
+    grain = std::max(g, (size_t)1);
+    ++generation;
+    pthread_cond_broadcast(&wake);
+    pthread_mutex_unlock(&mutex);
+
+    work();
+
+    pthread_mutex_lock(&mutex);
+    while(busy > 0)
+        pthread_cond_wait(&done, &mutex);
+    task = NULL;
+    pthread_mutex_unlock(&mutex);
+}
@@ -0,0 +1,41 @@
+#ifndef _WORKERPOOL_HPP
+#define _WORKERPOOL_HPP
+
+#include <vector>
+#include <pthread.h>
+
+// A piece of work over the items [0, n), split up in ranges by WorkerPool::run()
+class ParallelTask {
+public:
+    virtual ~ParallelTask(){}
+    virtual void run(size_t begin, size_t end) = 0;
+};
+
+// Fixed set of pthreads working together with the calling thread on one
+// ParallelTask at a time. Ranges are handed out in chunks of grain items to
+// whichever thread asks first, so tasks must not depend on which thread runs
+// which range.
+class WorkerPool {
+public:
+    WorkerPool();
+    ~WorkerPool();
+    // total number of threads including the caller of run(), at least 1
+    void set_threads(int n);
+    int threads() const;
+    // returns when the whole range has been processed
+    void run(ParallelTask &task, size_t n, size_t grain);
+private:
+    static void *worker_main(void *pool);
+    void work();
+    void stop();
+    std::vector<pthread_t> workers;
+    pthread_mutex_t mutex;
+    pthread_cond_t wake, done;
+    ParallelTask *task;
+    size_t next, total, grain;
+    int busy;
+    unsigned int generation;
+    bool stopping;
+};
+
+#endif
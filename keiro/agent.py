@@ -44,9 +44,11 @@ class Agent(Unit):
 
     view_range = 150
 
-    def __init__(self, parameter, **kwargs):
+    def __init__(self, parameter, time_budget=None, **kwargs):
         super(Agent, self).__init__(**kwargs)
         self.parameter = parameter
+        # seconds of thinking per tick, None for no limit
+        self.time_budget = time_budget
         self.color = (100, 100, 255)
         self.travel_length = 0
         self.iterations = IterationStats()
@@ -96,17 +98,31 @@ class Agent(Unit):
         if self.goal_occupied(view):
             print "Goal occupied"
         self.iterations.start_iteration()
-        self.think(dt, view, debugsurface)
+        if self.time_budget is None:
+            self.think(dt, view, debugsurface)
+        else:
+            self.think(dt, view, debugsurface,
+                       deadline=time.clock() + self.time_budget)
         # mark visible pedestrians
         for p in view.pedestrians:
             debugsurface.circle(p.position, p.radius + 1, "black", 2)
         self.iterations.end_iteration()
 
-    def think(self, dt, view, debugsurface):
+    def think(self, dt, view, debugsurface, deadline=None):
+        """Plan the next move
+
+        With a time_budget, deadline is the time.clock() value to be done
+        by. Anytime planners then return the best path found so far when it
+        passes (see out_of_time) and go on refining it the next tick.
+        """
         raise NotImplementedError(
             'An Agent needs to have a brain! Implement the `think()` method'
         )
 
+    def out_of_time(self, deadline):
+        """If the deadline given to think has passed"""
+        return deadline is not None and time.clock() >= deadline
+
     def goal_occupied(self, view):
         """Returns if goal is occupied by obstacle/unit that isn't moving
 
@@ -1,7 +1,8 @@
 from vector2d import Vec2d
-from geometry import linesegdist2, line_distance2, angle_diff
+from geometry import linesegdist2, line_distance2, angle_diff, FreePathChecker
 from astar import *
 import math
+import numpy
 
 
 def free_path(p1, p2, view, safe_distance=0):
@@ -19,6 +20,38 @@ def free_path(p1, p2, view, safe_distance=0):
     return True
 
 
+def path_checker(view):
+    """FreePathChecker for the obstacles and pedestrians in view
+
+    Built once per view and kept on it, like free_path() this assumes the
+    view is static.
+    """
+    checker = getattr(view, "_path_checker", None)
+    if checker is None:
+        checker = view._path_checker = FreePathChecker()
+        checker.set_obstacles(numpy.array(
+            [(o.p1.x, o.p1.y, o.p2.x, o.p2.y) for o in view.obstacles],
+            dtype=numpy.float32).ravel())
+        checker.set_pedestrians(numpy.array(
+            [(p.position.x, p.position.y, p.radius) for p in view.pedestrians],
+            dtype=numpy.float32).ravel())
+    return checker
+
+
+def free_paths(segments, view, safe_distance=0):
+    """free_path() for a batch of (p1, p2) segments, as a boolean numpy array
+
+    segments can also be an array with rows of x1, y1, x2, y2.
+    """
+    if not isinstance(segments, numpy.ndarray):
+        segments = [(p1[0], p1[1], p2[0], p2[1]) for p1, p2 in segments]
+    segments = numpy.ascontiguousarray(segments, dtype=numpy.float32).ravel()
+    mask = numpy.zeros(len(segments) / 4, dtype=bool)
+    if not path_checker(view).free_paths(segments, safe_distance, mask):
+        raise ValueError("segments should have four coordinates each")
+    return mask
+
+
 def free_path_obstacles_only(p1, p2, view, safe_distance=0):
     safedistsquare = safe_distance ** 2
     for o in view.obstacles:
@@ -28,8 +61,9 @@ def free_path_obstacles_only(p1, p2, view, safe_distance=0):
 
 
 class SimpleGraphBuilder(object):
-    def __init__(self):
+    def __init__(self, goal=None):
         self.graph = {}  # position => node
+        self.goal = None if goal is None else tuple(goal)  # for the A* heuristic
 
     def connect(self, p1, p2):
         p1 = tuple(p1)
@@ -46,7 +80,9 @@ class SimpleGraphBuilder(object):
         position = tuple(position)
         if position not in self.graph:
             tmp = self.graph[position] = Node()
-            tmp.est_cost_there = 0  # TODO
+            if self.goal is not None:
+                tmp.est_cost_there = distance_heuristic(
+                    position[0], position[1], self.goal[0], self.goal[1])
             tmp.position = position
             return tmp
         else:
@@ -60,11 +96,18 @@ class SimpleGraphBuilder(object):
 
 
 class GraphBuilder(object):
-    """Builds a graph for navigating R^2 with penalties for distance and turning"""
-    def __init__(self, speed, turning_speed):
+    """Builds a graph for navigating R^2 with penalties for distance and turning
+
+    With a goal given, nodes get an admissible estimate of the cost to get
+    there so that shortest_path can search towards it (A* instead of Dijkstra).
+    The estimate counts on turning at every position, so nodes without an
+    angle (free turning) should only be used at the goal then.
+    """
+    def __init__(self, speed, turning_speed, goal=None):
         self.graph = {}  # position => angle => nodes
         self.speed = speed
         self.turning_speed = turning_speed
+        self.goal = None if goal is None else tuple(goal)
 
     def connect(self, p1, p2):
         """Connects two positions in the graph, adding nodes and edges as needed"""
@@ -98,7 +141,15 @@ class GraphBuilder(object):
             node = Node()
             node.position = position
             node.angle = angle
-            node.est_cost_there = 0  # TODO
+            if self.goal is not None and angle is None:
+                node.est_cost_there = distance_heuristic(
+                    position[0], position[1],
+                    self.goal[0], self.goal[1], self.speed)
+            elif self.goal is not None:
+                node.est_cost_there = turning_heuristic(
+                    position[0], position[1], angle,
+                    self.goal[0], self.goal[1],
+                    self.speed, self.turning_speed)
             for a, n in edges.items():
                 if angle is None or a is None:
                     cost = 0
@@ -119,6 +170,93 @@ class GraphBuilder(object):
     def positions(self):
         return self.graph.keys()
 
+
+class CompactGraphBuilder(object):
+    """Same graph as GraphBuilder, but kept as plain lists and searched as a CSRGraph
+
+    Nodes are integer indices, no Node objects are created.
+    """
+    def __init__(self, speed, turning_speed, goal=None):
+        self.graph = {}  # position => angle => node index
+        self.speed = speed
+        self.turning_speed = turning_speed
+        self.goal = None if goal is None else tuple(goal)
+        self.node_positions = []
+        self.node_angles = []
+        self.sources = []
+        self.targets = []
+        self.costs = []
+
+    def _edge(self, n1, n2, cost):
+        self.sources.append(n1)
+        self.targets.append(n2)
+        self.costs.append(cost)
+
+    def connect(self, p1, p2):
+        """Connects two positions in the graph, adding nodes and edges as needed"""
+        p1 = tuple(p1)
+        p2 = tuple(p2)
+        diff = Vec2d(*p2) - Vec2d(*p1)
+        cost = diff.length() / self.speed
+        angle = diff.angle()
+        rev_angle = angle_diff(angle, math.pi)
+
+        self._edge(self.node(p1, angle), self.node(p2, angle), cost)
+        self._edge(self.node(p2, rev_angle), self.node(p1, rev_angle), cost)
+
+    def node(self, position, angle):
+        position = tuple(position)
+        edges = self.graph.setdefault(position, {})
+        if angle in edges:
+            return edges[angle]
+
+        node = len(self.node_positions)
+        self.node_positions.append(position)
+        self.node_angles.append(float("nan") if angle is None else angle)
+        for a, n in edges.items():
+            if angle is None or a is None:
+                cost = 0
+            else:
+                cost = abs(angle_diff(a, angle)) / self.turning_speed
+            self._edge(n, node, cost)
+            self._edge(node, n, cost)
+        edges[angle] = node
+        return node
+
+    def position(self, node):
+        return self.node_positions[node]
+
+    def positions(self):
+        return self.graph.keys()
+
+    def nodes_at(self, position):
+        """The nodes at position, one for each angle"""
+        return self.graph.get(tuple(position), {}).values()
+
+    def csr_graph(self):
+        graph = csr_graph(
+            [p[0] for p in self.node_positions],
+            [p[1] for p in self.node_positions],
+            self.sources, self.targets, self.costs,
+            self.node_angles
+        )
+        if self.goal is not None:
+            graph.set_heuristic(self.speed, self.turning_speed)
+        return graph
+
+    def shortest_path(self, start, end):
+        """Path from node start to node end, indices are node indices"""
+        return self.csr_graph().shortest_path(start, end)
+
+    def shortest_path_any(self, start, ends):
+        """Path from node start to the cheapest to reach of the nodes in ends
+
+        The path ends at the node that was picked.
+        """
+        ends = numpy.array(ends, dtype=numpy.int32)
+        return self.csr_graph().shortest_path_any(start, ends)
+
+
 if __name__ == "__main__":
     gb = GraphBuilder(1, math.pi / 4)
     gb.connect((0, 0), (1, 0))
@@ -0,0 +1,36 @@
+"""Points along the static obstacles, as sites for Voronoi and Delaunay
+
+The end points of the obstacles (each point only once, however many
+obstacles end there) and evenly spaced points along them, at most spacing
+apart. The points only depend on the obstacles and the spacing, so they are
+kept in the roadmap cache.
+"""
+import numpy
+import roadmapcache
+
+
+def _sample(obstacles, spacing):
+    points = []
+    seen = set()
+    for o in obstacles:
+        for end in (o.p1, o.p2):
+            xy = (end.x, end.y)
+            if xy not in seen:
+                seen.add(xy)
+                points.append(xy)
+
+        obstacle_length = o.p1.distance_to(o.p2)
+        num_midpoints = int(obstacle_length/spacing)
+        for m in xrange(num_midpoints):
+            p = o.p1+(o.p2-o.p1)*(m+1)/(num_midpoints+1)
+            seen.add((p.x, p.y))
+            points.append((p.x, p.y))
+    return numpy.array(points, dtype=numpy.float64).reshape(-1, 2)
+
+
+def obstacle_points(obstacles, spacing):
+    """The points along obstacles as a read only array of rows of x, y"""
+    points = roadmapcache.cached("obstacle-points", obstacles, (spacing,),
+                                 lambda: _sample(obstacles, spacing))
+    points.flags.writeable = False
+    return points
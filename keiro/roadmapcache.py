@@ -0,0 +1,100 @@
+"""On-disk cache for data that only depends on the static environment
+
+Roadmaps over the static obstacles come out the same for every run of a
+scenario with the same goal, agent parameters and random state, so they only
+need to be built once. Entries are pickles of plain python data (no Vec2d or
+other SWIG objects) stored under a key that hashes the obstacle geometry and
+everything else the builder depends on.
+
+The cache is disabled until a directory is set, run.py sets one up.
+"""
+import cPickle as pickle
+import hashlib
+import os
+import struct
+import tempfile
+
+# bump when the cached algorithms change, so old entries are not used
+VERSION = 2
+
+_directory = None
+
+
+def set_directory(directory):
+    """Directory to keep the cache in, None disables the cache"""
+    global _directory
+    _directory = directory
+
+
+def get_directory():
+    return _directory
+
+
+def obstacle_hash(obstacles):
+    """Hash of the geometry of a sequence of line obstacles (with p1 and p2)"""
+    h = hashlib.sha1()
+    for o in obstacles:
+        h.update(struct.pack("<4f", o.p1.x, o.p1.y, o.p2.x, o.p2.y))
+    return h.hexdigest()
+
+
+def make_key(kind, obstacles, params):
+    h = hashlib.sha1(obstacle_hash(obstacles))
+    h.update(repr((VERSION, params)))
+    return "%s-%s" % (kind, h.hexdigest())
+
+
+def _path(key):
+    return os.path.join(_directory, key + ".pickle")
+
+
+def load(key):
+    """The value stored under key, or None if there is none (or no cache)
+
+    Entries that can't be loaded, e.g. truncated ones or ones pickled from
+    a class that has since been renamed, are taken as missing so they get
+    built and stored again.
+    """
+    if _directory is None:
+        return None
+    try:
+        with open(_path(key), "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+
+def store(key, value):
+    """Stores value under key, if there is a cache
+
+    A failed write (full disk, read only or missing directory, ...) only means
+    the value isn't cached, like a miss in load().
+    """
+    if _directory is None:
+        return
+    tmp = None
+    try:
+        if not os.path.isdir(_directory):
+            os.makedirs(_directory)
+        # write to a temporary file first so readers never see half an entry
+        fd, tmp = tempfile.mkstemp(dir=_directory)
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp, _path(key))
+    except (OSError, IOError):
+        if tmp is not None and os.path.exists(tmp):
+            os.unlink(tmp)
+
+
+def cached(kind, obstacles, params, build):
+    """Returns the cached result of build(), calling it if there is none
+
+    kind names what is built, params is a tuple (with a stable repr) of
+    everything other than the obstacles that the result depends on.
+    """
+    key = make_key(kind, obstacles, params)
+    value = load(key)
+    if value is None:
+        value = build()
+        store(key, value)
+    return value
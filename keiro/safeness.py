@@ -0,0 +1,92 @@
+"""Batched pedestrian safeness tests for predictive planners
+
+A SafenessEvaluator takes the pedestrians of a view once per tick and tests
+many candidate moves against all of them in one native call. Every test
+gives the safeness (1 or 0, like the tests of agents.arty.Arty) and the
+index of the first pedestrian it fails on (-1 where it is safe).
+
+After predict(), the extrapolated pedestrians are kept in a space-time grid
+up to a time horizon, and tests only go through the pedestrians that pass
+close by while they take place. The results stay the same.
+"""
+import math
+import numpy
+from geometry import PedestrianSafeness
+
+
+def _rows(count, columns):
+    """count rows of the columns (scalars are repeated) as one float64 array"""
+    rows = numpy.empty((count, len(columns)))
+    for i, column in enumerate(columns):
+        rows[:, i] = column
+    return rows.ravel()
+
+
+def _points(points, name):
+    """x and y columns of a sequence of points or an array of rows of x, y"""
+    points = numpy.asarray([tuple(p) for p in points] if not isinstance(
+        points, numpy.ndarray) else points, dtype=numpy.float64)
+    if points.size == 0:
+        points = points.reshape(0, 2)
+    if points.ndim != 2 or points.shape[1] != 2:
+        raise ValueError("%s should have two coordinates each" % name)
+    return points[:, 0], points[:, 1]
+
+
+class SafenessEvaluator(object):
+    def __init__(self, pedestrians, radius, margin, obstacle_velocity=None):
+        """pedestrians as in a View, radius of the agent and the extra margin
+        to keep to them. obstacle_velocity(pedestrian) gives the velocity
+        they are extrapolated with, their current velocity by default.
+        """
+        if obstacle_velocity is None:
+            obstacle_velocity = lambda p: p.velocity
+        self.pedestrians = list(pedestrians)
+        rows = []
+        for p in self.pedestrians:
+            v = obstacle_velocity(p)
+            rows.append((p.position.x, p.position.y, v.x, v.y, p.radius))
+        self.native = PedestrianSafeness()
+        self.native.set_agent(radius, margin)
+        self.native.set_pedestrians(
+            numpy.array(rows, dtype=numpy.float32).ravel())
+
+    def predict(self, horizon, slice_time=1.0):
+        """Index the pedestrians in time slices of slice_time up to horizon"""
+        self.native.predict(slice_time, int(math.ceil(horizon / slice_time)))
+
+    def _test(self, function, rows, columns, *args):
+        fail = numpy.empty(len(rows) / columns, dtype=numpy.int32)
+        function(rows, *(args + (fail,)))
+        return (fail == -1).astype(int), fail
+
+    def static(self, points, times):
+        """Standing at points at times"""
+        x, y = _points(points, "points")
+        return self._test(self.native.static_fails, _rows(len(x), (x, y, times)), 3)
+
+    def turns(self, points, a1, a2, start_times, turningspeed):
+        """Turning on the spot from angles a1 to a2, starting at start_times"""
+        x, y = _points(points, "points")
+        return self._test(self.native.turn_fails,
+                          _rows(len(x), (x, y, a1, a2, start_times)), 5, turningspeed)
+
+    def segments(self, p1, p2, start_times, speed):
+        """Moving straight from p1 to p2 at speed, starting at start_times"""
+        x1, y1 = _points(p1, "p1")
+        x2, y2 = _points(p2, "p2")
+        return self._test(self.native.segment_fails,
+                          _rows(len(x1), (x1, y1, x2, y2, start_times)), 5, speed)
+
+    def static_fail(self, position, time):
+        return self.native.static_fail(position, time)
+
+    def turn_fail(self, position, start_time, end_time):
+        return self.native.turn_fail(position, start_time, end_time)
+
+    def line_fail(self, position, velocity, start_time, end_time):
+        return self.native.line_fail(position, velocity, start_time, end_time)
+
+    def free(self, p1, p2, start_time, speed):
+        """If moving straight from p1 to p2 at speed from start_time is safe"""
+        return self.native.segment_fail(p1, p2, start_time, speed) == -1
@@ -20,14 +20,14 @@ class Scenario(object):  # abstract
     world_size = (640, 480)  # Override this to customize world size
     walls = True
 
-    def __init__(self, parameter, agent, random_seed=None):
+    def __init__(self, parameter, agent, random_seed=None, headless=False):
         self.parameter = parameter
         self.agent = agent
         # all scenarios should use self.random instead of
         # the global random module so they are not affected
         # by how much randomness is in the agents
         self.random = random.Random(random_seed)
-        self.world = World(self.world_size)
+        self.world = World(self.world_size, headless)
         self.init()
 
         if self.walls:
@@ -71,9 +71,10 @@ class Scenario(object):  # abstract
                         print "Agent Collisions:", self.agent.collisions
                     return True
 
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    return False
+            if not self.world.headless:
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        return False
 
             dt = self.world.advance()
             self.update(dt)
@@ -83,8 +84,8 @@ class Scenario(object):  # abstract
 class Spawner(Scenario):
     crowd_rate = 0
 
-    def __init__(self, parameter, agent, random_seed):
-        super(Spawner, self).__init__(parameter, agent, random_seed)
+    def __init__(self, parameter, agent, random_seed, headless=False):
+        super(Spawner, self).__init__(parameter, agent, random_seed, headless)
         if self.parameter is not None:
             self.crowd_rate = self.parameter
 
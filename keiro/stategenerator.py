@@ -60,15 +60,19 @@ class ExtendingGenerator(PrependedGenerator):
 
     def generate(self):
         ret = super(ExtendingGenerator, self).generate()
-        #extend area
-        if self.n < self.steps:
-            self.minx += self.diff[0]
-            self.maxx += self.diff[1]
-            self.miny += self.diff[2]
-            self.maxy += self.diff[3]
-        self.n += 1
+        self.extend(1)
         return ret
 
+    def extend(self, n):
+        """Extends the area as generating n points would"""
+        for i in xrange(n):
+            if self.n < self.steps:
+                self.minx += self.diff[0]
+                self.maxx += self.diff[1]
+                self.miny += self.diff[2]
+                self.maxy += self.diff[3]
+            self.n += 1
+
 
 class TestGenerators(unittest.TestCase):
     def setUp(self):
@@ -97,6 +101,16 @@ class TestGenerators(unittest.TestCase):
         self.assertTrue(self.pg.generate() == bias
                         and self.pg.generate() == bias2)
 
+    def test_extend(self):
+        import random
+        eg1 = ExtendingGenerator((0, 10, 0, 10), (-50, 60, -50, 60), 4, random)
+        eg2 = ExtendingGenerator((0, 10, 0, 10), (-50, 60, -50, 60), 4, random)
+        for pos in eg1.generate_n(6):
+            pass
+        eg2.extend(6)
+        self.assertEqual((eg1.minx, eg1.maxx, eg1.miny, eg1.maxy, eg1.n),
+                         (eg2.minx, eg2.maxx, eg2.miny, eg2.maxy, eg2.n))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,95 @@
+"""Delaunay triangulation of points that move a little at a time
+
+A Triangulation keeps the Delaunay triangulation of a set of points up to
+date as points are added, moved and removed (natively, see
+cpp/delaunay.hpp), instead of triangulating all of them again. The points
+have keys, any hashable values, and the triangles are given as triples of
+keys in counterclockwise order.
+
+Points that are on top of another point, and all the points while they are
+on one line, are in no triangles.
+"""
+import numpy
+from geometry import DelaunayTriangulation
+
+
+def _xy(p):
+    """x, y of a point as floats"""
+    try:
+        return float(p.x), float(p.y)
+    except AttributeError:
+        x, y = p
+        return float(x), float(y)
+
+
+class Triangulation(object):
+    def __init__(self, points=None):
+        """points is an optional dict of key: point to start with"""
+        self.native = DelaunayTriangulation()
+        self.ids = {}
+        self.keys = {}
+        if points:
+            self.update(points)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, key):
+        return key in self.ids
+
+    def position(self, key):
+        """x, y of the point with key"""
+        v = self.ids[key]
+        return self.native.x(v), self.native.y(v)
+
+    def add(self, key, point):
+        """Adds a point, or moves it if key is already there"""
+        if key in self.ids:
+            self.move(key, point)
+            return
+        v = self.native.insert(*_xy(point))
+        self.ids[key] = v
+        self.keys[v] = key
+
+    def move(self, key, point):
+        self.native.move(self.ids[key], *_xy(point))
+
+    def remove(self, key):
+        v = self.ids.pop(key)
+        del self.keys[v]
+        self.native.remove(v)
+
+    def update(self, points):
+        """Makes the points the ones in the dict points of key: point,
+        removing the rest, moving the ones that are there and adding the new
+        ones
+        """
+        for key in [k for k in self.ids if k not in points]:
+            self.remove(key)
+        for key, point in points.iteritems():
+            self.add(key, point)
+
+    def clear(self):
+        self.native.clear()
+        self.ids.clear()
+        self.keys.clear()
+
+    def _rows(self, count, get, *args):
+        rows = numpy.empty(count * 3, dtype=numpy.int32)
+        get(*(args + (rows,)))
+        keys = self.keys
+        return [(keys[a], keys[b], keys[c])
+                for a, b, c in rows.reshape(count, 3).tolist()]
+
+    def triangles(self):
+        """All the triangles as triples of keys"""
+        return self._rows(self.native.num_triangles(),
+                          self.native.get_triangles)
+
+    def incident_triangles(self, key):
+        """The triangles around the point with key, as triples of keys that
+        start with key, counterclockwise around it
+        """
+        v = self.ids[key]
+        return self._rows(self.native.num_incident(v),
+                          self.native.get_incident, v)
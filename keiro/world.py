@@ -93,33 +93,46 @@ class PygameCanvas(DummyCanvas):
         pygame.draw.rect(self.surface, color, pygame_rect, stroke_width)
 
 
+class OffscreenCanvas(PygameCanvas):
+    # draws to a plain surface that is never shown, for video without a display
+    def flush(self):
+        pass
+
+
 class World(PhysicsWorld):
-    def __init__(self, size):
+    def __init__(self, size, headless=False):
         super(World, self).__init__()
         self.size = size
+        # no display, no debug drawing and no rendering unless recording
+        self.headless = headless
         self.units = []
         self.obstacles = []
 
         self.clock = pygame.time.Clock()
         self.timestep = 0  # default: real time
         self.show_fps = False
+        self.occlusion = False  # units only see pedestrians in line of sight
         self.encoders = []
 
         self.collision_list = []
         self.avg_groundspeed_list = []
 
     def init(self):
-        pygame.init()
-        pygame.display.set_caption("Crowd Navigation")
-        self.display_canvas = PygameCanvas(
-            pygame.display.set_mode(self.size)
-        )
-        self.debugcanvas = PygameCanvas(
-            pygame.Surface(
-                self.size,
-                masks=pygame.SRCALPHA
-            ).convert_alpha()
-        )
+        if self.headless:
+            self.display_canvas = OffscreenCanvas(pygame.Surface(self.size))
+            self.debugcanvas = DummyCanvas()
+        else:
+            pygame.init()
+            pygame.display.set_caption("Crowd Navigation")
+            self.display_canvas = PygameCanvas(
+                pygame.display.set_mode(self.size)
+            )
+            self.debugcanvas = PygameCanvas(
+                pygame.Surface(
+                    self.size,
+                    masks=pygame.SRCALPHA
+                ).convert_alpha()
+            )
         self._time = 0
         self._iterations = 0
         self.update(0)  # so we have no initial collisions
@@ -138,6 +151,9 @@ class World(PhysicsWorld):
     def set_show_fps(self, show=True):
         self.show_fps = show
 
+    def set_occlusion(self, occlusion=True):
+        self.occlusion = occlusion
+
     def add_unit(self, unit):
         self.units.append(unit)
         self.bind(unit)
@@ -146,6 +162,16 @@ class World(PhysicsWorld):
         self.units.remove(unit)
         self.unbind(unit)
 
+    def remove_units(self, units):
+        """Removes all of units in one pass over the unit list
+
+        The list is changed in place, so references to it stay current.
+        """
+        removed = set(id(u) for u in units)
+        self.units[:] = [u for u in self.units if id(u) not in removed]
+        for u in units:
+            self.unbind(u)
+
     def add_obstacle(self, obstacle):
         self.obstacles.append(obstacle)
         for line in obstacle.bounds:
@@ -166,7 +192,8 @@ class World(PhysicsWorld):
         if self.timestep == 0:
             dt = self.clock.tick() / 1000.0  # use real time
         else:
-            self.clock.tick()
+            if self.show_fps:
+                self.clock.tick()
             dt = self.timestep
 
         self._time += dt
@@ -176,20 +203,20 @@ class World(PhysicsWorld):
 
         self.debugcanvas.fill((255, 255, 255, 0))  # transparent
 
+        obstacles = self.get_obstacles()
+        # all range queries in one native call instead of one per unit
+        viewers = [u for u in self.units if u.view_range != 0]
+        if self.occlusion:
+            query = self.all_particles_in_view_range
+        else:
+            query = self.all_particles_in_range
+        in_range = iter(query(viewers, [u.view_range for u in viewers]))
+
         for u in self.units:
             if u.view_range != 0:
-                view = View(self.get_obstacles(),
-                            self.particles_in_range(u, u.view_range),
-                            self.size)
-                # Marc's occlusion code
-                # view = View(
-                #     self.get_obstacles(),
-                #     # with occlusion
-                #     self.particles_in_view_range(u, u.view_range),
-                #     self.size
-                # )
+                view = View(obstacles, next(in_range), self.size)
             else:
-                view = View(self.get_obstacles(), [], self.size)
+                view = View(obstacles, [], self.size)
 
             u._think(dt, view, self.debugcanvas)
 
@@ -197,7 +224,8 @@ class World(PhysicsWorld):
             sys.stdout.write("%f fps           \r" % self.clock.get_fps())
             sys.stdout.flush()
 
-        self.render(self.display_canvas)
+        if self.encoders or not self.headless:
+            self.render(self.display_canvas)
         return dt
 
     def render(self, canvas):
@@ -8,6 +8,7 @@ from keiro.agent import AgentRegistrar
 import keiro.git
 
 from keiro import ffmpeg_encode
+from keiro import roadmapcache
 import os
 import random
 import cProfile
@@ -27,10 +28,19 @@ def get_cli_options():
     parser.add_option("-A", "--agentparameter", type="int")
     parser.add_option("-r", "--seed", type="string", default="1")
     parser.add_option("-t", "--timestep", type="float", default=0.1)
+    parser.add_option("-b", "--time-budget", type="float", default=None,
+                      help="seconds of thinking per tick for the agent")
 
     parser.add_option("-f", "--show-fps", action="store_true", default=False)
+    parser.add_option("-o", "--occlusion", action="store_true", default=False)
+    parser.add_option("-j", "--threads", type="int", default=0)
+    parser.add_option("-c", "--cache-dir",
+                      default=os.path.expanduser("~/.cache/keiro/roadmaps"))
+    parser.add_option("-C", "--no-cache", action="store_true", default=False)
     parser.add_option("-p", "--profile", action="store_true", default=False)
     parser.add_option("-V", "--no-video", action="store_true", default=False)
+    parser.add_option("-H", "--headless", action="store_true", default=False,
+                      help="run without a display, as fast as possible")
     parser.add_option("-G", "--no-gitcheck",
                       action="store_true", default=False)
 
@@ -128,17 +138,21 @@ class Simulation(object):
 
         self._agent = AgentClass(
             self.opts.agentparameter,
+            time_budget=self.opts.time_budget,
             random_seed=local_random.random()
         )
         self._scenario = ScenarioClass(
             self.opts.scenarioparameter,
             self._agent,
-            random_seed=local_random.random()
+            random_seed=local_random.random(),
+            headless=self.opts.headless
         )
 
         # TODO: the following should be put in the scenario setup
         self._scenario.world.set_timestep(self.opts.timestep)
         self._scenario.world.set_show_fps(self.opts.show_fps)
+        self._scenario.world.set_occlusion(self.opts.occlusion)
+        self._scenario.world.set_threads(self.opts.threads)
 
     def _save_results(self):
         r = models.Record()
@@ -164,6 +178,8 @@ def run():
     git = keiro.git.Git()
 
     opts = get_cli_options()
+    if not opts.no_cache:
+        roadmapcache.set_directory(opts.cache_dir)
 
     if ':' in opts.seed:
         startseed, numseeds = map(int, opts.seed.split(':'))
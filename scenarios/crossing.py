@@ -29,17 +29,17 @@ class Crossing(Spawner):
         )
 
     def spawn(self, num_units):
-        for u in self.world.units:
-            if (
-                u is not self.agent and
-                u.position.distance_to(u.goal) <= u.radius
-            ):
-                self.world.remove_unit(u)
-                avg_groundspeed = u.travel_length / (self.world._time - u.spawn_time)
-                self.world.avg_groundspeed_list.append(avg_groundspeed)
-                self.world.collision_list.append(u.collisions)
-                #print ["Pedestrian Speed:", avg_groundspeed]
-                #print ["Number of collisions:", u.collisions]
+        arrived = [
+            u for u in self.world.units
+            if u is not self.agent and u.position.distance_to(u.goal) <= u.radius
+        ]
+        self.world.remove_units(arrived)
+        for u in arrived:
+            avg_groundspeed = u.travel_length / (self.world._time - u.spawn_time)
+            self.world.avg_groundspeed_list.append(avg_groundspeed)
+            self.world.collision_list.append(u.collisions)
+            #print ["Pedestrian Speed:", avg_groundspeed]
+            #print ["Number of collisions:", u.collisions]
 
         for i in xrange(num_units):
             u = Stubborn()
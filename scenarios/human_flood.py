@@ -14,9 +14,10 @@ class TheFlood(Spawner):
         agent.angle = (agent.goal - agent.position).angle()
 
     def spawn(self, num_units):
-        for u in self.world.units:
-            if u is not self.agent and u.position.distance_to(u.goal) < 1:
-                self.world.remove_unit(u)
+        self.world.remove_units([
+            u for u in self.world.units
+            if u is not self.agent and u.position.distance_to(u.goal) < 1
+        ])
 
         for i in xrange(num_units):
             u = Stubborn()
@@ -2,7 +2,7 @@ from keiro.scenario import Scenario
 from keiro.vector2d import Vec2d
 from keiro import obstacle
 from pedestrians.randomwalker import RandomWalkingAvoider
-from keiro.geometry import linesegdist2
+from keiro.geometry import linesegdist2_matrix
 
 
 class Maze(Scenario):
@@ -34,10 +34,12 @@ class Maze(Scenario):
             ]
         ]
 
+        walls = []
         for shape in shapes:
             last = shape[0]
             for point in shape:
                 self.world.add_obstacle(obstacle.Line(last, point))
+                walls.append((last.x, last.y, point.x, point.y))
                 last = point
 
         for m in xrange(self.parameter):
@@ -51,19 +53,12 @@ class Maze(Scenario):
                     self.random.randrange(100 + u.radius + 1, 500 - u.radius - 1),
                     self.random.randrange(100 + u.radius + 1, 380 - u.radius - 1),
                 )
-                good = init_position.distance_to(self.agent.position) > 20
-                for shape in shapes:
-                    last = shape[0]
-                    for point in shape:
-                        if linesegdist2(
-                            last, point,
-                            init_position
-                        ) < u.radius ** 2:
-                            good = False
-                            break
-                        last = point
-                    if not good:
-                        break
+                good = (
+                    init_position.distance_to(self.agent.position) > 20 and
+                    not (linesegdist2_matrix(
+                        [tuple(init_position)], walls
+                    ) < u.radius ** 2).any()
+                )
 
             u.position = init_position
             self.world.add_unit(u)
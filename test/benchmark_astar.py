@@ -0,0 +1,79 @@
+"""Multi-goal and bidirectional search against single goal A* on CSRGraphs
+
+For every roadmap size, the time per query of
+  - A* to each of GOALS goals in turn (keeping the best) vs shortest_path_any
+  - A* vs bidirectional_path, with and without heuristic
+
+Run from the repository root: PYTHONPATH=. python test/benchmark_astar.py
+"""
+import math
+import random
+import time
+import numpy
+from keiro.astar import csr_graph
+
+GOALS = 8
+QUERIES = 20
+
+
+def roadmap(num, seed=1, degree=8):
+    """Random geometric graph, num nodes connected to neighbours within a radius
+    giving about degree edges per node, costs are distances"""
+    rand = random.Random(seed)
+    size = math.sqrt(num) * 10
+    radius = math.sqrt(degree * size * size / (math.pi * num))
+    x = [rand.uniform(0, size) for i in xrange(num)]
+    y = [rand.uniform(0, size) for i in xrange(num)]
+    cells = {}
+    for i in xrange(num):
+        cells.setdefault((int(x[i] / radius), int(y[i] / radius)), []).append(i)
+    sources, targets, costs = [], [], []
+    for i in xrange(num):
+        cx, cy = int(x[i] / radius), int(y[i] / radius)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for j in cells.get((cx + dx, cy + dy), ()):
+                    d = math.hypot(x[i] - x[j], y[i] - y[j])
+                    if i != j and d <= radius:
+                        sources.append(i)
+                        targets.append(j)
+                        costs.append(d)
+    return csr_graph(x, y, sources, targets, costs)
+
+
+def per_query(function, queries):
+    start = time.time()
+    for query in queries:
+        function(*query)
+    return 1000 * (time.time() - start) / len(queries)
+
+
+def best_of_singles(graph, start, goals):
+    best = None
+    for goal in goals.tolist():
+        result = graph.shortest_path(start, goal)
+        if result.success and (best is None or result.total_cost < best.total_cost):
+            best = result
+    return best
+
+
+if __name__ == "__main__":
+    print "%8s | %12s %12s | %8s %8s %8s %8s  (ms per query)" % (
+        "nodes", "A* x %d" % GOALS, "any goal",
+        "A*", "bidir", "Dijkstra", "bidir")
+    for num in (1000, 5000, 20000, 50000):
+        graph = roadmap(num)
+        rand = random.Random(2)
+        multi = [(rand.randrange(num),
+                  numpy.array([rand.randrange(num) for i in xrange(GOALS)], dtype=numpy.int32))
+                 for q in xrange(QUERIES)]
+        single = [(rand.randrange(num), rand.randrange(num)) for q in xrange(QUERIES)]
+        graph.set_heuristic(1)
+        row = [per_query(lambda s, g: best_of_singles(graph, s, g), multi),
+               per_query(graph.shortest_path_any, multi),
+               per_query(graph.shortest_path, single),
+               per_query(graph.bidirectional_path, single)]
+        graph.set_heuristic(0)
+        row += [per_query(graph.shortest_path, single),
+                per_query(graph.bidirectional_path, single)]
+        print "%8d | %12.2f %12.2f | %8.2f %8.2f %8.2f %8.2f" % tuple([num] + row)
@@ -0,0 +1,51 @@
+"""Ticks per second of World.integrate() and of the full World.update()
+
+Run from the repository root: PYTHONPATH=. python test/benchmark_physics.py
+"""
+import math
+import random
+import time
+from keiro.vector2d import Vec2d
+from keiro.particle import LinearParticle, World
+
+
+def walkers(world, num, seed=1):
+    """Stubborn/RandomWalker like crowd, same density for all num
+
+    The single waypoint of each walker is far away, so that all of them keep
+    moving for the whole benchmark.
+    """
+    rand = random.Random(seed)
+    size = 20 * math.sqrt(num)
+    particles = []
+    for i in xrange(num):
+        p = LinearParticle(rand.uniform(0, size), rand.uniform(0, size),
+                           rand.uniform(-math.pi, math.pi))
+        p.radius = 4
+        p.speed = rand.uniform(10, 20)
+        p.turningspeed = 2 * math.pi / 3
+        direction = rand.uniform(-math.pi, math.pi)
+        p.waypoint_push(p.position + Vec2d(math.cos(direction), math.sin(direction)) * 1e6)
+        world.bind(p)
+        particles.append(p)
+    return particles
+
+
+def ticks_per_second(num, collide, ticks):
+    world = World()
+    particles = walkers(world, num)
+    world.update(0)
+    step = world.update if collide else world.integrate
+    start = time.time()
+    for i in xrange(ticks):
+        step(0.1)
+    return ticks / (time.time() - start)
+
+
+if __name__ == "__main__":
+    print "%8s %14s %14s" % ("units", "integrate", "update")
+    for num, ticks in ((100, 20000), (1000, 2000), (10000, 200)):
+        print "%8d %14.1f %14.1f" % (
+            num,
+            ticks_per_second(num, False, ticks),
+            ticks_per_second(num, True, ticks // 5))
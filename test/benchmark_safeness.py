@@ -0,0 +1,57 @@
+"""Batched safeness tests with and without the space-time prediction grid
+
+For every crowd size, the time per tested move (a turn and a straight
+segment, like in Arty's route tests) when going through all pedestrians and
+with SafenessEvaluator.predict().
+
+Run from the repository root: PYTHONPATH=. python test/benchmark_safeness.py
+"""
+import random
+import time
+import numpy
+from keiro.vector2d import Vec2d
+from keiro.particle import LinearParticle
+from keiro.safeness import SafenessEvaluator
+
+SIZE = 1000
+MOVES = 20000
+
+
+def crowd(num, rand):
+    pedestrians = []
+    for i in xrange(num):
+        p = LinearParticle(rand.uniform(0, SIZE), rand.uniform(0, SIZE))
+        p.radius = 5
+        p.velocity = Vec2d(rand.uniform(-20, 20), rand.uniform(-20, 20))
+        pedestrians.append(p)
+    return pedestrians
+
+
+def moves(rand):
+    p1 = numpy.array([(rand.uniform(0, SIZE), rand.uniform(0, SIZE)) for i in xrange(MOVES)])
+    p2 = p1 + numpy.array([(rand.uniform(-20, 20), rand.uniform(-20, 20)) for i in xrange(MOVES)])
+    angles = numpy.array([rand.uniform(-3, 3) for i in xrange(MOVES)])
+    times = numpy.array([rand.uniform(0, 20) for i in xrange(MOVES)])
+    return p1, p2, angles, times
+
+
+def per_move(evaluator, p1, p2, angles, times):
+    start = time.time()
+    turns = evaluator.turns(p1, angles, angles[::-1], times, 3)
+    segments = evaluator.segments(p1, p2, times, 40)
+    return 1e6 * (time.time() - start) / MOVES, turns, segments
+
+
+if __name__ == "__main__":
+    print "%8s | %10s %10s %10s  (us per move)" % ("crowd", "scan", "predicted", "build ms")
+    rand = random.Random(1)
+    queries = moves(rand)
+    for num in (30, 100, 300, 1000, 3000):
+        evaluator = SafenessEvaluator(crowd(num, rand), 8, 2)
+        scan, turns, segments = per_move(evaluator, *queries)
+        start = time.time()
+        evaluator.predict(30)
+        build = 1000 * (time.time() - start)
+        predicted, turns2, segments2 = per_move(evaluator, *queries)
+        assert (turns[1] == turns2[1]).all() and (segments[1] == segments2[1]).all()
+        print "%8d | %10.2f %10.2f %10.2f" % (num, scan, predicted, build)
@@ -0,0 +1,113 @@
+import unittest
+import random
+import time
+from keiro.vector2d import Vec2d
+from keiro.geometry import line_distance2
+from keiro.particle import Obstacle
+from keiro.world import View, DummyCanvas
+from agents.arty import Arty, RoadMapGenerator
+from test_geometry import random_view
+
+
+class ScanningGenerator(RoadMapGenerator):
+    """Tries every node for every sample, as without the indexes"""
+    def line_is_traversable(self, p1, p2):
+        for o in self.view.obstacles:
+            if line_distance2(p1, p2, o.p1, o.p2) < self.min_distance2:
+                return False
+        return True
+
+    def _connect_to_best(self, candidate_position):
+        best_total_time = None
+        best_node = None
+        for existing_node in self.nodes:
+            if self.line_is_traversable(candidate_position, existing_node.position):
+                total_time = (self._traversal_time(candidate_position, existing_node) +
+                              existing_node.time)
+                if best_node is None or total_time < best_total_time:
+                    best_total_time = total_time
+                    best_node = existing_node
+        if best_node:
+            self._connect_node(best_node, candidate_position)
+
+    def _has_close_node(self, position):
+        return any(n.position.distance_to2(position) < self.NEIGHBOUR_DISTANCE2 and
+                   self.line_is_traversable(n.position, position)
+                   for n in self.nodes)
+
+
+def dump(nodes):
+    index = dict((id(n), i) for i, n in enumerate(nodes))
+    return [(tuple(n.position), n.angle, n.time, n.parent and index[id(n.parent)])
+            for n in nodes]
+
+
+class RoadMapGeneratorTest(unittest.TestCase):
+    def testSameAsScan(self):
+        for seed in xrange(3):
+            view, point = random_view(seed, obstacles=15, pedestrians=0, size=300)
+            roadmaps = []
+            for cls in (RoadMapGenerator, ScanningGenerator):
+                generator = cls(view, Vec2d(150, 150), 4, 30, 3, 10, random.Random(seed))
+                generator.run(150)
+                roadmaps.append(dump(generator.get_nodes()))
+            self.assertEqual(roadmaps[0], roadmaps[1])
+
+    def testTraversable(self):
+        view = View([Obstacle(Vec2d(0, 0), Vec2d(100, 0))], [], (100, 100))
+        generator = RoadMapGenerator(view, Vec2d(0, 0), 2, 30, 3, 10, random.Random(1))
+        for y, traversable in ((1.5, False), (2, True), (3, True)):
+            self.assertEqual(generator.line_is_traversable(Vec2d(-10, y), Vec2d(50, y)),
+                             traversable)
+
+
+class LocalOnlyArty(Arty):
+    """Arty that has to search locally from where it stands"""
+    def find_globaltree(self, from_position, *args, **kwargs):
+        if from_position == self.position:
+            return None, None
+        return super(LocalOnlyArty, self).find_globaltree(from_position, *args, **kwargs)
+
+
+class DeadlineTest(unittest.TestCase):
+    def setUp(self):
+        view, point = random_view(1, obstacles=5, pedestrians=5, size=300)
+        self.view = view
+        self.agent = LocalOnlyArty(40, random_seed=1)
+        self.agent.position = Vec2d(20, 20)
+        self.agent.goal = Vec2d(280, 280)
+        self.agent.init(view)
+        self.agent.debugsurface = DummyCanvas()
+
+    def testOutOfTime(self):
+        self.assertFalse(self.agent.out_of_time(None))
+        self.assertFalse(self.agent.out_of_time(time.clock() + 10))
+        self.assertTrue(self.agent.out_of_time(time.clock()))
+
+    def testPassedDeadline(self):
+        agent = self.agent
+        path = agent.getpath(self.view)
+        self.assert_(path)
+        self.assertEqual(agent.search_progress, 0)
+
+        # stops at the first path, or the first node if none
+        path = agent.getpath(self.view, deadline=0)
+        self.assert_(1 <= agent.search_progress < agent.LOCALMAXSIZE)
+        progress = agent.search_progress
+        # resumed further out
+        agent.getpath(self.view, deadline=0)
+        self.assert_(agent.search_progress > progress)
+
+        agent.getpath(self.view)
+        self.assertEqual(agent.search_progress, 0)
+
+    def testBudget(self):
+        deadlines = []
+        agent = self.agent
+        agent.think = lambda dt, view, surface, **kwargs: deadlines.append(kwargs)
+        agent._think(0.1, self.view, DummyCanvas())
+        agent.time_budget = 0.5
+        before = time.clock()
+        agent._think(0.1, self.view, DummyCanvas())
+        self.assertEqual(deadlines[0], {})
+        self.assert_(before + 0.5 <= deadlines[1]["deadline"] <= time.clock() + 0.5)
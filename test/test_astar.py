@@ -0,0 +1,304 @@
+import unittest
+import math
+import random
+import numpy
+from keiro.vector2d import Vec2d
+from keiro.geometry import linesegdist2
+from keiro.astar import Node, shortest_path, distance_heuristic, turning_heuristic, csr_graph, \
+    DStarLite
+from keiro.graphbuilder import SimpleGraphBuilder, GraphBuilder, CompactGraphBuilder
+
+
+def random_roadmap(builder, seed, num=200, size=100, max_edge=20):
+    """Connects num random positions in builder to their neighbours within max_edge"""
+    rand = random.Random(seed)
+    positions = [(rand.uniform(0, size), rand.uniform(0, size)) for i in xrange(num)]
+    for i, p in enumerate(positions):
+        for q in positions[:i]:
+            if Vec2d(*p).distance_to(Vec2d(*q)) <= max_edge:
+                builder.connect(p, q)
+    return positions
+
+
+class HeuristicTest(unittest.TestCase):
+    def testDistance(self):
+        self.assertAlmostEqual(distance_heuristic(0, 0, 3, 4), 5)
+        self.assertAlmostEqual(distance_heuristic(0, 0, 3, 4, 2), 2.5)
+
+    def testTurning(self):
+        # facing the goal or less than 90 degrees off, no turning needed
+        self.assertAlmostEqual(turning_heuristic(0, 0, 0, 3, 4, 1, 1), 5)
+        self.assertAlmostEqual(turning_heuristic(0, 0, math.pi / 2, 10, 0, 1, 1), 10)
+        # facing away, at least 90 degrees of turning
+        self.assertAlmostEqual(turning_heuristic(0, 0, math.pi, 10, 0, 1, 2),
+                               10 + math.pi / 4, 5)
+        self.assertAlmostEqual(turning_heuristic(0, 0, -3 * math.pi / 4, 10, 0, 1, 1),
+                               10 + math.pi / 4, 5)
+        self.assertEqual(turning_heuristic(5, 5, 1, 5, 5, 1, 1), 0)
+
+    def compare_searches(self, make_builder, start_angle):
+        plain, guided = make_builder(None), make_builder((95, 95))
+        positions = random_roadmap(plain, 1)
+        random_roadmap(guided, 1)
+        results = []
+        for gb in (plain, guided):
+            start = gb.node(positions[0], start_angle)
+            end = gb.node((95, 95), None)
+            gb.connect(positions[-1], (95, 95))
+            results.append(shortest_path(start, end, gb.all_nodes()))
+        self.assert_(results[0].success and results[1].success)
+        self.assertAlmostEqual(results[0].total_cost, results[1].total_cost, 4)
+        self.assert_(results[1].expanded < results[0].expanded)
+
+    def testSimpleGraphBuilder(self):
+        self.compare_searches(lambda goal: SimpleGraphBuilder(goal), None)
+
+    def testGraphBuilder(self):
+        self.compare_searches(lambda goal: GraphBuilder(2, math.pi, goal), 1.5)
+
+    def testExpanded(self):
+        a, b, c = Node(), Node(), Node()
+        a.connect(1, b)
+        b.connect(1, c)
+        result = shortest_path(a, c, [a, b, c])
+        self.assertEqual(result.expanded, 2)
+        self.assertEqual(list(result.indices), [0, 1, 2])
+
+
+class CSRGraphTest(unittest.TestCase):
+    def testSearch(self):
+        graph = csr_graph([0, 1, 2, 3], [0, 0, 0, 0],
+                          [0, 1, 0, 2], [1, 2, 2, 3], [1, 1, 5, 1])
+        self.assertEqual(graph.num_nodes(), 4)
+        self.assertEqual(graph.num_edges(), 4)
+        for heuristic in (0, 1):
+            graph.set_heuristic(heuristic)
+            for repeat in xrange(2):  # searches can be repeated
+                result = graph.shortest_path(0, 3)
+                self.assert_(result.success)
+                self.assertEqual(result.total_cost, 3)
+                self.assertEqual(list(result.indices), [0, 1, 2, 3])
+        self.assertFalse(graph.shortest_path(3, 0).success)
+        self.assertFalse(graph.shortest_path(0, 7).success)
+        result = graph.shortest_path(2, 2)
+        self.assertEqual(list(result.indices), [2])
+
+    def testBuildErrors(self):
+        self.assertRaises(ValueError, csr_graph, [0], [0], [0], [1], [1])
+        self.assertRaises(ValueError, csr_graph, [0, 1], [0], [], [], [])
+        self.assertRaises(ValueError, csr_graph, [0], [0], [0], [0], [1, 2])
+
+    def testSameAsGraphBuilder(self):
+        nodes, compact = GraphBuilder(2, math.pi, (95, 95)), CompactGraphBuilder(2, math.pi, (95, 95))
+        for gb in (nodes, compact):
+            positions = random_roadmap(gb, 3)
+            gb.connect(positions[-1], (95, 95))
+        expected = shortest_path(nodes.node(positions[0], 0.5), nodes.node((95, 95), None),
+                                 nodes.all_nodes())
+        result = compact.shortest_path(compact.node(positions[0], 0.5), compact.node((95, 95), None))
+        self.assert_(result.success)
+        self.assertAlmostEqual(result.total_cost, expected.total_cost, 4)
+        self.assertEqual(compact.position(result.indices[-1]), (95, 95))
+        # at any angle
+        result = compact.shortest_path_any(compact.node(positions[0], 0.5), compact.nodes_at((95, 95)))
+        self.assert_(result.success)
+        self.assertAlmostEqual(result.total_cost, expected.total_cost, 4)
+        self.assertEqual(compact.position(result.indices[-1]), (95, 95))
+
+    def random_graph(self, seed, num=200):
+        gb = CompactGraphBuilder(2, math.pi, (95, 95))
+        positions = random_roadmap(gb, seed, num)
+        return gb, [gb.node(p, None) for p in positions]
+
+    def testShortestPathAny(self):
+        gb, nodes = self.random_graph(4)
+        graph = gb.csr_graph()
+        goals = nodes[-20:]
+        costs = dict((goal, graph.shortest_path(nodes[0], goal)) for goal in goals)
+        reachable = [goal for goal in goals if costs[goal].success]
+        best = min(reachable, key=lambda goal: costs[goal].total_cost)
+        for heuristic in (0, 2):
+            graph.set_heuristic(heuristic, math.pi if heuristic else 0)
+            result = graph.shortest_path_any(nodes[0], numpy.array(goals, dtype=numpy.int32))
+            self.assert_(result.success)
+            self.assertAlmostEqual(result.total_cost, costs[best].total_cost, 4)
+            self.assertEqual(result.indices[-1], best)
+        result = gb.shortest_path_any(nodes[0], [nodes[0], best])
+        self.assertEqual(list(result.indices), [nodes[0]])
+        self.assertFalse(gb.shortest_path_any(nodes[0], []).success)
+
+    def testBidirectional(self):
+        for seed in xrange(5):
+            gb, nodes = self.random_graph(seed, num=80)
+            graph = gb.csr_graph()
+            graph.set_heuristic(seed % 2 * 2, math.pi)  # with and without heuristic
+            edge_costs = {}
+            for edge in zip(gb.sources, gb.targets, gb.costs):
+                edge_costs[edge[:2]] = min(edge[2], edge_costs.get(edge[:2], edge[2]))
+            rand = random.Random(seed)
+            for repeat in xrange(10):
+                start, goal = rand.choice(nodes), rand.choice(nodes)
+                expected = graph.shortest_path(start, goal)
+                result = graph.bidirectional_path(start, goal)
+                self.assertEqual(result.success, expected.success)
+                if not expected.success:
+                    continue
+                self.assertAlmostEqual(result.total_cost, expected.total_cost, 4)
+                path = list(result.indices)
+                self.assertEqual((path[0], path[-1]), (start, goal))
+                # the path is connected and adds up to the cost
+                total = sum(edge_costs[a, b] for a, b in zip(path, path[1:]))
+                self.assertAlmostEqual(total, result.total_cost, 4)
+        graph = csr_graph([0, 1], [0, 0], [0], [1], [1])
+        self.assertFalse(graph.bidirectional_path(1, 0).success)
+        result = graph.bidirectional_path(1, 1)
+        self.assertEqual(list(result.indices), [1])
+
+
+class DStarLiteTest(unittest.TestCase):
+    def setUp(self):
+        rand = random.Random(5)
+        self.rand = rand
+        self.graph = DStarLite()
+        self.graph.set_heuristic(1)
+        positions = [(rand.uniform(0, 100), rand.uniform(0, 100)) for i in xrange(300)]
+        for x, y in positions:
+            self.graph.add_node(x, y)
+        for i, p in enumerate(positions):
+            for j, q in enumerate(positions[:i]):
+                distance = Vec2d(*p).distance_to(Vec2d(*q))
+                if distance <= 15:
+                    self.graph.add_edge(i, j, distance)
+                    self.graph.add_edge(j, i, distance)
+        # the nodes closest to opposite corners
+        corner = lambda i: positions[i][0] + positions[i][1]
+        self.start = min(xrange(len(positions)), key=corner)
+        self.goal = max(xrange(len(positions)), key=corner)
+
+    def from_scratch(self, start, goal):
+        g = self.graph
+        edges = [e for e in g.edges_near(50, 50, 1000) if g.edge_cost(e) < float('inf')]
+        n = g.num_nodes()
+        return csr_graph([g.node_x(i) for i in xrange(n)], [g.node_y(i) for i in xrange(n)],
+                         [g.edge_source(e) for e in edges], [g.edge_target(e) for e in edges],
+                         [g.edge_cost(e) for e in edges]).shortest_path(start, goal)
+
+    def assertSameCost(self, start, goal):
+        result = self.graph.shortest_path()
+        expected = self.from_scratch(start, goal)
+        self.assertEqual(result.success, expected.success)
+        if expected.success:
+            self.assertAlmostEqual(result.total_cost, expected.total_cost, 3)
+            self.assertEqual(result.indices[0], start)
+            self.assertEqual(result.indices[-1], goal)
+        return result
+
+    def testRepairs(self):
+        g = self.graph
+        start, goal = self.start, self.goal
+        g.set_start(start)
+        g.set_goal(goal)
+        first = self.assertSameCost(start, goal)
+        self.assert_(first.success)
+        # blocking or raising the cost of the edges on the path
+        for repeat in xrange(10):
+            result = g.shortest_path()
+            path = list(result.indices)
+            edge = [e for e in g.edges_near(g.node_x(path[1]), g.node_y(path[1]), 0.01)
+                    if g.edge_source(e) == path[0] and g.edge_target(e) == path[1]][0]
+            if repeat % 2:
+                g.set_edge_cost(edge, float('inf'))
+            else:
+                g.set_edge_cost(edge, g.edge_cost(edge) * 3)
+            self.assertSameCost(start, goal)
+        # random changes anywhere, costs can't go below the distance (the heuristic)
+        edges = g.edges_near(50, 50, 1000)
+        for repeat in xrange(10):
+            for e in self.rand.sample(edges, 20):
+                p, q = g.edge_source(e), g.edge_target(e)
+                distance = distance_heuristic(g.node_x(p), g.node_y(p), g.node_x(q), g.node_y(q))
+                g.set_edge_cost(e, distance * self.rand.uniform(1, 3))
+            self.assertSameCost(start, goal)
+        # moving the start along the path
+        for repeat in xrange(5):
+            result = g.shortest_path()
+            start = result.indices[1]
+            g.set_start(start)
+            self.assertSameCost(start, goal)
+
+    def testMovingStart(self):
+        # like IncrementalRoadMap, a start node that is reconnected wherever it goes
+        g = self.graph
+        start = g.add_node(0, 0)
+        g.set_start(start)
+        g.set_goal(self.goal)
+        for x, y in [(3, 3), (10, 5), (12, 12), (30, 20), (25, 40)]:
+            g.remove_edges(start)
+            g.move_node(start, x, y)
+            for node in g.nodes_near(x, y, 15):
+                if node != start:
+                    g.add_edge(start, node, distance_heuristic(
+                        x, y, g.node_x(node), g.node_y(node)))
+            self.assertSameCost(start, self.goal)
+
+    def testIncremental(self):
+        g = self.graph
+        g.set_start(self.start)
+        g.set_goal(self.goal)
+        first = g.shortest_path()
+        self.assertEqual(g.shortest_path().expanded, 0)  # nothing changed
+        # the search runs from the goal, so changes close to the start are cheap to repair
+        path = list(first.indices)
+        g.remove_edges(path[1])
+        repaired = self.assertSameCost(self.start, self.goal)
+        self.assert_(repaired.expanded < first.expanded / 2)
+        self.assert_(path[1] not in list(repaired.indices))
+
+    def testEditing(self):
+        g = DStarLite()
+        a, b, c = g.add_node(0, 0), g.add_node(1, 0), g.add_node(2, 0)
+        g.set_start(a)
+        g.set_goal(c)
+        self.assertFalse(g.shortest_path().success)
+        ab = g.add_edge(a, b, 1)
+        bc = g.add_edge(b, c, 1)
+        self.assertEqual(g.add_edge(a, 7, 1), -1)
+        result = g.shortest_path()
+        self.assertEqual(list(result.indices), [a, b, c])
+        self.assertEqual(result.total_cost, 2)
+        self.assertEqual(g.cost_to_goal(a), 2)
+        g.remove_edge(bc)
+        self.assertEqual(g.num_edges(), 1)
+        self.assertFalse(g.shortest_path().success)
+        self.assertEqual(g.add_edge(b, c, 2), bc)  # ids are reused
+        self.assertEqual(g.shortest_path().total_cost, 3)
+        g.set_start(c)
+        result = g.shortest_path()
+        self.assertEqual(list(result.indices), [c])
+        self.assertEqual(sorted(g.nodes_near(0, 0, 1.5)), [a, b])
+        self.assertEqual(list(g.edges_near(0.5, 1, 0.9)), [])
+        self.assertEqual(list(g.edges_near(0.5, 1, 1.1)), [ab])
+
+    def testNear(self):
+        # the grid lookups find the same as looking through everything
+        g = self.graph
+        segdist = lambda e, x, y: linesegdist2(
+            Vec2d(g.node_x(g.edge_source(e)), g.node_y(g.edge_source(e))),
+            Vec2d(g.node_x(g.edge_target(e)), g.node_y(g.edge_target(e))), Vec2d(x, y))
+        everything = range(g.num_edges())
+        far = g.add_node(1000, -500)
+        for node in xrange(0, 300, 7):
+            g.move_node(node, self.rand.uniform(-50, 150), self.rand.uniform(-50, 150))
+        everything += [g.add_edge(far, 3, 1), g.add_edge(10, far, 1)]
+        for e in self.rand.sample(everything, 100):
+            g.remove_edge(e)
+            everything.remove(e)
+        for repeat in xrange(30):
+            x, y = self.rand.uniform(-20, 120), self.rand.uniform(-20, 120)
+            r = self.rand.choice([0.5, 5, 20, 60])
+            self.assertEqual(list(g.nodes_near(x, y, r)),
+                             [i for i in xrange(g.num_nodes())
+                              if Vec2d(g.node_x(i), g.node_y(i)).distance_to(Vec2d(x, y)) <= r])
+            self.assertEqual(list(g.edges_near(x, y, r)),
+                             sorted(e for e in everything if segdist(e, x, y) <= r * r))
+        self.assertEqual(len(g.nodes_near(0, 0, float('inf'))), g.num_nodes())
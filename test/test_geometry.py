@@ -0,0 +1,99 @@
+import unittest
+import math
+import random
+import numpy
+from keiro.vector2d import Vec2d
+from keiro.geometry import linesegdist2, line_distance2, angle_diff, \
+    linesegdist2_matrix, line_distance2_matrix, angle_diff_array
+from keiro.particle import Obstacle, LinearParticle
+from keiro.world import View
+from keiro.graphbuilder import free_path, free_paths
+
+
+def random_view(seed, obstacles=30, pedestrians=40, size=200):
+    rand = random.Random(seed)
+    point = lambda: Vec2d(rand.uniform(0, size), rand.uniform(0, size))
+    walls = []
+    for i in xrange(obstacles):
+        p1 = point()
+        walls.append(Obstacle(p1, p1 + Vec2d(rand.uniform(-30, 30), rand.uniform(-30, 30))))
+    crowd = []
+    for i in xrange(pedestrians):
+        p = LinearParticle(rand.uniform(0, size), rand.uniform(0, size))
+        p.radius = rand.uniform(2, 8)
+        crowd.append(p)
+    return View(walls, crowd, (size, size)), point
+
+
+class FreePathsTest(unittest.TestCase):
+    def testSameAsFreePath(self):
+        for seed in xrange(3):
+            view, point = random_view(seed)
+            segments = [(point(), point()) for i in xrange(300)]
+            # some short ones and some that start on a pedestrian
+            segments += [(p, p + Vec2d(3, 1)) for p, q in segments[:50]]
+            segments += [(p.position, point()) for p in view.pedestrians[:5]]
+            for safe_distance in (0, 5):
+                expected = [free_path(p1, p2, view, safe_distance) for p1, p2 in segments]
+                self.assertEqual(list(free_paths(segments, view, safe_distance)), expected)
+            self.assert_(any(expected) and not all(expected))
+
+    def testArrays(self):
+        view, point = random_view(1)
+        segments = [(point(), point()) for i in xrange(20)]
+        rows = numpy.array([(p1.x, p1.y, p2.x, p2.y) for p1, p2 in segments])
+        self.assertEqual(list(free_paths(rows, view, 2)), list(free_paths(segments, view, 2)))
+        self.assertEqual(len(free_paths([], view)), 0)
+        self.assertRaises(ValueError, free_paths, numpy.zeros(5), view)
+
+    def testEmptyView(self):
+        view = View([], [], (100, 100))
+        mask = free_paths([((0, 0), (10, 10)), ((5, 5), (5, 5))], view, 3)
+        self.assertEqual(list(mask), [True, True])
+
+
+class GeometryArrayTest(unittest.TestCase):
+    def setUp(self):
+        rand = random.Random(1)
+        self.points = [(rand.uniform(0, 100), rand.uniform(0, 100)) for i in xrange(30)]
+        self.segments = [self.points[i] + self.points[i + 1] for i in xrange(0, 30, 2)]
+
+    def testLinesegdist2(self):
+        matrix = linesegdist2_matrix(self.points, self.segments)
+        self.assertEqual(matrix.shape, (30, 15))
+        self.assertEqual(matrix.dtype, numpy.float32)
+        for i, p in enumerate(self.points):
+            for j, s in enumerate(self.segments):
+                self.assertEqual(matrix[i, j], linesegdist2(Vec2d(*s[:2]), Vec2d(*s[2:]), Vec2d(*p)))
+        self.assertEqual(linesegdist2_matrix(numpy.array([[8, 9]]), (5, 5, 5, 10))[0, 0], 9)
+
+    def testLineDistance2(self):
+        matrix = line_distance2_matrix(self.segments, numpy.array(self.segments[1:]))
+        self.assertEqual(matrix.shape, (15, 14))
+        for i, s in enumerate(self.segments):
+            for j, t in enumerate(self.segments[1:]):
+                self.assertEqual(matrix[i, j], line_distance2(
+                    Vec2d(*s[:2]), Vec2d(*s[2:]), Vec2d(*t[:2]), Vec2d(*t[2:])))
+        self.assertEqual(numpy.diag(matrix, -1).max(), 0)
+
+    def testZeroLength(self):
+        # like the walls of Maze that are only a point
+        points = numpy.array([[8, 9], [5, 5]])
+        segments = numpy.array([[5, 5, 5, 5], [0, 0, 10, 0]])
+        self.assertEqual(linesegdist2_matrix(points, segments).tolist(), [[25, 81], [0, 25]])
+        matrix = line_distance2_matrix(segments, numpy.array([[5, 5, 5, 5], [8, 9, 8, 1], [5, 5, 8, 5]]))
+        self.assertEqual(matrix.tolist(), [[0, 9, 0], [25, 1, 25]])
+
+    def testAngleDiff(self):
+        a = numpy.linspace(-10, 10, 50)
+        diffs = angle_diff_array(a, 1.5)
+        self.assertEqual(diffs.shape, (50,))
+        for x, d in zip(a, diffs):
+            self.assertEqual(d, angle_diff(x, 1.5))
+        self.assert_(numpy.all(numpy.abs(diffs) <= math.pi + 1e-6))
+        self.assertEqual(angle_diff_array([[0, 1], [2, 3]], [1, 0]).shape, (2, 2))
+
+    def testShapes(self):
+        self.assertEqual(linesegdist2_matrix([], self.segments).shape, (0, 15))
+        self.assertEqual(line_distance2_matrix(self.segments, []).shape, (15, 0))
+        self.assertRaises(ValueError, linesegdist2_matrix, [(1, 2, 3)], self.segments)
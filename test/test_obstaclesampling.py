@@ -0,0 +1,44 @@
+import unittest
+from keiro.vector2d import Vec2d
+from keiro.particle import Obstacle
+from keiro.obstaclesampling import obstacle_points
+from test_geometry import random_view
+
+
+def scanned_points(obstacles, spacing):
+    """The points as the agents made them, looking through all points so far"""
+    points = []
+    for o in obstacles:
+        for end in (o.p1, o.p2):
+            if not any(end == p for p in points):
+                points.append(end)
+        num_midpoints = int(o.p1.distance_to(o.p2)/spacing)
+        for m in xrange(num_midpoints):
+            points.append(o.p1+(o.p2-o.p1)*(m+1)/(num_midpoints+1))
+    return [tuple(p) for p in points]
+
+
+class ObstaclePointsTest(unittest.TestCase):
+    def testSameAsScan(self):
+        for seed in xrange(3):
+            view, point = random_view(seed, obstacles=40, pedestrians=0)
+            # walls that share end points
+            walls = list(view.obstacles)
+            for o in view.obstacles[:10]:
+                walls.append(Obstacle(o.p2, point()))
+                walls.append(Obstacle(point(), o.p1))
+            for spacing in (7.5 * 5, 10, 1000):
+                points = obstacle_points(walls, spacing)
+                self.assertEqual(points.shape[1], 2)
+                self.assertEqual([tuple(p) for p in points.tolist()],
+                                 scanned_points(walls, spacing))
+
+    def testCached(self):
+        walls = [Obstacle(Vec2d(0, 0), Vec2d(100, 0)), Obstacle(Vec2d(100, 0), Vec2d(100, 100))]
+        points = obstacle_points(walls, 30)
+        self.assertEqual(obstacle_points(walls, 30).tolist(), points.tolist())
+        self.assertFalse(points.flags.writeable)
+        self.assertEqual(points.tolist(), [[0, 0], [100, 0], [25, 0], [50, 0], [75, 0],
+                                           [100, 100], [100, 25], [100, 50], [100, 75]])
+        self.assertEqual(len(obstacle_points(walls, 60)), 5)
+        self.assertEqual(obstacle_points([], 30).shape, (0, 2))
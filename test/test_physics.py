@@ -1,5 +1,6 @@
 import unittest
 import math
+import random
 from keiro.vector2d import Vec2d
 from keiro.particle import LinearParticle, World, Obstacle
 
@@ -99,5 +100,326 @@ class WorldTest(unittest.TestCase):
         self.world.bind(ls)
         self.assert_(len(self.world.get_obstacles()))
 
+    def testUnbind(self):
+        particles = [LinearParticle(i, 0) for i in xrange(5)]
+        for p in particles:
+            self.world.bind(p)
+        handles = [p.handle() for p in particles]
+        self.assertEqual(len(set(handles)), 5)
+        self.world.unbind(particles[1])
+        self.world.unbind(particles[1])  # not bound any more, no-op
+        self.assertEqual(particles[1].handle(), -1)
+        self.assertEqual(self.world.num_particles(), 4)
+        # the last particle moved into the free place, handles stay
+        self.assertEqual([p.position.x for p in self.world.get_particles()], [0, 4, 2, 3])
+        self.assertEqual([p.handle() for p in particles if p is not particles[1]],
+                         handles[:1] + handles[2:])
+        self.world.update(0)
+        self.assertEqual(len(self.world.particles_in_range(particles[0], 10)), 3)
+
+        other = World()
+        other.bind(particles[0])  # moves it over
+        self.assertEqual(self.world.num_particles(), 3)
+        self.assertEqual(other.num_particles(), 1)
+
+    def testUnbindObstacle(self):
+        walls = [Obstacle(Vec2d(i, 0), Vec2d(i, 1)) for i in xrange(3)]
+        for w in walls:
+            self.world.bind(w)
+        self.world.unbind(walls[0])
+        self.assertEqual([o.p1.x for o in self.world.get_obstacles()], [2, 1])
+        self.assertEqual(walls[0].handle(), -1)
+
+
+def random_crowd(world, seed, num=300, size=200):
+    """Binds a dense crowd of walking particles to world, returns the particles"""
+    rand = random.Random(seed)
+    particles = []
+    for i in xrange(num):
+        p = LinearParticle(rand.uniform(0, size), rand.uniform(0, size),
+                           rand.uniform(-math.pi, math.pi))
+        p.radius = rand.uniform(3, 8)
+        p.speed = rand.uniform(5, 20)
+        p.turningspeed = math.pi
+        p.waypoint_push(Vec2d(rand.uniform(0, size), rand.uniform(0, size)))
+        world.bind(p)
+        particles.append(p)
+    return particles
+
+
+def random_walls(world, seed, num=200, size=200):
+    """Binds num short random wall segments to world, returns them"""
+    rand = random.Random(seed)
+    walls = []
+    for i in xrange(num):
+        p1 = Vec2d(rand.uniform(0, size), rand.uniform(0, size))
+        p2 = p1 + Vec2d(rand.uniform(-30, 30), rand.uniform(-30, 30))
+        o = Obstacle(p1, p2)
+        world.bind(o)
+        walls.append(o)
+    return walls
+
+
+class SpatialIndexTest(unittest.TestCase):
+    def testMatchesBruteForce(self):
+        """Indexed collision pass gives bit-identical results"""
+        brute_world, indexed_world = World(), World()
+        brute_world.set_spatial_index(False)
+        self.assert_(indexed_world.spatial_index())
+        brute = random_crowd(brute_world, 1)
+        indexed = random_crowd(indexed_world, 1)
+        walls = (random_walls(brute_world, 2), random_walls(indexed_world, 2))
+
+        for step in xrange(20):
+            brute_world.update(0.1)
+            indexed_world.update(0.1)
+
+        self.assert_(sum(p.collisions for p in brute) > 0)
+        for p, q in zip(brute, indexed):
+            self.assertEqual(p.collisions, q.collisions)
+            self.assertEqual(p.position.x, q.position.x)
+            self.assertEqual(p.position.y, q.position.y)
+            self.assertEqual(p.angle, q.angle)
+
+    def testRangeQueries(self):
+        """Indexed range queries give the same answers as linear scans"""
+        brute_world, indexed_world = World(), World()
+        brute_world.set_spatial_index(False)
+        brute = random_crowd(brute_world, 5)
+        indexed = random_crowd(indexed_world, 5)
+        random_walls(brute_world, 6)
+        random_walls(indexed_world, 6)
+        brute_world.update(0.1)
+        indexed_world.update(0.1)
+
+        def positions(particles):
+            return [tuple(p.position) for p in particles]
+
+        ranges = [0, 5, 20, 50, 300]
+        for p, q in zip(brute[:20], indexed[:20]):
+            for r in ranges:
+                self.assertEqual(
+                    positions(brute_world.particles_in_range(p, r)),
+                    positions(indexed_world.particles_in_range(q, r)))
+            for k in (0, 1, 7, 1000):
+                self.assertEqual(
+                    positions(brute_world.nearest_particles(p, k)),
+                    positions(indexed_world.nearest_particles(q, k)))
+
+        batch = indexed_world.all_particles_in_range(indexed[:20], ranges * 4)
+        self.assertEqual(len(batch), 20)
+        for q, r, neighbours in zip(indexed[:20], ranges * 4, batch):
+            self.assertEqual(
+                positions(neighbours),
+                positions(indexed_world.particles_in_range(q, r)))
+
+    def testNearestParticles(self):
+        p, q, r = LinearParticle(0, 0), LinearParticle(3, 0), LinearParticle(1, 1)
+        world = World()
+        for particle in (p, q, r):
+            world.bind(particle)
+        world.update(0)
+        nearest = world.nearest_particles(p, 2)
+        self.assertEqual(len(nearest), 2)
+        self.assertEqual(nearest[0].this, r.this)
+        self.assertEqual(nearest[1].this, q.this)
+
+    def testObstacleIndexStats(self):
+        world = World()
+        particles = random_crowd(world, 3, num=50)
+        walls = random_walls(world, 4)
+        self.assertEqual(world.obstacle_index_rebuilds(), 0)
+        world.update(0.1)
+        world.update(0.1)
+        # built lazily once, static obstacles don't trigger rebuilds
+        self.assertEqual(world.obstacle_index_rebuilds(), 1)
+        queries = world.obstacle_index_queries()
+        self.assert_(queries >= 2 * len(particles))
+        self.assert_(world.obstacle_index_tests() < queries * len(walls) / 10)
+
+        world.unbind(walls.pop())
+        world.update(0.1)
+        self.assertEqual(world.obstacle_index_rebuilds(), 2)
+        world.reset_obstacle_index_stats()
+        self.assertEqual(world.obstacle_index_queries(), 0)
+        self.assertEqual(world.obstacle_index_tests(), 0)
+
+
+class OcclusionTest(unittest.TestCase):
+    def setUp(self):
+        self.world = World()
+        self.observer = LinearParticle(0, 0)
+        self.world.bind(self.observer)
+
+    def visible(self, range=100):
+        self.world.update(0)
+        view = self.world.particles_in_view_range(self.observer, range)
+        return sorted(tuple(p.position) for p in view)
+
+    def testPedestrians(self):
+        near, far, side = LinearParticle(10, 0), LinearParticle(20, 0), LinearParticle(20, 5)
+        for p in (near, far, side):
+            p.radius = 1
+            self.world.bind(p)
+        self.assertEqual(self.visible(), [(10, 0), (20, 5)])
+
+    def testObstacles(self):
+        behind, front = LinearParticle(20, 0), LinearParticle(0, 20)
+        self.world.bind(behind)
+        self.world.bind(front)
+        walls = [Obstacle(Vec2d(10, -5), Vec2d(10, 5)),
+                 Obstacle(Vec2d(-5, 30), Vec2d(5, 30))]  # behind front
+        for wall in walls:
+            self.world.bind(wall)
+        self.assertEqual(self.visible(), [(0, 20)])
+
+    def testWrapAround(self):
+        # shadows crossing the negative x axis
+        near, far = LinearParticle(-10, 0.5), LinearParticle(-20, -0.5)
+        near.radius = far.radius = 1
+        self.world.bind(near)
+        self.world.bind(far)
+        self.assertEqual(self.visible(), [(-10, 0.5)])
+        wall = Obstacle(Vec2d(-5, 5), Vec2d(-5, -5))
+        self.world.bind(wall)
+        self.assertEqual(self.visible(), [])
+
+    def testMatchesBruteForce(self):
+        """Shadow casting agrees with the pairwise test when discs don't overlap"""
+        brute_world = World()
+        brute_world.set_spatial_index(False)
+        observer = LinearParticle(0, 0)
+        brute_world.bind(observer)
+        rand = random.Random(7)
+        brute, indexed = [], []
+        for i in xrange(20):
+            for j in xrange(20):
+                x, y = i * 10 + rand.uniform(3, 7), j * 10 + rand.uniform(3, 7)
+                p, q = LinearParticle(x, y), LinearParticle(x, y)
+                p.radius = q.radius = rand.uniform(0.5, 2.5)
+                brute_world.bind(p)
+                self.world.bind(q)
+                brute.append(p)
+                indexed.append(q)
+        walls = (random_walls(brute_world, 8, num=50),
+                 random_walls(self.world, 8, num=50))
+
+        for p, q in zip(brute[::7], indexed[::7]):
+            for r in (15, 40, 300):
+                self.assertEqual(
+                    [tuple(v.position) for v in brute_world.particles_in_view_range(p, r)],
+                    [tuple(v.position) for v in self.world.particles_in_view_range(q, r)])
+
+        views = self.world.all_particles_in_view_range(indexed[:3], [40] * 3)
+        for q, view in zip(indexed[:3], views):
+            self.assertEqual(
+                [tuple(v.position) for v in view],
+                [tuple(v.position) for v in self.world.particles_in_view_range(q, 40)])
+
+
+class IntegrateTest(unittest.TestCase):
+    def testMatchesParticleUpdate(self):
+        """integrate() moves every particle like its own update(), without collisions"""
+        worlds = World(), World()
+        worlds[1].set_threads(2)
+        crowds = [random_crowd(world, 11) for world in worlds]
+        crowds.append(random_crowd(World(), 11))
+        for particles in crowds:
+            for i, p in enumerate(particles):
+                if i % 5 == 0:  # more than one waypoint
+                    p.waypoint_push(Vec2d(100, 100))
+                elif i % 7 == 0:
+                    p.turningspeed = 0
+                elif i % 11 == 0:
+                    p.speed = 0
+
+        for step in xrange(50):
+            for world in worlds:
+                world.integrate(0.3)
+            for p in crowds[2]:
+                p.update(0.3)
+        self.assert_(any(p.waypoint_len() == 0 for p in crowds[2]))
+        for particles in crowds[:2]:
+            for p, q in zip(particles, crowds[2]):
+                self.assertEqual(p.position.x, q.position.x)
+                self.assertEqual(p.position.y, q.position.y)
+                self.assertEqual(p.previous_position.x, q.previous_position.x)
+                self.assertEqual(p.angle, q.angle)
+                self.assertEqual(p.velocity.x, q.velocity.x)
+                self.assertEqual(p.velocity.y, q.velocity.y)
+                self.assertEqual(p.waypoint_len(), q.waypoint_len())
+
+
+class ThreadedUpdateTest(unittest.TestCase):
+    def run_crowd(self, threads, spatial_index=True):
+        world = World()
+        world.set_threads(threads)
+        world.set_spatial_index(spatial_index)
+        particles = random_crowd(world, 12)
+        walls = random_walls(world, 13)
+        for step in xrange(20):
+            world.update(0.1)
+        return [(p.position.x, p.position.y, p.angle, p.collisions)
+                for p in particles]
+
+    def testSameForAnyThreadCount(self):
+        """Threaded update gives the same trajectories for any thread count"""
+        expected = self.run_crowd(1)
+        self.assert_(sum(c for x, y, a, c in expected) > 0)
+        for threads in (2, 3, 8):
+            self.assertEqual(self.run_crowd(threads), expected)
+        self.assertEqual(self.run_crowd(4, spatial_index=False), expected)
+
+    def testThreadCount(self):
+        world = World()
+        self.assertEqual(world.threads(), 0)
+        world.set_threads(4)
+        self.assertEqual(world.threads(), 4)
+        world.update(0.1)  # no particles
+        world.set_threads(0)
+        self.assertEqual(world.threads(), 0)
+
+
+class ParticleArraysTest(unittest.TestCase):
+    def testMatchesParticles(self):
+        world = World()
+        self.assertEqual(len(world.particle_array("x")), 0)
+        particles = random_crowd(world, 9, num=50)
+        for step in xrange(3):
+            world.update(0.1)
+        arrays = world.particle_arrays()
+        self.assertEqual(sorted(arrays), sorted(World.PARTICLE_FIELDS))
+        for i, p in enumerate(world.get_particles()):
+            self.assertEqual(p.this, particles[i].this)
+            self.assertEqual(arrays["x"][i], p.position.x)
+            self.assertEqual(arrays["y"][i], p.position.y)
+            self.assertEqual(arrays["angle"][i], p.angle)
+            self.assertEqual(arrays["vx"][i], p.velocity.x)
+            self.assertEqual(arrays["vy"][i], p.velocity.y)
+            self.assertEqual(arrays["radius"][i], p.radius)
+            self.assertEqual(arrays["speed"][i], p.speed)
+        self.assertFalse(arrays["x"].flags.writeable)
+
+    def testBindUnbind(self):
+        world = World()
+        particles = random_crowd(world, 10, num=5)
+        world.unbind(particles[1])
+        x = world.particle_array("x")
+        self.assertEqual(list(x), [p.position.x for p in world.get_particles()])
+        self.assertEqual(len(x), 4)
+        self.assertRaises(KeyError, world.particle_array, "position")
+
+    def testKeepsWorldAlive(self):
+        world = World()
+        particles = random_crowd(world, 11, num=20)
+        world.update(0.1)
+        expected = [p.position.x for p in world.get_particles()]
+        x = world.particle_array("x")
+        empty = World().particle_array("x")
+        del world, particles
+        self.assertEqual(list(x), expected)
+        self.assertEqual(len(empty), 0)
+        self.assertFalse(x.flags.writeable)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import itertools
+from keiro.vector2d import Vec2d
+from keiro.graphbuilder import free_path_obstacles_only
+from keiro.world import DummyCanvas
+from agents.roadmap import RoadMap
+from test_geometry import random_view
+
+
+class DeadlineTest(unittest.TestCase):
+    def setUp(self):
+        self.view, point = random_view(1, obstacles=15, pedestrians=5, size=300)
+        self.agent = RoadMap(20, random_seed=1)
+        self.agent.position = Vec2d(20, 20)
+        self.agent.goal = Vec2d(280, 280)
+        self.agent.init(self.view)
+
+    def think(self, samples):
+        """think with time for the given number of samples"""
+        budget = itertools.chain([False] * samples, itertools.repeat(True))
+        self.agent.out_of_time = lambda deadline: next(budget)
+        self.agent.think(0.1, self.view, DummyCanvas(), deadline=0)
+
+    def testResumed(self):
+        agent = self.agent
+        self.think(0)
+        self.assertEqual(agent.samples, [])
+        self.think(4)
+        first = list(agent.samples)
+        self.assertEqual(len(first), 4)
+        self.think(4)
+        self.assertEqual(agent.samples[:4], first)
+        self.assertEqual(len(agent.samples), 8)
+        for pos, sample in agent.links:
+            self.assert_(free_path_obstacles_only(
+                Vec2d(*pos), sample, self.view, agent.radius + agent.FREEMARGIN))
+        self.assert_(agent.waypoint_len() > 0)
+        # all of them sampled, the next tick starts over
+        self.think(4)
+        self.assertEqual(agent.samples, [])
+        self.assertEqual(agent.links, [])
+
+    def testNewGoal(self):
+        agent = self.agent
+        self.think(4)
+        agent.goal = Vec2d(280, 20)
+        self.think(3)
+        self.assertEqual(len(agent.samples), 3)
@@ -0,0 +1,95 @@
+import unittest
+import os
+import shutil
+import tempfile
+from keiro import roadmapcache
+from keiro.vector2d import Vec2d
+from keiro.particle import Obstacle
+from keiro.world import View
+from agents.arty import Arty
+
+
+class RoadmapCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        roadmapcache.set_directory(self.directory)
+        self.walls = [Obstacle(Vec2d(100, 100), Vec2d(300, 100)),
+                      Obstacle(Vec2d(300, 100), Vec2d(300, 300))]
+
+    def tearDown(self):
+        roadmapcache.set_directory(None)
+        shutil.rmtree(self.directory)
+
+    def testCached(self):
+        calls = []
+
+        def build():
+            calls.append(1)
+            return [(1.0, 2.0)]
+
+        for repeat in xrange(3):
+            self.assertEqual(roadmapcache.cached("test", self.walls, (1,), build), [(1.0, 2.0)])
+        self.assertEqual(len(calls), 1)
+        roadmapcache.cached("test", self.walls, (2,), build)
+        roadmapcache.cached("test", self.walls[:1], (1,), build)
+        roadmapcache.cached("other", self.walls, (1,), build)
+        self.assertEqual(len(calls), 4)
+
+    def testBroken(self):
+        key = roadmapcache.make_key("test", self.walls, ())
+        path = os.path.join(self.directory, key + ".pickle")
+        # truncated, not a pickle, a bad value, a renamed module and class
+        for content in ["\x80\x02]q", "garbage", "I1x\n.", "cno_such_module\nThing\n.",
+                        "ccollections\nno_such_class\n."]:
+            with open(path, "wb") as f:
+                f.write(content)
+            self.assertEqual(roadmapcache.load(key), None)
+            self.assertEqual(roadmapcache.cached("test", self.walls, (), lambda: [3]), [3])
+            self.assertEqual(roadmapcache.load(key), [3])
+
+    def testUnwritable(self):
+        # the cache directory can't be created
+        path = os.path.join(self.directory, "file")
+        with open(path, "wb") as f:
+            f.write("not a directory")
+        roadmapcache.set_directory(os.path.join(path, "cache"))
+        self.assertEqual(roadmapcache.cached("test", self.walls, (), lambda: [3]), [3])
+        self.assertEqual(roadmapcache.load(roadmapcache.make_key("test", self.walls, ())), None)
+
+        # the entry can't be written, no temporary file is left behind
+        roadmapcache.set_directory(self.directory)
+        key = roadmapcache.make_key("test", self.walls, ())
+        os.mkdir(os.path.join(self.directory, key + ".pickle"))
+        self.assertEqual(roadmapcache.cached("test", self.walls, (), lambda: [3]), [3])
+        self.assertEqual(sorted(os.listdir(self.directory)), sorted(["file", key + ".pickle"]))
+
+    def testDisabled(self):
+        roadmapcache.set_directory(None)
+        calls = []
+        for repeat in xrange(2):
+            roadmapcache.cached("test", self.walls, (), lambda: calls.append(1) or 5)
+        self.assertEqual(len(calls), 2)
+
+    def testObstacleHash(self):
+        moved = [Obstacle(Vec2d(100, 100), Vec2d(300, 100)),
+                 Obstacle(Vec2d(300, 100), Vec2d(300, 301))]
+        same = [Obstacle(Vec2d(100, 100), Vec2d(300, 100)),
+                Obstacle(Vec2d(300, 100), Vec2d(300, 300))]
+        self.assertNotEqual(roadmapcache.obstacle_hash(self.walls), roadmapcache.obstacle_hash(moved))
+        self.assertEqual(roadmapcache.obstacle_hash(self.walls), roadmapcache.obstacle_hash(same))
+
+    def testArtyRoadmap(self):
+        view = View(self.walls, [], (400, 400))
+        roadmaps = []
+        for repeat in xrange(2):  # built, then loaded
+            agent = Arty(30, random_seed=1)
+            agent.position = Vec2d(50, 50)
+            agent.goal = Vec2d(350, 350)
+            agent.init(view)
+            roadmaps.append([(tuple(n.position), n.angle, n.time,
+                              n.parent and tuple(n.parent.position))
+                             for n in agent.globalnodes])
+            roadmaps.append(agent.random.random())
+        self.assertEqual(roadmaps[0], roadmaps[2])
+        self.assertEqual(roadmaps[1], roadmaps[3])  # random state is restored too
+        self.assertEqual(len(os.listdir(self.directory)), 1)
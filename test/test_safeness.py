@@ -0,0 +1,227 @@
+import unittest
+import math
+import random
+import numpy
+from keiro.vector2d import Vec2d
+from keiro.geometry import linesegdist2, angle_diff
+from keiro.particle import Obstacle, LinearParticle
+from keiro.world import View, DummyCanvas
+from keiro.safeness import SafenessEvaluator
+from agents.arty import Arty, BestFirstArty, roadmap_from_rows
+
+RADIUS = 5
+MARGIN = 2
+
+
+def random_crowd(rand, count=30, size=200):
+    crowd = []
+    for i in xrange(count):
+        p = LinearParticle(rand.uniform(0, size), rand.uniform(0, size))
+        p.radius = rand.uniform(2, 8)
+        p.velocity = Vec2d(rand.uniform(-10, 10), rand.uniform(-10, 10))
+        crowd.append(p)
+    return crowd
+
+
+def future(p, time):
+    return p.position + p.velocity * time
+
+
+# the tests of Arty as they were written before they were batched
+
+def static_fail(crowd, position, time):
+    for i, p in enumerate(crowd):
+        if position.distance_to(future(p, time)) < RADIUS + p.radius + MARGIN:
+            return i
+    return -1
+
+
+def turn_fail(crowd, position, a1, a2, starttime, turningspeed):
+    dur = abs(angle_diff(a1, a2)) / turningspeed
+    for i, p in enumerate(crowd):
+        safedist2 = (RADIUS + p.radius + MARGIN) ** 2
+        if linesegdist2(future(p, starttime), future(p, starttime + dur), position) < safedist2:
+            return i
+    return -1
+
+
+def segment_fail(crowd, p1, p2, start_time, speed):
+    if p1 == p2:
+        return static_fail(crowd, p1, start_time)
+    diff = p2 - p1
+    length = diff.length()
+    velocity = diff * speed / length
+    end_time = start_time + length / speed
+    for i, o in enumerate(crowd):
+        pd = p1 - future(o, start_time)
+        vd = velocity - o.velocity
+        vd2 = vd.length2()
+        if vd2 == 0:
+            t = 0
+        else:
+            t = -pd.dot(vd) / vd2
+        t = max(min(t, end_time - start_time), 0)
+        if (pd + vd * t).length2() < (RADIUS + o.radius + MARGIN) ** 2:
+            return i
+    return -1
+
+
+class SafenessEvaluatorTest(unittest.TestCase):
+    def setUp(self):
+        self.rand = random.Random(1)
+        self.crowd = random_crowd(self.rand)
+        self.evaluator = SafenessEvaluator(self.crowd, RADIUS, MARGIN)
+
+    def point(self):
+        return Vec2d(self.rand.uniform(0, 200), self.rand.uniform(0, 200))
+
+    def check(self, result, expected):
+        safeness, fail = result
+        self.assertEqual(fail.tolist(), expected)
+        self.assertEqual(safeness.tolist(), [int(f == -1) for f in expected])
+        self.assert_(-1 in expected and any(f != -1 for f in expected))
+
+    def testStatic(self):
+        points = [self.point() for i in xrange(200)]
+        times = [self.rand.uniform(0, 5) for p in points]
+        self.check(self.evaluator.static(points, times),
+                   [static_fail(self.crowd, p, t) for p, t in zip(points, times)])
+        self.assertEqual(self.evaluator.static(points, 0)[1].tolist(),
+                         [static_fail(self.crowd, p, 0) for p in points])
+
+    def testTurns(self):
+        points = [self.point() for i in xrange(200)]
+        a1 = [self.rand.uniform(-4, 4) for p in points]
+        a2 = [self.rand.uniform(-4, 4) for p in points]
+        times = [self.rand.uniform(0, 5) for p in points]
+        self.check(self.evaluator.turns(points, a1, a2, times, 1.5),
+                   [turn_fail(self.crowd, p, x, y, t, 1.5)
+                    for p, x, y, t in zip(points, a1, a2, times)])
+
+    def testSegments(self):
+        p1 = [self.point() for i in xrange(200)]
+        p2 = [p + Vec2d(self.rand.uniform(-30, 30), self.rand.uniform(-30, 30)) for p in p1]
+        p2[:10] = p1[:10]
+        times = [self.rand.uniform(0, 5) for p in p1]
+        self.check(self.evaluator.segments(p1, p2, times, 20),
+                   [segment_fail(self.crowd, a, b, t, 20) for a, b, t in zip(p1, p2, times)])
+
+    def testPredicted(self):
+        # half of the tests go past the horizon
+        self.evaluator.predict(10, 0.5)
+        p1 = [self.point() for i in xrange(300)]
+        p2 = [p + Vec2d(self.rand.uniform(-30, 30), self.rand.uniform(-30, 30)) for p in p1]
+        times = [self.rand.uniform(0, 20) for p in p1]
+        self.check(self.evaluator.segments(p1, p2, times, 20),
+                   [segment_fail(self.crowd, a, b, t, 20) for a, b, t in zip(p1, p2, times)])
+        self.check(self.evaluator.turns(p1, 0, 3, times, 1.5),
+                   [turn_fail(self.crowd, p, 0, 3, t, 1.5) for p, t in zip(p1, times)])
+        self.check(self.evaluator.static(p1, times),
+                   [static_fail(self.crowd, p, t) for p, t in zip(p1, times)])
+        self.assertEqual([self.evaluator.free(a, b, t, 20) for a, b, t in zip(p1, p2, times)],
+                         [segment_fail(self.crowd, a, b, t, 20) == -1
+                          for a, b, t in zip(p1, p2, times)])
+
+    def testEmpty(self):
+        evaluator = SafenessEvaluator([], RADIUS, MARGIN)
+        evaluator.predict(10)
+        safeness, fail = evaluator.segments([(0, 0)], [(10, 10)], 0, 5)
+        self.assertEqual(list(safeness), [1])
+        self.assertEqual(len(self.evaluator.static([], [])[0]), 0)
+        self.assertRaises(ValueError, self.evaluator.static, [(1, 2, 3)], 0)
+
+
+class ArtyRoutesTest(unittest.TestCase):
+    def backtrack(self, agent, candidate, view, start_time):
+        """Arty.backtrack_via_global, one move at a time"""
+        position, angle, node = agent.position, agent.angle, candidate
+        time = start_time
+        path = []
+        while node is not None:
+            move_time, safeness = agent.test_move(position, angle, node.position, view, time)
+            time += move_time
+            angle = (node.position - position).angle()
+            position = node.position
+            path.append(position)
+            if safeness < agent.SAFETY_THRESHOLD:
+                return 0, path, time
+            node = node.parent
+        return 1, path, time
+
+    def testBacktrack(self):
+        rand = random.Random(3)
+        walls = [Obstacle(Vec2d(60, 60), Vec2d(140, 60)),
+                 Obstacle(Vec2d(140, 100), Vec2d(140, 180))]
+        crowd = random_crowd(rand, count=8)
+        view = View(walls, crowd, (200, 200))
+        agent = Arty(40, random_seed=1)
+        agent.position = Vec2d(20, 20)
+        agent.goal = Vec2d(180, 180)
+        agent.init(view)
+        agent.debugsurface = DummyCanvas()
+        results = []
+        for candidate in agent.globalnodes:
+            expected = self.backtrack(agent, candidate, view, 0.5)
+            safeness, path, time = agent.backtrack_via_global(
+                candidate, agent.position, agent.angle, view, 0.5, 1.0)
+            self.assertEqual((safeness, path, time), expected)
+            results.append(safeness)
+        self.assert_(0 in results and 1 in results)
+
+        path, time = agent.find_globaltree(agent.position, agent.angle, view, 0.5, 1.0)
+        first = results.index(1)
+        self.assertEqual((path, time), self.backtrack(agent, agent.globalnodes[first], view, 0.5)[1:])
+
+    def testBestFirst(self):
+        rand = random.Random(3)
+        walls = [Obstacle(Vec2d(60, 60), Vec2d(140, 60)),
+                 Obstacle(Vec2d(140, 100), Vec2d(140, 180))]
+        crowd = random_crowd(rand, count=8)
+        view = View(walls, crowd, (200, 200))
+        agents = []
+        for cls in (Arty, BestFirstArty):
+            agent = cls(40, random_seed=1)
+            agent.position = Vec2d(20, 20)
+            agent.goal = Vec2d(180, 180)
+            agent.init(view)
+            agent.debugsurface = DummyCanvas()
+            agents.append(agent)
+        first, best = agents
+        safe = [self.backtrack(first, c, view, 0.5) for c in first.globalnodes]
+        fastest = min((time, path) for safeness, path, time in safe if safeness)
+
+        path, time = best.find_globaltree(best.position, best.angle, view, 0.5, 1.0)
+        self.assertEqual((time, path), fastest)
+        self.assert_(time <= first.find_globaltree(first.position, first.angle, view, 0.5, 1.0)[1])
+        # again from the memo, and nothing when it has to be faster
+        self.assertEqual(best.find_globaltree(best.position, best.angle, view, 0.5, 1.0),
+                         (path, time))
+        self.assertEqual(best.find_globaltree(best.position, best.angle, view, 0.5, 1.0,
+                                              time_limit=time), (None, None))
+
+    def testMemoHeading(self):
+        # into the edge from p to the goal straight from a, or turning from b
+        rows = [(180, 100, 0, None, 0), (100, 100, 0, 0, 4),
+                (60, 100, 0, 1, 6), (100, 60, 0, 1, 6)]
+        agent = BestFirstArty(None, random_seed=1)
+        agent.position = Vec2d(60, 60)
+        agent.angle = math.pi / 4
+        agent.goal = Vec2d(180, 100)
+        agent.globalnodes = roadmap_from_rows(rows)
+        agent.index_global_roadmap(View([], [], (200, 200)))
+        candidates = numpy.array([2, 3])
+        times = agent.route_safeness(candidates, agent.position, agent.angle,
+                                     View([], [], (200, 200)), 0.5)[2]
+        self.assertEqual(times[0, 2], times[1, 2])  # both at p at the same time
+        # a pedestrian crossing just behind p while b turns there
+        walker = LinearParticle(95, 100 + 40 * (times[0, 2] + 1))
+        walker.radius = 2
+        walker.velocity = Vec2d(0, -40)
+        view = View([], [walker], (200, 200))
+        expected = agent.route_safeness(candidates, agent.position, agent.angle, view, 0.5)
+        self.assertEqual(expected[0].tolist(), [False, True])
+        for repeat in xrange(2):
+            result = agent.route_safeness(candidates, agent.position, agent.angle, view, 0.5,
+                                          memoise=True)
+            self.assertEqual(result[0].tolist(), expected[0].tolist())
+            self.assertEqual(result[1].tolist(), expected[1].tolist())
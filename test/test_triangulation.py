@@ -0,0 +1,125 @@
+import unittest
+import random
+from keiro.vector2d import Vec2d
+from keiro.geometry import delaunay_triangulation
+from keiro.triangulation import Triangulation
+
+
+def orient(a, b, c):
+    return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+
+
+def canonical(triangles):
+    """triangles with the smallest key first, as a set"""
+    result = set()
+    for t in triangles:
+        i = t.index(min(t))
+        result.add(t[i:] + t[:i])
+    return result
+
+
+def fortune(points):
+    """the triangles of the dict points, counterclockwise, from scratch"""
+    keys = sorted(points)
+    triangles = []
+    for a, b, c in delaunay_triangulation([points[k] for k in keys]):
+        a, b, c = keys[a], keys[b], keys[c]
+        if orient(points[a], points[b], points[c]) < 0:
+            b, c = c, b
+        triangles.append((a, b, c))
+    return canonical(triangles)
+
+
+class TriangulationTest(unittest.TestCase):
+    def setUp(self):
+        self.rand = random.Random(1)
+
+    def point(self):
+        return (self.rand.uniform(0, 640), self.rand.uniform(0, 480))
+
+    def testSmall(self):
+        t = Triangulation({"a": (0, 0), "b": (1, 0), "c": (0, 1)})
+        self.assertEqual(canonical(t.triangles()), set([("a", "b", "c")]))
+        t.add("d", Vec2d(1, 1.5))
+        self.assertEqual(canonical(t.triangles()),
+                         set([("a", "b", "c"), ("b", "d", "c")]))
+        self.assertEqual(t.incident_triangles("b"), [("b", "d", "c"), ("b", "c", "a")])
+        self.assertEqual(len(t), 4)
+        self.assert_("d" in t)
+        self.assertEqual(t.position("d"), (1, 1.5))
+        t.remove("a")
+        self.assertEqual(canonical(t.triangles()), set([("b", "d", "c")]))
+        self.assertEqual(t.incident_triangles("c"), [("c", "b", "d")])
+
+    def testRandom(self):
+        t = Triangulation()
+        points = {}
+        for step in xrange(600):
+            r = self.rand.random()
+            if r < 0.4 or len(points) < 10:
+                points[step] = self.point()
+                t.add(step, points[step])
+            elif r < 0.6:
+                key = self.rand.choice(points.keys())
+                del points[key]
+                t.remove(key)
+            else:
+                key = self.rand.choice(points.keys())
+                x, y = points[key]
+                if r < 0.9:
+                    points[key] = (x + self.rand.uniform(-5, 5), y + self.rand.uniform(-5, 5))
+                else:
+                    points[key] = self.point()
+                t.move(key, points[key])
+            self.assertEqual(canonical(t.triangles()), fortune(points))
+        for key in points:
+            incident = t.incident_triangles(key)
+            self.assert_(all(tri[0] == key for tri in incident))
+            self.assertEqual(canonical(incident),
+                             set(tri for tri in fortune(points) if key in tri))
+            # counterclockwise around the point, one after the other
+            for first, second in zip(incident, incident[1:]):
+                self.assertEqual(first[2], second[1])
+
+    def testUpdate(self):
+        points = dict((i, self.point()) for i in xrange(50))
+        t = Triangulation(points)
+        for i in xrange(10):
+            del points[i]
+            points[50 + i] = self.point()
+        for i in xrange(10, 30):
+            x, y = points[i]
+            points[i] = (x + 1, y - 1)
+        t.update(points)
+        self.assertEqual(len(t), 50)
+        self.assertEqual(canonical(t.triangles()), fortune(points))
+
+    def testDegenerate(self):
+        t = Triangulation()
+        # on a line, no triangles until a point is off it
+        for i in xrange(4):
+            t.add(i, (i, i))
+        self.assertEqual(t.triangles(), [])
+        self.assertEqual(t.incident_triangles(0), [])
+        t.add("off", (0, 3))
+        self.assertEqual(len(t.triangles()), 3)
+        # a point on top of another one is left out while they are together
+        t.add("twin", (0, 3))
+        self.assertEqual(len(t.triangles()), 3)
+        self.assertEqual(t.incident_triangles("twin"), [])
+        t.remove("off")
+        self.assertEqual(len(t.triangles()), 3)
+        self.assertEqual(len(t.incident_triangles("twin")), 3)
+        t.move("twin", (1, 1))
+        self.assertEqual(t.triangles(), [])
+        t.move("twin", (3, 0))
+        self.assertEqual(len(t.triangles()), 3)
+        # a square grid has cocircular points everywhere
+        t.clear()
+        for x in xrange(5):
+            for y in xrange(5):
+                t.add((x, y), (x, y))
+        self.assertEqual(len(t.triangles()), 32)
+        for x in xrange(5):
+            t.remove((x, 2))
+        self.assertEqual(len(t.triangles()), 16 + 8)
@@ -0,0 +1,52 @@
+import unittest
+import random
+import numpy
+from keiro.vector2d import Vec2d
+from keiro.geometry import voronoi_diagram, delaunay_triangulation
+
+
+def distance(p, q):
+    return ((p[0] - q[0]) ** 2 + (p[1] - q[1]) ** 2) ** 0.5
+
+
+class VoronoiTest(unittest.TestCase):
+    def setUp(self):
+        rand = random.Random(1)
+        self.points = [Vec2d(rand.uniform(0, 640), rand.uniform(0, 480)) for i in xrange(200)]
+        self.xy = [(p.x, p.y) for p in self.points]
+
+    def testSmall(self):
+        # as given by the python implementation the agents had
+        points = [(0, 0), (1, 0), (0, 1), (1, 1.5)]
+        self.assertEqual(voronoi_diagram(points), (
+            [(0.5, 0.5), (0.75, 0.75)],
+            [(1.0, 0.0, 0.5), (0.0, 1.0, 0.5), (-1.0, 1.0, 0.0), (0.0, 1.0, 0.75), (1.0, 0.5, 1.125)],
+            [(2, 0, 1), (1, -1, 0), (4, -1, 1), (3, 1, -1), (0, 0, -1)]))
+        self.assertEqual(delaunay_triangulation(points), [(2, 1, 0), (2, 3, 1)])
+
+    def testDiagram(self):
+        vertices, lines, edges = voronoi_diagram(self.points)
+        triangles = delaunay_triangulation(self.points)
+        self.assertEqual(len(vertices), len(triangles))
+        for v, t in zip(vertices, triangles):
+            # vertex i is the center of the circle through triangle i
+            radius = distance(v, self.xy[t[0]])
+            for i in t[1:]:
+                self.assertAlmostEqual(distance(v, self.xy[i]), radius, 6)
+            # with no points inside
+            self.assert_(min(distance(v, p) for p in self.xy) > radius - 1e-6)
+        for l, v1, v2 in edges:
+            a, b, c = lines[l]
+            for v in (v1, v2):
+                if v != -1:
+                    x, y = vertices[v]
+                    self.assertAlmostEqual(a * x + b * y, c, 6)
+        self.assert_(any(-1 in e[1:] for e in edges))
+
+    def testArrays(self):
+        self.assertEqual(voronoi_diagram(numpy.array(self.xy)), voronoi_diagram(self.points))
+        self.assertEqual(delaunay_triangulation(numpy.array(self.xy)),
+                         delaunay_triangulation(self.xy))
+        self.assertEqual(voronoi_diagram([]), ([], [], []))
+        self.assertEqual(delaunay_triangulation([(1, 2)]), [])
+        self.assertRaises(ValueError, voronoi_diagram, numpy.zeros((3, 3)))
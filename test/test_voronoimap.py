@@ -0,0 +1,92 @@
+import unittest
+from keiro.vector2d import Vec2d
+from keiro.geometry import line_distance2, linesegdist2
+from keiro.particle import LinearParticle, Obstacle
+from keiro.world import View, DummyCanvas
+from agents.voronoimap import VoronoiMap
+from test_geometry import random_view
+
+
+class VoronoiMapTest(unittest.TestCase):
+    def setUp(self):
+        self.view, point = random_view(1, obstacles=15, pedestrians=0, size=300)
+        self.agent = VoronoiMap(None, random_seed=1)
+        self.agent.position = Vec2d(20, 20)
+        self.agent.goal = Vec2d(280, 280)
+        self.agent.init(self.view)
+        self.safe_distance = self.agent.radius + self.agent.FREEMARGIN
+
+    def testClearance(self):
+        vertices, edges, clearances = self.agent.skeleton
+        self.assert_(len(edges) > 100)
+        for (v1, v2), clearance in zip(edges, clearances):
+            p1, p2 = Vec2d(*vertices[v1]), Vec2d(*vertices[v2])
+            expected = min(line_distance2(p1, p2, o.p1, o.p2) for o in self.view.obstacles)
+            self.assertAlmostEqual(clearance ** 2, expected, 2)
+
+    def testPointWall(self):
+        # Maze has walls of zero length, which are points to keep clear of
+        before = self.agent.open_points(self.view)
+        point = Vec2d(*before[len(before) / 2])
+        walls = list(self.view.obstacles) + [Obstacle(point, point)]
+        view = View(walls, [], (300, 300))
+        spacing = self.agent.OPEN_SPACING * self.agent.radius
+        points = self.agent.open_points(view)
+        self.assert_(0 < len(points) < len(before))
+        for p in points:
+            self.assert_(Vec2d(*p).distance_to(point) > spacing / 2)
+        vertices, edges, clearances = self.agent.skeleton
+        with_point = self.agent.clearances(vertices, edges, walls)
+        for (v1, v2), clearance, c in zip(edges, clearances, with_point):
+            expected = min(clearance ** 2, linesegdist2(Vec2d(*vertices[v1]), Vec2d(*vertices[v2]), point))
+            self.assertAlmostEqual(c ** 2, expected, 2)
+
+    def testBlocked(self):
+        agent = self.agent
+        agent.build_graph(self.view, self.safe_distance)
+        walkers, point = random_view(2, obstacles=0, pedestrians=30, size=300)
+        for pedestrians in (walkers.pedestrians, walkers.pedestrians[10:], []):
+            view = View(self.view.obstacles, pedestrians, (300, 300))
+            agent.update_blocked(view, self.safe_distance)
+            expected = set()
+            for i, (n1, n2, e1, e2, cost, margin) in enumerate(agent.links):
+                p1, p2 = agent.node_position(n1), agent.node_position(n2)
+                if any(linesegdist2(p1, p2, p.position) <= (margin + p.radius) ** 2
+                       for p in pedestrians):
+                    expected.add(i)
+                    self.assertEqual(agent.graph.edge_cost(e1), agent.INFINITY)
+                else:
+                    self.assertAlmostEqual(agent.graph.edge_cost(e2), cost, 4)
+            self.assertEqual(agent.blocked, expected)
+        self.assertEqual(agent.blocked, set())
+
+    def testThink(self):
+        agent = self.agent
+        blocker = LinearParticle(150, 150)
+        blocker.radius = 5
+        view = View(self.view.obstacles, [blocker], (300, 300))
+        agent.think(0.1, view, DummyCanvas())
+        path = [agent.waypoint(i).position for i in xrange(agent.waypoint_len())]
+        self.assertEqual(tuple(path[-1]), tuple(agent.goal))
+        for p1, p2 in zip(path, path[1:]):
+            self.assert_(linesegdist2(p1, p2, blocker.position) > blocker.radius ** 2)
+
+    def testDuplicateVertices(self):
+        # the Voronoi diagram of a square grid of points has vertices in the
+        # same places, joined by edges of zero length
+        walls = [Obstacle(Vec2d(x, y), Vec2d(x, y))
+                 for x in xrange(25, 300, 50) for y in xrange(25, 300, 50)]
+        view = View(walls, [], (300, 300))
+        agent = VoronoiMap(None, random_seed=1)
+        agent.position = Vec2d(50, 50)
+        agent.goal = Vec2d(250, 250)
+        agent.init(view)
+        vertices, edges, clearances = agent.skeleton
+        duplicates = set(vertices[v1] for v1, v2 in edges if vertices[v1] == vertices[v2])
+        self.assert_(duplicates)
+        agent.think(0.1, view, DummyCanvas())
+        self.assert_(all(cost > 0 for n1, n2, e1, e2, cost, margin in agent.links
+                         if n1 != agent.goal_node))
+        path = [tuple(agent.waypoint(i).position) for i in xrange(agent.waypoint_len())]
+        self.assertEqual(path[-1], (250, 250))
+        self.assert_(duplicates.intersection(path))
@@ -0,0 +1,54 @@
+import unittest
+import pygame
+from keiro.vector2d import Vec2d
+from keiro.unit import Unit
+from keiro.world import World, DummyCanvas
+
+
+class Recorder(object):
+    def __init__(self):
+        self.frames = []
+
+    def add_frame(self, imagestring):
+        self.frames.append(imagestring)
+
+
+class RemoveUnitsTest(unittest.TestCase):
+    def testInPlace(self):
+        world = World((100, 80))
+        units = [Unit() for i in xrange(6)]
+        for u in units:
+            world.add_unit(u)
+        unit_list = world.units
+        world.remove_units(units[1::2])
+        self.assert_(world.units is unit_list)
+        self.assertEqual(unit_list, units[::2])
+        self.assertEqual(len(world.get_particles()), 3)
+
+
+class HeadlessWorldTest(unittest.TestCase):
+    def setUp(self):
+        self.world = World((100, 80), headless=True)
+        self.unit = Unit()
+        self.unit.position = Vec2d(50, 40)
+        self.world.add_unit(self.unit)
+        self.world.set_timestep(0.1)
+        self.world.init()
+
+    def testNoDisplay(self):
+        self.assertEqual(type(self.world.debugcanvas), DummyCanvas)
+        rendered = []
+        self.world.render = rendered.append
+        for i in xrange(10):
+            self.assertEqual(self.world.advance(), 0.1)
+        self.assertAlmostEqual(self.world.get_time(), 1.0)
+        self.assertEqual(rendered, [])
+        self.assertFalse(pygame.display.get_init())
+
+    def testRecording(self):
+        recorder = Recorder()
+        self.world.add_encoder(recorder)
+        self.world.advance()
+        self.world.advance()
+        self.assertEqual(len(recorder.frames), 2)
+        self.assertEqual(len(recorder.frames[0]), 100 * 80 * 3)